@@ -0,0 +1,64 @@
+// Writes brotli (.br) and gzip (.gz) copies next to every compressible file
+// under the given directories, for the server to send in place of the
+// original when the browser accepts them (server/src/zapp_atlas/html/assets.py).
+// Compressing here, once per build and at the highest levels, costs the
+// server nothing per request.
+//
+//   node scripts/precompress.mjs dist ../server/src/zapp_atlas/html/static
+//
+// Uses only node:zlib, so the build needs no extra packages.
+
+import { readdir, readFile, stat, writeFile } from 'node:fs/promises';
+import path from 'node:path';
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib';
+
+const COMPRESSIBLE = new Set(['.js', '.mjs', '.css', '.html', '.json', '.svg', '.map', '.txt']);
+// Below this, the saving is smaller than the headers that announce it.
+const MIN_BYTES = 1024;
+
+const ENCODINGS = [
+  [
+    '.br',
+    (data) =>
+      brotliCompressSync(data, {
+        params: {
+          [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+          [constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+        },
+      }),
+  ],
+  ['.gz', (data) => gzipSync(data, { level: constants.Z_BEST_COMPRESSION })],
+];
+
+async function* files(dir) {
+  for (const entry of await readdir(dir, { withFileTypes: true })) {
+    const full = path.join(dir, entry.name);
+    if (entry.isDirectory()) yield* files(full);
+    else if (entry.isFile()) yield full;
+  }
+}
+
+async function precompress(dir) {
+  let written = 0;
+  for await (const file of files(dir)) {
+    if (!COMPRESSIBLE.has(path.extname(file))) continue;
+    if ((await stat(file)).size < MIN_BYTES) continue;
+    const data = await readFile(file);
+    for (const [suffix, compress] of ENCODINGS) {
+      const compressed = compress(data);
+      // Only worth serving if it is actually smaller.
+      if (compressed.length < data.length) {
+        await writeFile(file + suffix, compressed);
+        written += 1;
+      }
+    }
+  }
+  console.log(`precompress: ${written} files written under ${dir}`);
+}
+
+const dirs = process.argv.slice(2);
+if (dirs.length === 0) {
+  console.error('usage: node scripts/precompress.mjs <dir> [<dir> ...]');
+  process.exit(2);
+}
+for (const dir of dirs) await precompress(dir);
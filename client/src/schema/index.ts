@@ -357,6 +357,12 @@ export interface Image extends ZappEntity {
     resolution?: string,
     /** Scale bar information, including the physical length it represents and the unit of measurement. */
     scale_bar?: string,
+    /** Media type of the stored image file, recorded when it is uploaded. */
+    content_type?: string,
+    /** Size of the stored image file in bytes. */
+    byte_size?: number,
+    /** Hex-encoded SHA-256 digest of the stored image file. */
+    checksum?: string,
 }
 
 
@@ -0,0 +1,14 @@
+"""Performance benchmarks for the server.
+
+Not part of the test suite. Run from ``server/``::
+
+    uv run python -m benchmarks run --out benchmarks/baseline.json
+    uv run python -m benchmarks compare benchmarks/baseline.json current.json
+
+``run`` measures the cold import of the app (``import_time``), the time for
+``create_app`` plus the lifespan to become ready (``startup``), and per-route
+CRUD latency against synthetic databases of 100, 10k and 100k studies
+(``routes``, ``fixtures``). ``compare`` is the regression gate
+(``results``). Timings depend on the machine, so compare results taken on
+the same one.
+"""
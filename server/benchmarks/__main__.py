@@ -0,0 +1,156 @@
+"""Benchmark runner and regression gate.
+
+No baseline is committed: timings only compare within one machine, so each
+host records its own, on main, before measuring a branch against it.
+
+    uv run python -m benchmarks run --out benchmarks/baseline.json
+    uv run python -m benchmarks run --scales 100,10000 --out current.json
+    uv run python -m benchmarks compare benchmarks/baseline.json current.json \\
+        --threshold 0.25 --metric-threshold 'startup.*=0.5'
+
+``compare`` exits non-zero when any metric regressed past its threshold.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks import import_time, results
+
+DEFAULT_SCALES = "100,10000,100000"
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "zapp-atlas-bench"
+SUITES = ("import", "startup", "first_request", "routes", "throughput", "db_write", "authz")
+
+
+def _run(args: argparse.Namespace) -> int:
+    # Deferred so `compare` never pays for importing the app.
+    from benchmarks import authz, db_write, first_request, fixtures, routes, startup, throughput
+
+    suites = set(args.only.split(",")) if args.only else set(SUITES)
+    scales = [int(scale) for scale in args.scales.split(",")]
+    metrics: dict[str, float] = {}
+
+    if "import" in suites:
+        timings, _ = import_time.measure("zapp_atlas.main", args.import_runs)
+        metrics["import.zapp_atlas.main.median_ms"] = statistics.median(timings) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if "startup" in suites:
+            db = fixtures.synthetic_database(args.cache_dir, scales[0], Path(tmp) / "startup.db")
+            metrics.update(startup.measure(db, args.startup_runs))
+
+        if "first_request" in suites:
+            metrics.update(first_request.measure(args.first_request_runs))
+
+        if "routes" in suites:
+            for studies in scales:
+                print(f"routes: {studies} studies", file=sys.stderr)
+                db = fixtures.synthetic_database(
+                    args.cache_dir, studies, Path(tmp) / f"routes-{studies}.db"
+                )
+                metrics.update(routes.measure(db, studies, args.iterations))
+
+        if "throughput" in suites:
+            studies = scales[0]
+            db = fixtures.synthetic_database(args.cache_dir, studies, Path(tmp) / "throughput.db")
+            workers = [int(n) for n in args.workers.split(",")]
+            metrics.update(throughput.measure(db, studies, workers, args.clients, args.duration))
+
+        if "db_write" in suites:
+            metrics.update(db_write.measure(Path(tmp), args.writes, args.fuse_dir))
+
+        if "authz" in suites:
+            (Path(tmp) / "authz").mkdir()
+            metrics.update(authz.measure(Path(tmp) / "authz", args.writes))
+
+    for name, value in sorted(metrics.items()):
+        print(f"{value:10.2f} ms  {name}")
+    if args.out:
+        results.save(args.out, metrics)
+        print(f"wrote {args.out}", file=sys.stderr)
+    return 0
+
+
+def _parse_overrides(values: list[str]) -> dict[str, float]:
+    overrides = {}
+    for value in values:
+        pattern, _, threshold = value.rpartition("=")
+        overrides[pattern] = float(threshold)
+    return overrides
+
+
+def _compare(args: argparse.Namespace) -> int:
+    if not args.baseline.exists():
+        print(
+            f"no baseline at {args.baseline}; record one on main with `just bench-baseline`",
+            file=sys.stderr,
+        )
+        return 2
+    regressions, changes = results.compare(
+        results.load(args.baseline),
+        results.load(args.current),
+        threshold=args.threshold,
+        overrides=_parse_overrides(args.metric_threshold),
+        min_delta_ms=args.min_delta_ms,
+    )
+    flagged = {change.metric for change in regressions}
+    for change in changes:
+        mark = "REGRESSED" if change.metric in flagged else ""
+        print(
+            f"{change.baseline:10.2f} -> {change.current:10.2f} ms "
+            f"({change.ratio - 1:+7.1%}, limit {change.threshold:+.0%})  {change.metric}  {mark}"
+        )
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite and print (or save) the results")
+    run.add_argument("--only", help=f"comma-separated subset of {','.join(SUITES)}")
+    run.add_argument("--scales", default=DEFAULT_SCALES, help="study counts for route benchmarks")
+    run.add_argument("--iterations", type=int, default=50, help="timed requests per route")
+    run.add_argument("--import-runs", type=int, default=5)
+    run.add_argument("--startup-runs", type=int, default=5)
+    run.add_argument("--first-request-runs", type=int, default=5)
+    run.add_argument("--workers", default="1,2,4", help="server worker counts for throughput")
+    run.add_argument("--clients", type=int, default=16, help="concurrent load-generating clients")
+    run.add_argument("--duration", type=float, default=10.0, help="seconds of load per count")
+    run.add_argument(
+        "--writes", type=int, default=500, help="timed commits per db_write and authz case"
+    )
+    run.add_argument(
+        "--fuse-dir", type=Path, help="also time db_write on this mounted bucket directory"
+    )
+    run.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    run.add_argument("--out", type=Path, help="write the results here as JSON")
+    run.set_defaults(handler=_run)
+
+    cmp = commands.add_parser("compare", help="fail if CURRENT regressed against BASELINE")
+    cmp.add_argument("baseline", type=Path)
+    cmp.add_argument("current", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.25, help="allowed growth, e.g. 0.25")
+    cmp.add_argument(
+        "--metric-threshold",
+        action="append",
+        default=[],
+        metavar="GLOB=FRACTION",
+        help="per-metric threshold, e.g. 'routes.100000.*=0.5'; repeatable",
+    )
+    cmp.add_argument("--min-delta-ms", type=float, default=1.0)
+    cmp.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""What authorizing a research group write adds to its latency.
+
+Each write is a ``POST /api/chemical-cabinet`` and the ``DELETE`` of the
+entry it made, through ``TestClient`` against a SQLite file, by a signed-in
+member of the group. Three cases:
+
+* ``unchecked``: ``get_group_permissions`` overridden to grant the group
+  outright, so no identity or role lookup happens;
+* ``cached``: the real check, answered from the warm ``PermissionCache``;
+* ``uncached``: the real check with a zero TTL, reading the identity's
+  roles from ``ResearchGroupMember`` on every request.
+
+The difference between ``cached`` and ``unchecked`` is what the check
+costs a write; it should be lost in the noise of the commit itself::
+
+    uv run python -m benchmarks.authz --writes 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from zapp_atlas.auth.permissions import (
+    ADMIN,
+    GroupPermissions,
+    PermissionCache,
+    get_group_permissions,
+    member_id,
+)
+from zapp_atlas.main import create_app
+from zapp_atlas.settings import AppSettings
+
+ORCID_ID = "0000-0002-1825-0097"
+
+
+def _write(client: TestClient, group_id: int) -> float:
+    start = time.perf_counter()
+    res = client.post(
+        "/api/chemical-cabinet", json={"research_group": group_id, "chemical_id": "CHEBI:1"}
+    )
+    res.raise_for_status()
+    client.delete(f"/api/chemical-cabinet/{res.json()['id']}").raise_for_status()
+    return time.perf_counter() - start
+
+
+def _summary(case: str, timings: list[float]) -> dict[str, float]:
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+    print(f"authz: {case} p50 {p50:.2f} ms, p99 {p99:.2f} ms", file=sys.stderr)
+    return {f"authz.{case}.p50_ms": p50, f"authz.{case}.p99_ms": p99}
+
+
+def measure(tmp: Path, writes: int, warmup: int = 20) -> dict[str, float]:
+    """p50/p99 milliseconds per write, keyed ``authz.<case>``."""
+    settings = AppSettings(
+        db_path=tmp / "authz.db", upload_dir=tmp, skip_seed=True, dev_auth=True, _env_file=None
+    )
+    app = create_app(settings)
+    results: dict[str, float] = {}
+    with TestClient(app) as client:
+        client.post(
+            "/auth/dev/login", data={"name": "Bench", "orcid_id": ORCID_ID}
+        ).raise_for_status()
+        res = client.post("/api/research-groups", json={"name": "Bench lab"})
+        res.raise_for_status()
+        group_id = res.json()["id"]
+
+        unchecked = lambda: GroupPermissions(member_id(ORCID_ID), {group_id: ADMIN})
+        cached = PermissionCache(settings.permission_cache_seconds)
+        uncached = PermissionCache(0)
+        timings: dict[str, list[float]] = {"unchecked": [], "cached": [], "uncached": []}
+        # Taking turns, so drift in the database file or the machine hits
+        # every case alike.
+        for i in range(warmup + writes):
+            for case, samples in timings.items():
+                if case == "unchecked":
+                    app.dependency_overrides[get_group_permissions] = unchecked
+                else:
+                    app.dependency_overrides.pop(get_group_permissions, None)
+                    app.state.permissions = cached if case == "cached" else uncached
+                elapsed = _write(client, group_id)
+                if i >= warmup:
+                    samples.append(elapsed)
+        for case, samples in timings.items():
+            results.update(_summary(case, samples))
+
+    overhead = results["authz.cached.p50_ms"] - results["authz.unchecked.p50_ms"]
+    print(f"authz: the cached check adds {overhead:+.2f} ms at p50", file=sys.stderr)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics = measure(Path(tmp), args.writes)
+    for name, value in sorted(metrics.items()):
+        print(f"{value:10.2f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
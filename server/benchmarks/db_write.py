@@ -0,0 +1,94 @@
+"""Commit latency of a single-row write, by where the database lives.
+
+``local`` is the WAL database on local disk; ``replicated`` is the same
+with a ``Replicator`` shipping the WAL to a filesystem bucket in the
+background, as the lifespan runs it. ``--fuse-dir`` adds a run on a
+mounted bucket (e.g. the Cloud Storage FUSE volume) in rollback-journal
+mode, which is what the deployment used before replication.
+
+Each write opens a session and commits one row through the app's engine,
+so the numbers include the engine's pragmas but no HTTP.
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from zapp_atlas.db import get_engine
+from zapp_atlas.db.image_storage import LocalFilesystemStorage
+from zapp_atlas.db.replication import Replicator
+from zapp_atlas.settings import AppSettings
+
+
+def _commit_latencies(settings: AppSettings, writes: int) -> list[float]:
+    engine = get_engine(settings=settings)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS bench (id INTEGER PRIMARY KEY, x TEXT)"))
+        timings = []
+        for i in range(writes):
+            start = time.perf_counter()
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO bench (x) VALUES (:x)"), {"x": f"row-{i}"})
+            timings.append(time.perf_counter() - start)
+        return timings
+    finally:
+        engine.dispose()
+
+
+def _settings(db_path: Path, **overrides) -> AppSettings:
+    return AppSettings(
+        db_path=db_path, upload_dir=db_path.parent, skip_seed=True, _env_file=None, **overrides
+    )
+
+
+def _replicated(db_path: Path, writes: int) -> list[float]:
+    settings = _settings(db_path, replica_prefix="replica")
+    get_engine(settings=settings).dispose()  # create the file in WAL mode
+    replicator = Replicator(
+        db_path, LocalFilesystemStorage(db_path.parent / "bucket"), settings.replica_prefix
+    )
+    stop = threading.Event()
+
+    def ship() -> None:
+        while not stop.wait(settings.replica_sync_interval_seconds):
+            replicator.sync()
+
+    shipper = threading.Thread(target=ship)
+    shipper.start()
+    try:
+        return _commit_latencies(settings, writes)
+    finally:
+        stop.set()
+        shipper.join()
+        replicator.close()
+
+
+def _summary(case: str, timings: list[float]) -> dict[str, float]:
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+    print(f"db_write: {case} p50 {p50:.2f} ms, p99 {p99:.2f} ms", file=sys.stderr)
+    return {f"db_write.{case}.p50_ms": p50, f"db_write.{case}.p99_ms": p99}
+
+
+def measure(tmp: Path, writes: int, fuse_dir: Path | None = None) -> dict[str, float]:
+    """p50/p99 commit milliseconds, keyed ``db_write.<case>``."""
+    results = {}
+    results.update(_summary("local", _commit_latencies(_settings(tmp / "local.db"), writes)))
+    (tmp / "replicated").mkdir()
+    results.update(_summary("replicated", _replicated(tmp / "replicated" / "zapp.db", writes)))
+    if fuse_dir:
+        db_path = fuse_dir / "zapp-bench.db"
+        try:
+            timings = _commit_latencies(_settings(db_path, sqlite_journal_mode="delete"), writes)
+        finally:
+            db_path.unlink(missing_ok=True)
+        results.update(_summary("fuse", timings))
+    return results
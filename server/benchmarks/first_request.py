@@ -0,0 +1,89 @@
+"""Latency of the first requests a freshly started process serves.
+
+After Fly starts a machine from zero, the first reader of ``/`` or
+``/login`` used to wait while Jinja compiled the templates behind it. Each
+run here is a new interpreter that starts the app (lifespan included) and
+times its first ``GET /`` and ``GET /login``, once compiling templates from
+source and once loading them from a bytecode cache filled beforehand, the
+way the Docker image ships::
+
+    uv run python -m benchmarks.first_request --runs 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PATHS = ("/", "/login")
+
+_PROBE = """
+import json, sys, time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from zapp_atlas.main import create_app
+from zapp_atlas.settings import AppSettings
+
+tmp, cache = Path(sys.argv[1]), sys.argv[2] or None
+settings = AppSettings(
+    db_path=tmp / "zapp.db", upload_dir=tmp, skip_seed=True, template_cache_dir=cache,
+    _env_file=None,
+)
+timings = {}
+start = time.perf_counter()
+with TestClient(create_app(settings)) as client:
+    timings["startup"] = time.perf_counter() - start
+    for path in sys.argv[3:]:
+        start = time.perf_counter()
+        client.get(path).raise_for_status()
+        timings["GET " + path] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def _cold_start(cache_dir: Path | None) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, tmp, str(cache_dir or ""), *PATHS],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def measure(runs: int) -> dict[str, float]:
+    """Median milliseconds to start, and to serve each of ``PATHS`` first."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # In its own process, leaving this one's templates as they were.
+        subprocess.run(
+            [sys.executable, "-m", "zapp_atlas.html.templating", cache_dir],
+            capture_output=True,
+            check=True,
+        )
+        for case, cache in (("source", None), ("bytecode_cache", Path(cache_dir))):
+            runs_timings = [_cold_start(cache) for _ in range(runs)]
+            for name in runs_timings[0]:
+                median = statistics.median(timings[name] for timings in runs_timings)
+                metrics[f"first_request.{case}.{name}.median_ms"] = median * 1000
+    return metrics
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    for name, value in sorted(measure(args.runs).items()):
+        print(f"{value:10.2f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
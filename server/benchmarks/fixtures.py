@@ -0,0 +1,24 @@
+"""Synthetic databases for the route benchmarks.
+
+Built by ``zapp_atlas.synth`` at its default phenotypes-per-study ratio and
+fixed seed, so every run at a given scale reads the same rows. Built
+databases are kept in a cache directory and copied per run, so write
+benchmarks never dirty the cached file.
+"""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+from zapp_atlas import synth
+
+
+def synthetic_database(cache_dir: Path, studies: int, dest: Path) -> Path:
+    """Copy a database of ``studies`` studies to ``dest``, building it on first use."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cached = cache_dir / f"atlas-{studies}-seed{synth.DEFAULT_SEED}.db"
+    if not cached.exists():
+        synth.build(cached, studies=studies, phenotypes=studies * synth.PHENOTYPES_PER_STUDY)
+    shutil.copyfile(cached, dest)
+    return dest
@@ -0,0 +1,82 @@
+"""How long a fresh process takes to import the app.
+
+This is the cold-start cost paid by the first request after Fly scales the
+machine back up from zero. Each run is a new interpreter, so nothing is
+already in ``sys.modules``::
+
+    uv run python -m benchmarks.import_time --runs 10 --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, any(name.startswith("linkml") for name in sys.modules))
+"""
+
+
+def measure(module: str, runs: int) -> tuple[list[float], bool]:
+    """Import ``module`` in ``runs`` fresh interpreters; return the timings in
+    seconds and whether LinkML was loaded."""
+    timings = []
+    loaded_linkml = False
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        timings.append(float(out[0]))
+        loaded_linkml |= out[1] == "True"
+    return timings, loaded_linkml
+
+
+def slowest_imports(module: str, top: int) -> list[tuple[int, str]]:
+    """The ``top`` modules with the largest cumulative import time (µs)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (
+            part.strip() for part in line.removeprefix("import time:").split("|")
+        )
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="zapp_atlas.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = parser.parse_args(argv)
+
+    timings, loaded_linkml = measure(args.module, args.runs)
+    print(f"import {args.module}: {args.runs} runs")
+    print(f"  min    {min(timings) * 1000:8.1f} ms")
+    print(f"  median {statistics.median(timings) * 1000:8.1f} ms")
+    print(f"  max    {max(timings) * 1000:8.1f} ms")
+    print(f"  linkml loaded: {'yes' if loaded_linkml else 'no'}")
+    if args.top:
+        print("slowest imports (cumulative):")
+        for micros, name in slowest_imports(args.module, args.top):
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
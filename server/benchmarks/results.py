@@ -0,0 +1,85 @@
+"""Benchmark results as JSON, and the regression gate between two of them.
+
+A result file is ``{"meta": {...}, "metrics": {name: milliseconds}}``; every
+metric is a duration, so lower is better. ``compare`` flags a metric when it
+grew by more than its threshold (a fraction of the baseline) *and* by more
+than ``min_delta_ms``, which keeps sub-millisecond noise from failing a run.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import sys
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from fnmatch import fnmatch
+from pathlib import Path
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(path: Path, metrics: dict[str, float]) -> None:
+    meta = {
+        "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+    rounded = {name: round(value, 3) for name, value in sorted(metrics.items())}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta, "metrics": rounded}, indent=2) + "\n")
+
+
+def load(path: Path) -> dict[str, float]:
+    return json.loads(path.read_text())["metrics"]
+
+
+@dataclass
+class Change:
+    metric: str
+    baseline: float
+    current: float
+    threshold: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def compare(
+    baseline: dict[str, float],
+    current: dict[str, float],
+    *,
+    threshold: float = 0.25,
+    overrides: dict[str, float] | None = None,
+    min_delta_ms: float = 1.0,
+) -> tuple[list[Change], list[Change]]:
+    """Return ``(regressions, all_changes)`` for the metrics both runs share.
+
+    ``overrides`` maps glob patterns over metric names to their own
+    threshold; the first matching pattern wins.
+    """
+    changes, regressions = [], []
+    for metric in sorted(baseline.keys() & current.keys()):
+        limit = next(
+            (value for pattern, value in (overrides or {}).items() if fnmatch(metric, pattern)),
+            threshold,
+        )
+        change = Change(metric, baseline[metric], current[metric], limit)
+        changes.append(change)
+        grew = change.current - change.baseline
+        if grew > min_delta_ms and change.ratio > 1 + limit:
+            regressions.append(change)
+    return regressions, changes
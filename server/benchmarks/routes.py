@@ -0,0 +1,108 @@
+"""Per-route latency of the CRUD API against a synthetic database.
+
+Requests go through ``TestClient``, in process: the numbers cover routing,
+validation, the ORM and SQLite, not the network or the ASGI server. Write
+routes create, patch and delete their own rows so the database keeps its
+size across iterations.
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from zapp_atlas.main import create_app
+from zapp_atlas.settings import AppSettings
+
+STUDY = {
+    "publication": "PMID:bench",
+    "lab": "ZFIN:ZDB-LAB-1-1",
+    "annotator": ["ORCID:0000-0002-1825-0097"],
+    "experiment": [],
+}
+
+
+@dataclass
+class Route:
+    """One benchmarked request.
+
+    ``path`` is called with a random existing id and the number of studies.
+    """
+
+    name: str
+    method: str
+    path: Callable[[int, int], str]
+    body: dict | None = None
+
+
+ROUTES = [
+    Route("GET /api/studies", "GET", lambda i, n: "/api/studies?limit=50"),
+    Route(
+        "GET /api/studies (deep page)", "GET", lambda i, n: f"/api/studies?limit=50&offset={n // 2}"
+    ),
+    Route("GET /api/studies/{id}", "GET", lambda i, n: f"/api/studies/{i}"),
+    Route(
+        "PATCH /api/studies/{id}",
+        "PATCH",
+        lambda i, n: f"/api/studies/{i}",
+        {"lab": "ZFIN:ZDB-LAB-2-2"},
+    ),
+    Route("GET /api/experiments", "GET", lambda i, n: "/api/experiments?limit=50"),
+    Route("GET /api/experiments/{id}", "GET", lambda i, n: f"/api/experiments/{i}"),
+    Route("GET /api/exposures/{id}", "GET", lambda i, n: f"/api/exposures/{i}"),
+    Route("GET /api/observations/{id}", "GET", lambda i, n: f"/api/observations/{i}"),
+]
+
+
+def _timed(client: TestClient, method: str, path: str, body: dict | None) -> tuple[float, dict]:
+    start = time.perf_counter()
+    res = client.request(method, path, json=body)
+    elapsed = time.perf_counter() - start
+    if res.status_code >= 400:
+        raise RuntimeError(f"{method} {path} -> {res.status_code}: {res.text[:200]}")
+    return elapsed, (res.json() if res.content else {})
+
+
+def _summarize(prefix: str, samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        f"{prefix}.p50_ms": statistics.median(ordered) * 1000,
+        f"{prefix}.p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+    }
+
+
+def measure(db_path: Path, studies: int, iterations: int, warmup: int = 5) -> dict[str, float]:
+    """p50/p95 milliseconds per route, keyed ``routes.<studies>.<route>``."""
+    settings = AppSettings(
+        db_path=db_path, upload_dir=db_path.parent, skip_seed=True, _env_file=None
+    )
+    rng = random.Random(studies)
+    results: dict[str, float] = {}
+    with TestClient(create_app(settings)) as client:
+        for route in ROUTES:
+            samples = []
+            for i in range(warmup + iterations):
+                path = route.path(rng.randint(1, studies), studies)
+                elapsed, _ = _timed(client, route.method, path, route.body)
+                if i >= warmup:
+                    samples.append(elapsed)
+            results.update(_summarize(f"routes.{studies}.{route.name}", samples))
+
+        # Create and delete are measured as a pair so the row count holds.
+        created, deleted = [], []
+        for i in range(warmup + iterations):
+            elapsed, study = _timed(client, "POST", "/api/studies", STUDY)
+            if i >= warmup:
+                created.append(elapsed)
+            elapsed, _ = _timed(client, "DELETE", f"/api/studies/{study['id']}", None)
+            if i >= warmup:
+                deleted.append(elapsed)
+        results.update(_summarize(f"routes.{studies}.POST /api/studies", created))
+        results.update(_summarize(f"routes.{studies}.DELETE /api/studies/{{id}}", deleted))
+    return results
@@ -0,0 +1,46 @@
+"""Time from ``create_app`` to the lifespan being ready to serve.
+
+Imports are excluded (see ``import_time``); what remains is building the
+app, creating the engine, ``init_db`` and the startup checks. Measured both
+on an empty database file and on one that already holds data, since the
+first is the fresh-volume case and the second every later boot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from zapp_atlas.main import create_app
+from zapp_atlas.settings import AppSettings
+
+
+async def _time_to_ready(settings: AppSettings) -> float:
+    start = time.perf_counter()
+    app = create_app(settings)
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - start
+    app.state.engine.dispose()
+    return ready
+
+
+def measure(populated_db: Path, runs: int) -> dict[str, float]:
+    """Median milliseconds to readiness on an empty and on a populated database."""
+    empty, populated = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings = AppSettings(
+                db_path=Path(tmp) / "zapp.db", upload_dir=Path(tmp), skip_seed=True, _env_file=None
+            )
+            empty.append(asyncio.run(_time_to_ready(settings)))
+            settings = AppSettings(
+                db_path=populated_db, upload_dir=Path(tmp), skip_seed=True, _env_file=None
+            )
+            populated.append(asyncio.run(_time_to_ready(settings)))
+    return {
+        "startup.empty_db.median_ms": statistics.median(empty) * 1000,
+        "startup.populated_db.median_ms": statistics.median(populated) * 1000,
+    }
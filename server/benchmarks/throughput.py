@@ -0,0 +1,115 @@
+"""Requests per second through ``zapp_atlas.serve`` as workers are added.
+
+Each worker count gets a fresh server process on a copy of the synthetic
+database. Load comes from separate client processes, each sending one
+request at a time for a fixed duration: mostly study reads, with a share
+of PATCHes so writers contend for SQLite's lock. Results are reported as
+milliseconds of wall time per request (the inverse of throughput), so the
+regression gate's "lower is better" holds.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+WRITE_SHARE = 0.1
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _client(base: str, studies: int, duration: float, seed: int) -> tuple[int, int, float]:
+    """Send requests for ``duration`` seconds; return (completed, failed, elapsed)."""
+    rng = random.Random(seed)
+    done = failed = 0
+    with httpx.Client(base_url=base, timeout=30) as client:
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            study_id = rng.randint(1, studies)
+            if rng.random() < WRITE_SHARE:
+                res = client.patch(
+                    f"/api/studies/{study_id}", json={"lab": f"ZFIN:ZDB-LAB-{done}-1"}
+                )
+            else:
+                res = client.get(f"/api/studies/{study_id}")
+            done += 1
+            failed += res.status_code >= 400
+        return done, failed, time.perf_counter() - start
+
+
+def _start(db_path: Path, workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(SRC),
+        "ZAPP_WORKERS": str(workers),
+        "ZAPP_DB_PATH": str(db_path),
+        "ZAPP_UPLOAD_DIR": str(db_path.parent / "uploads"),
+        "ZAPP_SKIP_SEED": "true",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "zapp_atlas.serve", "--port", str(port)],
+        cwd=db_path.parent,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.kill()
+                raise RuntimeError(f"server with {workers} workers did not start") from None
+            time.sleep(0.1)
+
+
+def measure(
+    db_path: Path, studies: int, worker_counts: list[int], clients: int, duration: float
+) -> dict[str, float]:
+    """Milliseconds per request at each worker count, keyed ``throughput.workers-<n>``."""
+    results: dict[str, float] = {}
+    for workers in worker_counts:
+        run_db = db_path.with_name(f"throughput-{workers}.db")
+        shutil.copyfile(db_path, run_db)
+        port = _free_port()
+        server = _start(run_db, workers, port)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            with ProcessPoolExecutor(clients) as pool:
+                outcomes = list(
+                    pool.map(
+                        _client,
+                        [base] * clients,
+                        [studies] * clients,
+                        [duration] * clients,
+                        range(clients),
+                    )
+                )
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+        done = sum(completed for completed, _, _ in outcomes)
+        failed = sum(errors for _, errors, _ in outcomes)
+        if failed:
+            raise RuntimeError(f"{failed} of {done} requests failed with {workers} workers")
+        per_second = sum(completed / elapsed for completed, _, elapsed in outcomes)
+        print(f"throughput: {workers} workers, {per_second:.0f} req/s", file=sys.stderr)
+        results[f"throughput.workers-{workers}.ms_per_request"] = 1000 / per_second
+    return results
@@ -9,6 +9,7 @@ from fastapi import Request
 from sqlalchemy.orm import Session
 
 from zapp_atlas.db import get_engine, get_session_factory
+from zapp_atlas.db.image_storage import Storage, get_storage
 from zapp_atlas.settings import AppSettings, load_settings
 
 
@@ -47,3 +48,12 @@ def get_app_settings(request: Request) -> AppSettings:
         settings = load_settings()
         request.app.state.settings = settings
     return settings
+
+
+def get_app_storage(request: Request) -> Storage:
+    """The app's blob storage backend, created once and shared by every request."""
+    storage = getattr(request.app.state, "storage", None)
+    if storage is None:
+        storage = get_storage(get_app_settings(request))
+        request.app.state.storage = storage
+    return storage
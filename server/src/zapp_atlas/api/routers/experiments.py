@@ -25,7 +25,6 @@ from zapp_atlas.api.services.experiments import (
     list_experiments,
     patch_experiment,
 )
-from zapp_atlas.db.image_storage import Storage, get_storage
 
 from zapp_atlas.schema.pydantic_crud import (
     ExperimentCreate,
@@ -100,9 +99,8 @@ def patch_experiment_endpoint(
 def delete_experiment_endpoint(
     experiment_id: int,
     session: Annotated[Session, Depends(get_session)],
-    storage: Annotated[Storage, Depends(get_storage)],
 ) -> None:
-    if not delete_experiment(session, experiment_id, storage=storage):
+    if not delete_experiment(session, experiment_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Experiment not found",
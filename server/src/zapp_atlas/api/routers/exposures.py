@@ -19,7 +19,6 @@ from zapp_atlas.api.services.exposures import (
     get_exposure_by_id,
     patch_exposure,
 )
-from zapp_atlas.db.image_storage import Storage, get_storage
 
 from zapp_atlas.schema.pydantic_crud import (
     ExposureEventCreate,
@@ -86,9 +85,8 @@ def patch_exposure_endpoint(
 def delete_exposure_endpoint(
     exposure_id: int,
     session: Annotated[Session, Depends(get_session)],
-    storage: Annotated[Storage, Depends(get_storage)],
 ) -> None:
-    if not delete_exposure(session, exposure_id, storage=storage):
+    if not delete_exposure(session, exposure_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Exposure not found"
         )
@@ -1,11 +1,15 @@
 """Image upload / fetch endpoints.
 
 * POST /observations/{observation_id}/images — multipart upload
+* POST /observations/{observation_id}/images:initiate — presigned direct upload
+* POST /observations/{observation_id}/images:finalize — register a direct upload
 * GET /images/{image_id} — stream bytes (local) or redirect to signed URL (S3)
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 from typing import Annotated
 
 from fastapi import (
@@ -18,19 +22,28 @@ from fastapi import (
     status,
 )
 from fastapi.responses import RedirectResponse, Response
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from zapp_atlas.api.deps import get_app_settings, get_session
+from zapp_atlas.api.deps import get_app_settings, get_app_storage, get_session
 from zapp_atlas.api.services.images import (
+    DirectUploadUnsupportedError,
+    ImageBatchError,
+    ImageBatchRejectedError,
     ImageTooLargeError,
+    ImageUpload,
     UnsupportedImageTypeError,
+    UploadNotFoundError,
     create_image_for_observation,
+    create_images_for_observation,
     delete_image,
+    finalize_direct_upload,
+    initiate_direct_upload,
     get_image_by_id,
     image_url,
     load_image_bytes,
 )
-from zapp_atlas.db.image_storage import Storage, get_storage
+from zapp_atlas.db.image_storage import Storage
 from zapp_atlas.settings import AppSettings
 
 from zapp_atlas.schema.pydantic_crud import ImageRead
@@ -39,15 +52,40 @@ from zapp_atlas.schema.pydantic_crud import ImageRead
 router = APIRouter(tags=["images"])
 
 
-def get_storage_dep(
-    settings: Annotated[AppSettings, Depends(get_app_settings)],
-) -> Storage:
-    return get_storage(settings)
-
-
 SessionDep = Annotated[Session, Depends(get_session)]
 SettingsDep = Annotated[AppSettings, Depends(get_app_settings)]
-StorageDep = Annotated[Storage, Depends(get_storage_dep)]
+StorageDep = Annotated[Storage, Depends(get_app_storage)]
+
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Public bucket URLs never expire, but an image can still be deleted.
+_PUBLIC_REDIRECT_MAX_AGE = 3600
+
+
+async def _read_upload(file: UploadFile, max_bytes: int) -> tuple[bytes, str]:
+    """Read an upload in chunks, hashing as it goes.
+
+    Returns the bytes and their hex SHA-256. Stops reading as soon as the
+    upload passes ``max_bytes`` rather than buffering all of an oversized file.
+    """
+    digest = hashlib.sha256()
+    chunks: list[bytes] = []
+    size = 0
+    while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+        size += len(chunk)
+        if size > max_bytes:
+            raise ImageTooLargeError(f"{size} > {max_bytes}")
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+def _image_rejected(exc: ValueError) -> HTTPException:
+    if isinstance(exc, UnsupportedImageTypeError):
+        return HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type: {exc}",
+        )
+    return HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc))
 
 
 @router.post(
@@ -65,9 +103,8 @@ async def upload_image_endpoint(
     resolution: Annotated[str | None, Form()] = None,
     scale_bar: Annotated[str | None, Form()] = None,
 ) -> ImageRead:
-    data = await file.read()
-
     try:
+        data, checksum = await _read_upload(file, settings.max_upload_bytes)
         image = create_image_for_observation(
             session,
             observation_id=observation_id,
@@ -78,16 +115,210 @@ async def upload_image_endpoint(
             magnification=magnification,
             resolution=resolution,
             scale_bar=scale_bar,
+            content_addressed=settings.content_addressed_images,
+            checksum=checksum,
         )
-    except UnsupportedImageTypeError as exc:
+    except (UnsupportedImageTypeError, ImageTooLargeError) as exc:
+        raise _image_rejected(exc) from exc
+
+    if image is None:
         raise HTTPException(
-            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-            detail=f"Unsupported content type: {exc}",
-        ) from exc
-    except ImageTooLargeError as exc:
+            status_code=status.HTTP_404_NOT_FOUND, detail="Observation not found"
+        )
+    return image  # type: ignore[return-value]
+
+
+class BatchImageResult(BaseModel):
+    """The outcome for one file of a batch upload, in request order."""
+
+    filename: str | None
+    image: ImageRead | None = None
+    error: str | None = None
+
+
+def _batch_failed(
+    files: list[UploadFile], errors: dict[int, Exception], status_code: int
+) -> HTTPException:
+    results = [
+        BatchImageResult(
+            filename=file.filename,
+            error=(
+                f"{type(errors[index]).__name__}: {errors[index]}"
+                if index in errors
+                else "Not stored: another file in the batch failed"
+            ),
+        ).model_dump()
+        for index, file in enumerate(files)
+    ]
+    return HTTPException(status_code=status_code, detail=results)
+
+
+@router.post(
+    "/observations/{observation_id}/images:batch",
+    response_model=list[BatchImageResult],
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_images_endpoint(
+    observation_id: int,
+    session: SessionDep,
+    settings: SettingsDep,
+    storage: StorageDep,
+    files: Annotated[list[UploadFile], File()],
+    magnification: Annotated[str | None, Form()] = None,
+    resolution: Annotated[str | None, Form()] = None,
+    scale_bar: Annotated[str | None, Form()] = None,
+) -> list[BatchImageResult]:
+    """Upload many images to one observation; all are kept or none are.
+
+    On failure the response lists every file with what went wrong: 422 if
+    files were refused up front, 502 if storage failed part way through.
+    """
+    if len(files) > settings.max_batch_upload_files:
         raise HTTPException(
             status_code=status.HTTP_413_CONTENT_TOO_LARGE,
-            detail=str(exc),
+            detail=f"At most {settings.max_batch_upload_files} files per batch",
+        )
+
+    uploads: list[ImageUpload] = []
+    too_large: dict[int, Exception] = {}
+    for index, file in enumerate(files):
+        try:
+            data, checksum = await _read_upload(file, settings.max_upload_bytes)
+        except ImageTooLargeError as exc:
+            too_large[index] = exc
+            continue
+        content_type = file.content_type or "application/octet-stream"
+        uploads.append(ImageUpload(data=data, content_type=content_type, checksum=checksum))
+    if too_large:
+        raise _batch_failed(files, too_large, status.HTTP_422_UNPROCESSABLE_CONTENT)
+
+    try:
+        # Blocking: the storage writes fan out to a thread pool of their own.
+        images = await asyncio.to_thread(
+            create_images_for_observation,
+            session,
+            observation_id=observation_id,
+            uploads=uploads,
+            storage=storage,
+            max_bytes=settings.max_upload_bytes,
+            content_addressed=settings.content_addressed_images,
+            max_workers=settings.upload_concurrency,
+            magnification=magnification,
+            resolution=resolution,
+            scale_bar=scale_bar,
+        )
+    except ImageBatchRejectedError as exc:
+        raise _batch_failed(files, exc.errors, status.HTTP_422_UNPROCESSABLE_CONTENT) from exc
+    except ImageBatchError as exc:
+        raise _batch_failed(files, exc.errors, status.HTTP_502_BAD_GATEWAY) from exc
+
+    if images is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Observation not found"
+        )
+    return [
+        BatchImageResult(filename=file.filename, image=ImageRead.model_validate(image))
+        for file, image in zip(files, images)
+    ]
+
+
+class DirectUploadRequest(BaseModel):
+    content_type: str
+    size: int | None = None
+
+
+class DirectUploadTicket(BaseModel):
+    upload_id: str
+    url: str
+    method: str
+    headers: dict[str, str]
+    expires_in: int
+
+
+class DirectUploadFinalize(BaseModel):
+    upload_id: str
+    magnification: str | None = None
+    resolution: str | None = None
+    scale_bar: str | None = None
+
+
+@router.post(
+    "/observations/{observation_id}/images:initiate",
+    response_model=DirectUploadTicket,
+    status_code=status.HTTP_201_CREATED,
+)
+def initiate_direct_upload_endpoint(
+    observation_id: int,
+    payload: DirectUploadRequest,
+    session: SessionDep,
+    settings: SettingsDep,
+    storage: StorageDep,
+) -> DirectUploadTicket:
+    """Step one of a direct upload: hand out a presigned URL.
+
+    The client then sends the bytes to ``url`` itself, with ``method`` and
+    exactly ``headers``, and calls ``:finalize`` with the ``upload_id``.
+    """
+    try:
+        granted = initiate_direct_upload(
+            session,
+            observation_id=observation_id,
+            content_type=payload.content_type,
+            size=payload.size,
+            storage=storage,
+            max_bytes=settings.max_upload_bytes,
+        )
+    except (UnsupportedImageTypeError, ImageTooLargeError) as exc:
+        raise _image_rejected(exc) from exc
+    except DirectUploadUnsupportedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads need bucket storage; POST the file to /images instead",
+        ) from exc
+
+    if granted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Observation not found"
+        )
+    pending, presigned = granted
+    return DirectUploadTicket(
+        upload_id=pending.id,
+        url=presigned.url,
+        method=presigned.method,
+        headers=presigned.headers,
+        expires_in=presigned.expires_in,
+    )
+
+
+@router.post(
+    "/observations/{observation_id}/images:finalize",
+    response_model=ImageRead,
+    status_code=status.HTTP_201_CREATED,
+)
+def finalize_direct_upload_endpoint(
+    observation_id: int,
+    payload: DirectUploadFinalize,
+    session: SessionDep,
+    settings: SettingsDep,
+    storage: StorageDep,
+) -> ImageRead:
+    try:
+        image = finalize_direct_upload(
+            session,
+            observation_id=observation_id,
+            upload_id=payload.upload_id,
+            storage=storage,
+            max_bytes=settings.max_upload_bytes,
+            magnification=payload.magnification,
+            resolution=payload.resolution,
+            scale_bar=payload.scale_bar,
+        )
+    except (UnsupportedImageTypeError, ImageTooLargeError) as exc:
+        raise _image_rejected(exc) from exc
+    except UploadNotFoundError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="No completed upload for this ticket; it may have expired",
         ) from exc
 
     if image is None:
@@ -103,30 +334,36 @@ def fetch_image_endpoint(
     session: SessionDep,
     storage: StorageDep,
 ):
-    if get_image_by_id(session, image_id) is None:
+    image = get_image_by_id(session, image_id)
+    if image is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
         )
 
-    url = image_url(image_id, storage)
+    url = image_url(session, image_id, storage)
     if url:
-        return RedirectResponse(url=url, status_code=status.HTTP_302_FOUND)
+        # The redirect may be cached for as long as its target stays valid.
+        max_age = _PUBLIC_REDIRECT_MAX_AGE if url.expires_in is None else url.expires_in
+        return RedirectResponse(
+            url=url.url,
+            status_code=status.HTTP_302_FOUND,
+            headers={"Cache-Control": f"public, max-age={max_age}"},
+        )
 
-    stored = load_image_bytes(image_id, storage)
+    stored = load_image_bytes(session, image_id, storage)
     if stored is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Image blob missing"
         )
-    return Response(content=stored.data, media_type=stored.content_type)
+    return Response(content=stored.data, media_type=image.content_type or stored.content_type)
 
 
 @router.delete("/images/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_image_endpoint(
     image_id: int,
     session: SessionDep,
-    storage: StorageDep,
 ) -> None:
-    if not delete_image(session, image_id, storage=storage):
+    if not delete_image(session, image_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
         )
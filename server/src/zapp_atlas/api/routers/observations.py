@@ -19,7 +19,6 @@ from zapp_atlas.api.services.observations import (
     get_observation_by_id,
     patch_observation,
 )
-from zapp_atlas.db.image_storage import Storage, get_storage
 
 from zapp_atlas.schema.pydantic_crud import (
     PhenotypeObservationSetCreate,
@@ -86,9 +85,8 @@ def patch_observation_endpoint(
 def delete_observation_endpoint(
     observation_id: int,
     session: Annotated[Session, Depends(get_session)],
-    storage: Annotated[Storage, Depends(get_storage)],
 ) -> None:
-    if not delete_observation(session, observation_id, storage=storage):
+    if not delete_observation(session, observation_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Observation not found"
         )
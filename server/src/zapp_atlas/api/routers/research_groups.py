@@ -0,0 +1,262 @@
+"""Research group endpoints.
+
+Any signed-in identity may create a group, becoming its first admin. The
+rest are writes scoped to one group, checked against the caller's cached
+roles (``auth.permissions``): admins manage members, members edit the
+chemical cabinet and fish tank. A group always keeps at least one admin.
+
+* POST /research-groups
+* GET /research-groups/{group_id}
+* POST /research-group-members
+* PATCH, DELETE /research-group-members/{member_id}
+* POST /chemical-cabinet
+* PATCH, DELETE /chemical-cabinet/{entry_id}
+* POST /fish-tank
+* PATCH, DELETE /fish-tank/{entry_id}
+"""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from zapp_atlas.api.deps import get_session
+from zapp_atlas.api.services.research_groups import (
+    DuplicateEntryError,
+    LastAdminError,
+    create_cabinet_entry,
+    create_member,
+    create_research_group,
+    create_tank_entry,
+    delete_cabinet_entry,
+    delete_member,
+    delete_tank_entry,
+    get_cabinet_entry,
+    get_member,
+    get_research_group,
+    get_tank_entry,
+    patch_cabinet_entry,
+    patch_member,
+    patch_tank_entry,
+)
+from zapp_atlas.auth.deps import CurrentIdentity
+from zapp_atlas.auth.permissions import ADMIN, MEMBER, Permissions, member_id
+from zapp_atlas.schema.pydantic_crud import (
+    ChemicalCabinetEntryCreate,
+    ChemicalCabinetEntryRead,
+    ChemicalCabinetEntryUpdate,
+    FishTankEntryCreate,
+    FishTankEntryRead,
+    FishTankEntryUpdate,
+    ResearchGroupCreate,
+    ResearchGroupMemberCreate,
+    ResearchGroupMemberRead,
+    ResearchGroupMemberUpdate,
+    ResearchGroupRead,
+)
+
+router = APIRouter(tags=["research groups"])
+
+
+def _not_found(what: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{what} not found")
+
+
+def _conflict(detail: str = "Already in this group") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+_LAST_ADMIN = "A research group needs at least one admin"
+
+
+def _require_move(permissions: Permissions, group_id: int | None, role: str) -> None:
+    """A patch moving a row to another group needs ``role`` there too."""
+    if group_id is not None:
+        permissions.require(group_id, role)
+
+
+@router.post(
+    "/research-groups", response_model=ResearchGroupRead, status_code=status.HTTP_201_CREATED
+)
+def create_research_group_endpoint(
+    payload: ResearchGroupCreate,
+    identity: CurrentIdentity,
+    session: Annotated[Session, Depends(get_session)],
+) -> ResearchGroupRead:
+    if identity is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Sign in first")
+    group = create_research_group(session, payload, admin=member_id(identity.orcid_id))
+    return ResearchGroupRead.model_validate(group, from_attributes=True)
+
+
+@router.get("/research-groups/{group_id}", response_model=ResearchGroupRead)
+def get_research_group_endpoint(
+    group_id: int,
+    session: Annotated[Session, Depends(get_session)],
+) -> ResearchGroupRead:
+    group = get_research_group(session, group_id)
+    if group is None:
+        raise _not_found("Research group")
+    return ResearchGroupRead.model_validate(group, from_attributes=True)
+
+
+# Members
+
+
+@router.post(
+    "/research-group-members",
+    response_model=ResearchGroupMemberRead,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_member_endpoint(
+    payload: ResearchGroupMemberCreate,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> ResearchGroupMemberRead:
+    permissions.require(payload.research_group, ADMIN)
+    try:
+        member = create_member(session, payload)
+    except DuplicateEntryError as exc:
+        raise _conflict() from exc
+    return ResearchGroupMemberRead.model_validate(member, from_attributes=True)
+
+
+@router.patch("/research-group-members/{member_id}", response_model=ResearchGroupMemberRead)
+def patch_member_endpoint(
+    member_id: int,
+    patch: ResearchGroupMemberUpdate,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> ResearchGroupMemberRead:
+    member = get_member(session, member_id)
+    if member is None:
+        raise _not_found("Member")
+    permissions.require(member.research_group, ADMIN)
+    _require_move(permissions, patch.research_group, ADMIN)
+    try:
+        member = patch_member(session, member_id, patch)
+    except DuplicateEntryError as exc:
+        raise _conflict() from exc
+    except LastAdminError as exc:
+        raise _conflict(_LAST_ADMIN) from exc
+    return ResearchGroupMemberRead.model_validate(member, from_attributes=True)
+
+
+@router.delete("/research-group-members/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_member_endpoint(
+    member_id: int,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> None:
+    member = get_member(session, member_id)
+    if member is None:
+        raise _not_found("Member")
+    permissions.require(member.research_group, ADMIN)
+    try:
+        delete_member(session, member_id)
+    except LastAdminError as exc:
+        raise _conflict(_LAST_ADMIN) from exc
+
+
+# Chemical cabinet
+
+
+@router.post(
+    "/chemical-cabinet",
+    response_model=ChemicalCabinetEntryRead,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_cabinet_entry_endpoint(
+    payload: ChemicalCabinetEntryCreate,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> ChemicalCabinetEntryRead:
+    permissions.require(payload.research_group, MEMBER)
+    try:
+        entry = create_cabinet_entry(session, payload)
+    except DuplicateEntryError as exc:
+        raise _conflict() from exc
+    return ChemicalCabinetEntryRead.model_validate(entry, from_attributes=True)
+
+
+@router.patch("/chemical-cabinet/{entry_id}", response_model=ChemicalCabinetEntryRead)
+def patch_cabinet_entry_endpoint(
+    entry_id: int,
+    patch: ChemicalCabinetEntryUpdate,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> ChemicalCabinetEntryRead:
+    entry = get_cabinet_entry(session, entry_id)
+    if entry is None:
+        raise _not_found("Chemical cabinet entry")
+    permissions.require(entry.research_group, MEMBER)
+    _require_move(permissions, patch.research_group, MEMBER)
+    try:
+        entry = patch_cabinet_entry(session, entry_id, patch)
+    except DuplicateEntryError as exc:
+        raise _conflict() from exc
+    return ChemicalCabinetEntryRead.model_validate(entry, from_attributes=True)
+
+
+@router.delete("/chemical-cabinet/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_cabinet_entry_endpoint(
+    entry_id: int,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> None:
+    entry = get_cabinet_entry(session, entry_id)
+    if entry is None:
+        raise _not_found("Chemical cabinet entry")
+    permissions.require(entry.research_group, MEMBER)
+    delete_cabinet_entry(session, entry_id)
+
+
+# Fish tank
+
+
+@router.post("/fish-tank", response_model=FishTankEntryRead, status_code=status.HTTP_201_CREATED)
+def create_tank_entry_endpoint(
+    payload: FishTankEntryCreate,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> FishTankEntryRead:
+    permissions.require(payload.research_group, MEMBER)
+    try:
+        entry = create_tank_entry(session, payload)
+    except DuplicateEntryError as exc:
+        raise _conflict() from exc
+    return FishTankEntryRead.model_validate(entry, from_attributes=True)
+
+
+@router.patch("/fish-tank/{entry_id}", response_model=FishTankEntryRead)
+def patch_tank_entry_endpoint(
+    entry_id: int,
+    patch: FishTankEntryUpdate,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> FishTankEntryRead:
+    entry = get_tank_entry(session, entry_id)
+    if entry is None:
+        raise _not_found("Fish tank entry")
+    permissions.require(entry.research_group, MEMBER)
+    _require_move(permissions, patch.research_group, MEMBER)
+    try:
+        entry = patch_tank_entry(session, entry_id, patch)
+    except DuplicateEntryError as exc:
+        raise _conflict() from exc
+    return FishTankEntryRead.model_validate(entry, from_attributes=True)
+
+
+@router.delete("/fish-tank/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_tank_entry_endpoint(
+    entry_id: int,
+    permissions: Permissions,
+    session: Annotated[Session, Depends(get_session)],
+) -> None:
+    entry = get_tank_entry(session, entry_id)
+    if entry is None:
+        raise _not_found("Fish tank entry")
+    permissions.require(entry.research_group, MEMBER)
+    delete_tank_entry(session, entry_id)
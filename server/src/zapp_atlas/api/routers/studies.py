@@ -9,9 +9,11 @@ from __future__ import annotations
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from zapp_atlas.api.deps import get_session
+from zapp_atlas.api.deps import get_app_storage, get_session
+from zapp_atlas.api.services.image_archive import iter_zip, study_archive_entries
 from zapp_atlas.api.services.studies import (
     create_study,
     delete_study,
@@ -19,7 +21,7 @@ from zapp_atlas.api.services.studies import (
     list_studies,
     patch_study,
 )
-from zapp_atlas.db.image_storage import Storage, get_storage
+from zapp_atlas.db.image_storage import Storage
 
 # LinkML-generated Pydantic CRUD models
 from zapp_atlas.schema.pydantic_crud import (
@@ -55,6 +57,23 @@ def get_study_endpoint(
     return _as_read(study)
 
 
+@router.get("/{study_id}/images.zip", response_class=StreamingResponse)
+def download_study_images_endpoint(
+    study_id: int,
+    session: Annotated[Session, Depends(get_session)],
+    storage: Annotated[Storage, Depends(get_app_storage)],
+) -> StreamingResponse:
+    """Every image of the study as one ZIP, built while it downloads."""
+    entries = study_archive_entries(session, study_id)
+    if entries is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Study not found")
+    return StreamingResponse(
+        iter_zip(entries, storage),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="study-{study_id}-images.zip"'},
+    )
+
+
 @router.get("", response_model=list[StudyRead])
 def list_studies_endpoint(
     session: Annotated[Session, Depends(get_session)],
@@ -81,9 +100,8 @@ def patch_study_endpoint(
 def delete_study_endpoint(
     study_id: int,
     session: Annotated[Session, Depends(get_session)],
-    storage: Annotated[Storage, Depends(get_storage)],
 ) -> None:
-    if not delete_study(session, study_id, storage=storage):
+    if not delete_study(session, study_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Study not found"
         )
@@ -12,7 +12,7 @@ from sqlalchemy.orm import Session
 
 from zapp_atlas.api.services.exposures import delete_exposure_row
 from zapp_atlas.api.services.studies import _experiment_from_create, _fish_from_payload
-from zapp_atlas.db.image_storage import Storage
+from zapp_atlas.db import retry_on_busy
 
 from zapp_atlas.schema.pydantic_crud import (
     ExperimentCreate,
@@ -25,6 +25,7 @@ from zapp_atlas.schema.sqla import (  # type: ignore
 )
 
 
+@retry_on_busy
 def create_experiment_for_study(
     session: Session,
     *,
@@ -56,6 +57,7 @@ def list_experiments(session: Session, *, limit: int = 50, offset: int = 0) -> l
     return list(q)
 
 
+@retry_on_busy
 def patch_experiment(
     session: Session, experiment_id: int, patch: ExperimentUpdate
 ) -> Optional[Experiment]:
@@ -78,22 +80,19 @@ def patch_experiment(
     return exp
 
 
-def delete_experiment_row(
-    session: Session, exp: Experiment, *, storage: Storage
-) -> None:
+def delete_experiment_row(session: Session, exp: Experiment) -> None:
     for exposure in list(exp.exposure_event or []):
-        delete_exposure_row(session, exposure, storage=storage)
+        delete_exposure_row(session, exposure)
     for control in list(exp.control or []):
         session.delete(control)
     session.delete(exp)
 
 
-def delete_experiment(
-    session: Session, experiment_id: int, *, storage: Storage
-) -> bool:
+@retry_on_busy
+def delete_experiment(session: Session, experiment_id: int) -> bool:
     exp = get_experiment_by_id(session, experiment_id)
     if exp is None:
         return False
-    delete_experiment_row(session, exp, storage=storage)
+    delete_experiment_row(session, exp)
     session.commit()
     return True
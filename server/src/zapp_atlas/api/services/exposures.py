@@ -15,7 +15,7 @@ from zapp_atlas.api.services.studies import (
     _stressor_from_create,
     _vehicle_from_payload,
 )
-from zapp_atlas.db.image_storage import Storage
+from zapp_atlas.db import retry_on_busy
 
 from zapp_atlas.schema.pydantic_crud import (
     ExposureEventCreate,
@@ -29,6 +29,7 @@ from zapp_atlas.schema.sqla import (  # type: ignore
 )
 
 
+@retry_on_busy
 def create_exposure_for_experiment(
     session: Session,
     *,
@@ -51,6 +52,7 @@ def get_exposure_by_id(session: Session, exposure_id: int) -> Optional[ExposureE
     return session.get(ExposureEvent, exposure_id)
 
 
+@retry_on_busy
 def patch_exposure(
     session: Session, exposure_id: int, patch: ExposureEventUpdate
 ) -> Optional[ExposureEvent]:
@@ -92,11 +94,9 @@ def patch_exposure(
     return ee
 
 
-def delete_exposure_row(
-    session: Session, ee: ExposureEvent, *, storage: Storage
-) -> None:
+def delete_exposure_row(session: Session, ee: ExposureEvent) -> None:
     for obs in list(ee.phenotype_observation or []):
-        delete_observation_row(session, obs, storage=storage)
+        delete_observation_row(session, obs)
     for stressor in list(ee.stressor or []):
         session.delete(stressor)
     session.query(VehicleOfTransmission).filter_by(
@@ -107,12 +107,11 @@ def delete_exposure_row(
     session.delete(ee)
 
 
-def delete_exposure(
-    session: Session, exposure_id: int, *, storage: Storage
-) -> bool:
+@retry_on_busy
+def delete_exposure(session: Session, exposure_id: int) -> bool:
     ee = get_exposure_by_id(session, exposure_id)
     if ee is None:
         return False
-    delete_exposure_row(session, ee, storage=storage)
+    delete_exposure_row(session, ee)
     session.commit()
     return True
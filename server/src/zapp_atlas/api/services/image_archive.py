@@ -0,0 +1,146 @@
+"""Streamed ZIP archives of a study's images.
+
+The archive is built while it is sent: ``zipfile`` writes into a sink that is
+drained after every chunk, so nothing touches disk and memory holds at most
+the blob being written plus the next one, which a worker thread fetches from
+storage in the meantime.
+"""
+
+from __future__ import annotations
+
+import logging
+import mimetypes
+import zipfile
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import Text, cast, func, literal, select
+from sqlalchemy.orm import Session
+
+from zapp_atlas.db.image_storage import Storage
+from zapp_atlas.db.models import ImageBlob
+from zapp_atlas.schema.sqla import (  # type: ignore
+    Experiment,
+    ExposureEvent,
+    Image,
+    PhenotypeObservationSet,
+    Study,
+)
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass
+class ArchiveEntry:
+    """One image in the archive: where it goes and where its bytes are."""
+
+    name: str
+    key: str
+
+
+def study_archive_entries(session: Session, study_id: int) -> Optional[list[ArchiveEntry]]:
+    """List a study's images as archive entries, or None if there is no such study.
+
+    Entries are named ``experiment-{id}/exposure-{id}/observation-{id}/image-{id}.ext``
+    and come from a single query, so the list is cheap next to the download.
+    """
+    if session.get(Study, study_id) is None:
+        return None
+
+    key = func.coalesce(ImageBlob.blob_key, literal("images/") + cast(Image.id, Text))
+    rows = session.execute(
+        select(
+            Experiment.id,
+            ExposureEvent.id,
+            PhenotypeObservationSet.id,
+            Image.id,
+            Image.content_type,
+            key,
+        )
+        .join(ExposureEvent, ExposureEvent.Experiment_id == Experiment.id)
+        .join(PhenotypeObservationSet, PhenotypeObservationSet.ExposureEvent_id == ExposureEvent.id)
+        .join(Image, Image.PhenotypeObservationSet_id == PhenotypeObservationSet.id)
+        .outerjoin(ImageBlob, ImageBlob.image_id == Image.id)
+        .where(Experiment.Study_id == study_id)
+        .order_by(Experiment.id, ExposureEvent.id, PhenotypeObservationSet.id, Image.id)
+    ).all()
+    return [
+        ArchiveEntry(
+            name=(
+                f"experiment-{experiment_id}/exposure-{exposure_id}/"
+                f"observation-{observation_id}/image-{image_id}{_extension(content_type)}"
+            ),
+            key=blob_key,
+        )
+        for experiment_id, exposure_id, observation_id, image_id, content_type, blob_key in rows
+    ]
+
+
+def _extension(content_type: str | None) -> str:
+    if not content_type:
+        return ""
+    return mimetypes.guess_extension(content_type) or ""
+
+
+class _Sink:
+    """A write-only, unseekable file that hands its contents back on demand.
+
+    ``zipfile`` detects the missing ``seek`` and writes sizes after each
+    entry (data descriptors) instead of going back to patch the header.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Sequence[ArchiveEntry], storage: Storage) -> Iterator[bytes]:
+    """Yield a ZIP of ``entries``, reading each blob from ``storage``.
+
+    Images are already compressed, so entries are stored rather than
+    deflated. Blobs missing from storage are left out with a warning.
+    """
+    sink = _Sink()
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        pending = prefetch.submit(storage.get, entries[0].key) if entries else None
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            for index, entry in enumerate(entries):
+                stored = pending.result()
+                pending = (
+                    prefetch.submit(storage.get, entries[index + 1].key)
+                    if index + 1 < len(entries)
+                    else None
+                )
+                if stored is None:
+                    logger.warning("Image blob %s missing; left out of archive", entry.key)
+                    continue
+
+                data = stored.data
+                with archive.open(
+                    entry.name, "w", force_zip64=len(data) > zipfile.ZIP64_LIMIT
+                ) as out:
+                    for start in range(0, len(data), _CHUNK_BYTES):
+                        out.write(data[start : start + _CHUNK_BYTES])
+                        if chunk := sink.drain():
+                            yield chunk
+                del data, stored
+                if chunk := sink.drain():
+                    yield chunk
+        # Closing the archive writes the central directory.
+        if chunk := sink.drain():
+            yield chunk
@@ -1,12 +1,49 @@
-"""Image persistence + blob-storage glue."""
+"""Image persistence + blob-storage glue.
+
+Blobs are stored under one of three keys:
+
+* ``images/{id}`` — one object per image row. The original layout, and still
+  the default.
+* ``blobs/sha256/{hex}`` — content-addressed, shared by every image with the
+  same bytes. Used for new uploads when ``content_addressed_images`` is on.
+  ``Blob.ref_count`` tracks how many images point at each object and the
+  object is deleted only when the last of them goes.
+* ``uploads/{token}`` — written by the client straight to the bucket with a
+  presigned URL (``initiate_direct_upload`` / ``finalize_direct_upload``),
+  so the bytes never pass through the app. Reference-counted like the above.
+
+Nothing here deletes from storage directly. Dropping the last reference to
+an object enqueues a ``BlobDeletion`` row in the same transaction, and the
+background sweeper (``sweep_blob_deletion_batch``) removes the objects later,
+in bulk, retrying failures. A request that rolls back therefore never
+deletes bytes a surviving row still needs, and request latency no longer
+depends on how many images a cascade touches.
+"""
 
 from __future__ import annotations
 
+import hashlib
+import secrets
+from collections import Counter
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
 from typing import Optional
 
+from sqlalchemy import Text, cast, delete, exists, func, insert, literal, or_, select, update
 from sqlalchemy.orm import Session
 
-from zapp_atlas.db.image_storage import Storage, max_upload_bytes
+from zapp_atlas.db import dialect_insert, retry_on_busy
+from zapp_atlas.db.image_storage import (
+    CachingStorage,
+    LocalFilesystemStorage,
+    ObjectUrl,
+    PresignedUpload,
+    Storage,
+    max_upload_bytes,
+)
+from zapp_atlas.db.models import Blob, BlobDeletion, ImageBlob, PendingImageUpload
 
 from zapp_atlas.schema.sqla import (  # type: ignore
     Image,
@@ -22,10 +59,133 @@ class UnsupportedImageTypeError(ValueError):
     pass
 
 
+class DirectUploadUnsupportedError(RuntimeError):
+    """The storage backend cannot hand out upload URLs."""
+
+
+class UploadNotFoundError(LookupError):
+    """No live upload ticket matches, or its bytes never reached storage."""
+
+
+class ImageBatchError(Exception):
+    """Some files of a batch upload failed, so none of it was kept.
+
+    ``errors`` maps the position of each failed file to why it failed; files
+    not listed were fine but were rolled back with the rest.
+    """
+
+    def __init__(self, errors: dict[int, Exception]) -> None:
+        super().__init__(f"{len(errors)} file(s) failed")
+        self.errors = errors
+
+
+class ImageBatchRejectedError(ImageBatchError):
+    """Files were refused before anything was written (type or size)."""
+
+
+class ImageBatchStorageError(ImageBatchError):
+    """Writing blobs to storage failed part way through."""
+
+
+@dataclass
+class ImageUpload:
+    """One file of a batch upload, already read into memory."""
+
+    data: bytes
+    content_type: str
+    checksum: str | None = None
+
+
+DIRECT_UPLOAD_EXPIRES_IN = 15 * 60
+# Abandoned tickets purged per initiate call; keeps the cleanup O(1) per request.
+_PURGE_BATCH = 100
+# Outbox rows handled per sweep; also the S3 DeleteObjects ceiling.
+SWEEP_BATCH = 1000
+# Retry backoff for failed deletions: 5 s, 10 s, 20 s, ... capped at an hour.
+_SWEEP_RETRY_BASE = timedelta(seconds=5)
+_SWEEP_RETRY_MAX = timedelta(hours=1)
+
+
 def _storage_key(image_id: int) -> str:
     return f"images/{image_id}"
 
 
+def _content_key(checksum: str) -> str:
+    return f"blobs/sha256/{checksum}"
+
+
+def image_storage_key(session: Session, image_id: int) -> str:
+    """The storage key holding an image's bytes."""
+    blob_key = session.scalar(select(ImageBlob.blob_key).where(ImageBlob.image_id == image_id))
+    return blob_key or _storage_key(image_id)
+
+
+def _upload_key(upload_id: str) -> str:
+    return f"uploads/{upload_id}"
+
+
+def _check_image(content_type: str, size: int, limit: int) -> None:
+    if not content_type.startswith("image/"):
+        raise UnsupportedImageTypeError(content_type)
+    if size > limit:
+        raise ImageTooLargeError(f"{size} > {limit}")
+
+
+def _retain_blob(
+    session: Session, key: str, data: bytes, content_type: str, *, storage: Storage
+) -> None:
+    """Take a reference on the blob at ``key``, uploading it only if new."""
+    if _add_blob_refs(session, key, 1) > 1:
+        return
+    # The same bytes may have been released moments ago; their queued
+    # deletion must not remove the object about to be written back.
+    _cancel_deletions(session, [key])
+    storage.put(key, data, content_type)
+
+
+def _add_blob_refs(session: Session, key: str, count: int) -> int:
+    """Add ``count`` references to ``key``'s ``Blob`` row, creating it if absent.
+
+    One upsert rather than update-then-insert, so concurrent uploads of the
+    same bytes can't both find no row and collide on the insert. Returns the
+    new count; equal to ``count`` means this call created the row.
+    """
+    stmt = dialect_insert(session.get_bind(), Blob).values(
+        key=key, ref_count=count, created_at=datetime.now(UTC)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Blob.key], set_={"ref_count": Blob.ref_count + count}
+    )
+    return session.scalar(stmt.returning(Blob.ref_count))
+
+
+def _enqueue_deletion(session: Session, key: str) -> None:
+    session.add(BlobDeletion(key=key))
+
+
+def _cancel_deletions(session: Session, keys: Sequence[str]) -> None:
+    """Drop queued deletions of ``keys``, which are about to hold new bytes.
+
+    Must run before the bytes are written: a sweep that has already claimed
+    one of these rows holds its lock until the storage delete is done, so
+    this waits for it rather than letting it delete the new object.
+
+    Per-id keys need this as much as shared ones: SQLite hands a deleted
+    top id to the next image, and with it the old image's key.
+    """
+    session.execute(delete(BlobDeletion).where(BlobDeletion.key.in_(keys)))
+
+
+def _release_blob(session: Session, key: str) -> None:
+    """Drop a reference on the blob at ``key``; queue its deletion if that was the last."""
+    session.execute(update(Blob).where(Blob.key == key).values(ref_count=Blob.ref_count - 1))
+    remaining = session.scalar(select(Blob.ref_count).where(Blob.key == key))
+    if remaining is None or remaining > 0:
+        return
+    session.execute(delete(Blob).where(Blob.key == key))
+    _enqueue_deletion(session, key)
+
+
 def create_image_for_observation(
     session: Session,
     *,
@@ -37,7 +197,14 @@ def create_image_for_observation(
     resolution: str | None = None,
     scale_bar: str | None = None,
     max_bytes: int | None = None,
+    content_addressed: bool = False,
+    checksum: str | None = None,
 ) -> Optional[Image]:
+    """Store ``data`` and attach it to the observation as a new Image.
+
+    ``checksum`` is the hex SHA-256 of ``data`` when the caller already
+    computed it while reading the upload; it is derived here otherwise.
+    """
     if not content_type.startswith("image/"):
         raise UnsupportedImageTypeError(content_type)
 
@@ -53,9 +220,26 @@ def create_image_for_observation(
         magnification=magnification,
         resolution=resolution,
         scale_bar=scale_bar,
+        content_type=content_type,
+        byte_size=len(data),
+        checksum=checksum or hashlib.sha256(data).hexdigest(),
     )
     obs.image.append(image)
     session.add(obs)
+
+    if content_addressed:
+        key = _content_key(image.checksum)
+        # The blob is in storage before the row that references it commits;
+        # a failed upload leaves nothing behind but an uncommitted session.
+        _retain_blob(session, key, data, content_type, storage=storage)
+        session.flush()
+        session.add(ImageBlob(image_id=image.id, blob_key=key))
+        session.commit()
+        session.refresh(image)
+        return image
+
+    session.flush()
+    _cancel_deletions(session, [_storage_key(image.id)])
     session.commit()
     session.refresh(image)
 
@@ -63,28 +247,408 @@ def create_image_for_observation(
     return image
 
 
+def create_images_for_observation(
+    session: Session,
+    *,
+    observation_id: int,
+    uploads: Sequence[ImageUpload],
+    storage: Storage,
+    max_bytes: int | None = None,
+    content_addressed: bool = False,
+    max_workers: int = 8,
+    magnification: str | None = None,
+    resolution: str | None = None,
+    scale_bar: str | None = None,
+) -> Optional[list[Image]]:
+    """Attach several images to an observation, all or nothing.
+
+    Every row is created in one transaction and the blobs are written
+    concurrently by up to ``max_workers`` threads. If any file is refused
+    or any write fails, the transaction is rolled back, blobs that did get
+    written are queued for deletion, and ``ImageBatchError`` says which
+    files were at fault. The per-id keys among them name ids the rollback
+    freed; whichever upload takes such an id next cancels its deletion.
+    """
+    limit = max_bytes if max_bytes is not None else max_upload_bytes()
+    rejected: dict[int, Exception] = {}
+    for index, upload in enumerate(uploads):
+        try:
+            _check_image(upload.content_type, len(upload.data), limit)
+        except ValueError as exc:
+            rejected[index] = exc
+    if rejected:
+        raise ImageBatchRejectedError(rejected)
+
+    obs = session.get(PhenotypeObservationSet, observation_id)
+    if obs is None:
+        return None
+
+    images = [
+        Image(
+            magnification=magnification,
+            resolution=resolution,
+            scale_bar=scale_bar,
+            content_type=upload.content_type,
+            byte_size=len(upload.data),
+            checksum=upload.checksum or hashlib.sha256(upload.data).hexdigest(),
+        )
+        for upload in uploads
+    ]
+    obs.image.extend(images)
+    session.flush()
+
+    # index of the file whose bytes each key gets written from
+    writes: dict[str, int] = {}
+    if content_addressed:
+        keys = [_content_key(image.checksum) for image in images]
+        for key, count in Counter(keys).items():
+            if _add_blob_refs(session, key, count) == count:
+                writes[key] = keys.index(key)
+        session.flush()
+        session.add_all(
+            ImageBlob(image_id=image.id, blob_key=key) for image, key in zip(images, keys)
+        )
+    else:
+        writes = {_storage_key(image.id): index for index, image in enumerate(images)}
+    # Keys queued by a released blob, or by an earlier batch that failed
+    # with these same ids, must not take the new bytes with them.
+    _cancel_deletions(session, list(writes))
+
+    failed = _put_concurrently(storage, uploads, writes, max_workers=max_workers)
+    if failed:
+        session.rollback()
+        for key in writes.keys() - failed.keys():
+            _enqueue_deletion(session, key)
+        session.commit()
+        raise ImageBatchStorageError({writes[key]: exc for key, exc in failed.items()})
+
+    session.commit()
+    for image in images:
+        session.refresh(image)
+    return images
+
+
+def _put_concurrently(
+    storage: Storage,
+    uploads: Sequence[ImageUpload],
+    writes: dict[str, int],
+    *,
+    max_workers: int,
+) -> dict[str, Exception]:
+    """Write each key from its upload; return the keys that failed."""
+
+    def put(key: str) -> None:
+        upload = uploads[writes[key]]
+        storage.put(key, upload.data, upload.content_type)
+
+    failed: dict[str, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(writes) or 1))) as pool:
+        futures = {key: pool.submit(put, key) for key in writes}
+        for key, future in futures.items():
+            exc = future.exception()
+            if exc is not None:
+                failed[key] = exc
+    return failed
+
+
+def _purge_abandoned_uploads(session: Session) -> None:
+    expired = session.scalars(
+        select(PendingImageUpload)
+        .where(PendingImageUpload.expires_at < datetime.now(UTC))
+        .limit(_PURGE_BATCH)
+    ).all()
+    for pending in expired:
+        _enqueue_deletion(session, pending.blob_key)
+        session.delete(pending)
+
+
+def initiate_direct_upload(
+    session: Session,
+    *,
+    observation_id: int,
+    content_type: str,
+    size: int | None,
+    storage: Storage,
+    max_bytes: int | None = None,
+    expires_in: int = DIRECT_UPLOAD_EXPIRES_IN,
+) -> Optional[tuple[PendingImageUpload, PresignedUpload]]:
+    """Grant the client a URL to upload one image straight to storage.
+
+    ``size`` is the client's claim and is only a courtesy check; the real
+    size is read back from storage when the upload is finalized.
+    """
+    limit = max_bytes if max_bytes is not None else max_upload_bytes()
+    _check_image(content_type, size or 0, limit)
+
+    if session.get(PhenotypeObservationSet, observation_id) is None:
+        return None
+
+    upload_id = secrets.token_urlsafe(24)
+    key = _upload_key(upload_id)
+    presigned = storage.presign_upload(key, content_type, expires_in=expires_in)
+    if presigned is None:
+        raise DirectUploadUnsupportedError(type(storage).__name__)
+
+    _purge_abandoned_uploads(session)
+    pending = PendingImageUpload(
+        id=upload_id,
+        observation_id=observation_id,
+        blob_key=key,
+        content_type=content_type,
+        expires_at=datetime.now(UTC) + timedelta(seconds=expires_in),
+    )
+    session.add(pending)
+    session.commit()
+    return pending, presigned
+
+
+def finalize_direct_upload(
+    session: Session,
+    *,
+    observation_id: int,
+    upload_id: str,
+    storage: Storage,
+    max_bytes: int | None = None,
+    magnification: str | None = None,
+    resolution: str | None = None,
+    scale_bar: str | None = None,
+) -> Optional[Image]:
+    """Turn a completed direct upload into an Image row.
+
+    The object is checked with a HEAD — never downloaded — and queued for
+    deletion if it is not an acceptable image.
+    """
+    obs = session.get(PhenotypeObservationSet, observation_id)
+    if obs is None:
+        return None
+
+    pending = session.scalar(
+        select(PendingImageUpload).where(
+            PendingImageUpload.id == upload_id,
+            PendingImageUpload.observation_id == observation_id,
+            PendingImageUpload.expires_at >= datetime.now(UTC),
+        )
+    )
+    if pending is None:
+        raise UploadNotFoundError(upload_id)
+
+    info = storage.head(pending.blob_key)
+    if info is None:
+        raise UploadNotFoundError(upload_id)
+
+    limit = max_bytes if max_bytes is not None else max_upload_bytes()
+    try:
+        _check_image(info.content_type, info.size, limit)
+    except ValueError:
+        _enqueue_deletion(session, pending.blob_key)
+        session.delete(pending)
+        session.commit()
+        raise
+
+    # The checksum stays unset: computing it would mean downloading the
+    # bytes this flow exists to keep out of the app.
+    image = Image(
+        magnification=magnification,
+        resolution=resolution,
+        scale_bar=scale_bar,
+        content_type=info.content_type,
+        byte_size=info.size,
+    )
+    obs.image.append(image)
+    session.add(Blob(key=pending.blob_key, ref_count=1))
+    session.flush()
+    session.add(ImageBlob(image_id=image.id, blob_key=pending.blob_key))
+    session.delete(pending)
+    session.commit()
+    session.refresh(image)
+    return image
+
+
+def migrate_image_batch(
+    session: Session, storage: Storage, *, after_id: int = 0, limit: int = 100
+) -> int | None:
+    """Bring the next batch of pre-metadata images up to date.
+
+    Fills in ``content_type``, ``byte_size`` and ``checksum`` from the stored
+    blob and, on local storage, moves the blob from the flat layout into its
+    shard. Returns the last id handled, to pass back as ``after_id``, or None
+    once no images are left. Safe to run while the app serves requests: reads
+    fall back to the flat layout until a blob has moved.
+    """
+    images = session.scalars(
+        select(Image)
+        .where(Image.content_type.is_(None), Image.id > after_id)
+        .order_by(Image.id)
+        .limit(limit)
+    ).all()
+    if not images:
+        return None
+
+    keys = []
+    for image in images:
+        key = image_storage_key(session, image.id)
+        stored = storage.get(key)
+        if stored is None:
+            continue
+        image.content_type = stored.content_type
+        image.byte_size = len(stored.data)
+        image.checksum = hashlib.sha256(stored.data).hexdigest()
+        keys.append(key)
+    session.commit()
+
+    # Only after the commit: the sidecar is the sole record of the content
+    # type until the row holds it.
+    backend = storage.backend if isinstance(storage, CachingStorage) else storage
+    if isinstance(backend, LocalFilesystemStorage):
+        for key in keys:
+            backend.migrate_legacy(key)
+    return images[-1].id
+
+
 def get_image_by_id(session: Session, image_id: int) -> Optional[Image]:
     return session.get(Image, image_id)
 
 
-def load_image_bytes(image_id: int, storage: Storage):
-    return storage.get(_storage_key(image_id))
+def load_image_bytes(session: Session, image_id: int, storage: Storage):
+    return storage.get(image_storage_key(session, image_id))
 
 
-def image_url(image_id: int, storage: Storage) -> str | None:
-    return storage.url_for(_storage_key(image_id))
+def image_url(session: Session, image_id: int, storage: Storage) -> ObjectUrl | None:
+    return storage.url_for(image_storage_key(session, image_id))
 
 
-def delete_image_row(session: Session, image, *, storage: Storage) -> None:
-    """Delete an Image ORM row and its stored blob. Caller commits."""
-    storage.delete(_storage_key(image.id))
+def delete_image_row(session: Session, image) -> None:
+    """Delete an Image ORM row and release its stored blob. Caller commits."""
+    blob_key = session.scalar(select(ImageBlob.blob_key).where(ImageBlob.image_id == image.id))
+    if blob_key is None:
+        _enqueue_deletion(session, _storage_key(image.id))
+    else:
+        session.execute(delete(ImageBlob).where(ImageBlob.image_id == image.id))
+        _release_blob(session, blob_key)
     session.delete(image)
 
 
-def delete_image(session: Session, image_id: int, *, storage: Storage) -> bool:
+def delete_observation_images(session: Session, obs: PhenotypeObservationSet) -> None:
+    """Delete every image of ``obs`` and release their blobs. Caller commits.
+
+    Set-based: the same handful of statements whatever the image count, so
+    deleting a study does not cost a round trip per image.
+    """
+    image_ids = select(Image.id).where(Image.PhenotypeObservationSet_id == obs.id)
+    linked = select(ImageBlob.blob_key).where(ImageBlob.image_id.in_(image_ids))
+
+    # Per-id objects have no Blob row; queue them straight away.
+    session.execute(
+        insert(BlobDeletion).from_select(
+            ["key"],
+            select(literal("images/") + cast(Image.id, Text)).where(
+                Image.id.in_(image_ids),
+                ~exists().where(ImageBlob.image_id == Image.id),
+            ),
+        )
+    )
+    # Shared objects lose one reference per image of ours that uses them...
+    refs = (
+        select(func.count())
+        .where(ImageBlob.blob_key == Blob.key, ImageBlob.image_id.in_(image_ids))
+        .scalar_subquery()
+    )
+    session.execute(
+        update(Blob).where(Blob.key.in_(linked)).values(ref_count=Blob.ref_count - refs)
+    )
+    # ...and are queued once nothing references them any more.
+    session.execute(
+        insert(BlobDeletion).from_select(
+            ["key"], select(Blob.key).where(Blob.key.in_(linked), Blob.ref_count <= 0)
+        )
+    )
+    session.execute(delete(ImageBlob).where(ImageBlob.image_id.in_(image_ids)))
+    # The links are gone now, so find the orphans through the outbox instead.
+    session.execute(delete(Blob).where(Blob.key.in_(select(BlobDeletion.key)), Blob.ref_count <= 0))
+    session.execute(
+        delete(Image).where(Image.id.in_(image_ids)).execution_options(synchronize_session=False)
+    )
+    session.expire(obs, ["image"])
+
+
+@retry_on_busy
+def delete_image(session: Session, image_id: int) -> bool:
     image = get_image_by_id(session, image_id)
     if image is None:
         return False
-    delete_image_row(session, image, storage=storage)
+    delete_image_row(session, image)
     session.commit()
     return True
+
+
+def _live_image_keys(session: Session, keys: set[str]) -> list[str]:
+    """The per-id ``keys`` whose id now belongs to an image stored there."""
+    ids = [int(key[len("images/") :]) for key in keys if key.startswith("images/")]
+    if not ids:
+        return []
+    image_ids = session.scalars(
+        select(Image.id).where(Image.id.in_(ids), ~exists().where(ImageBlob.image_id == Image.id))
+    )
+    return [_storage_key(image_id) for image_id in image_ids]
+
+
+def sweep_blob_deletion_batch(
+    session: Session, storage: Storage, *, limit: int = SWEEP_BATCH
+) -> int:
+    """Delete the next batch of queued objects from storage.
+
+    Successful keys leave the outbox; failures stay with ``attempts`` bumped
+    and ``next_attempt_at`` backed off. A key that is in use again is
+    dropped without touching storage: a shared key with a live ``Blob`` row
+    (the same bytes re-uploaded), or a per-id key whose id SQLite has handed
+    to a new image. Returns how many rows were handled, so the caller can
+    tell a full batch — more may be waiting — from the tail of the queue.
+
+    Uploads to a key in the batch wait while its objects are deleted; on
+    SQLite that is every write, for the length of one ``delete_many``.
+    """
+    now = datetime.now(UTC)
+    due = (
+        select(BlobDeletion.id)
+        .where(or_(BlobDeletion.next_attempt_at.is_(None), BlobDeletion.next_attempt_at <= now))
+        .order_by(BlobDeletion.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    # Claiming is the transaction's first statement, so the write lock (row
+    # locks on Postgres) is held until the commit, after the storage delete.
+    # An upload's ``_cancel_deletions`` of a claimed key waits for it, and
+    # its Blob or Image row is only visible here if it committed first.
+    claimed = session.execute(
+        update(BlobDeletion)
+        .where(BlobDeletion.id.in_(due))
+        .values(attempts=BlobDeletion.attempts + 1)
+        .returning(BlobDeletion.id, BlobDeletion.key, BlobDeletion.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not claimed:
+        session.commit()
+        return 0
+
+    keys = {row.key for row in claimed}
+    live = set(session.scalars(select(Blob.key).where(Blob.key.in_(keys))))
+    live.update(_live_image_keys(session, keys))
+    failed = storage.delete_many(sorted(keys - live))
+
+    done = [row.id for row in claimed if row.key not in failed]
+    session.execute(delete(BlobDeletion).where(BlobDeletion.id.in_(done)))
+    for row in claimed:
+        error = failed.get(row.key)
+        if error is None:
+            continue
+        session.execute(
+            update(BlobDeletion)
+            .where(BlobDeletion.id == row.id)
+            .values(
+                last_error=error,
+                next_attempt_at=now
+                + min(_SWEEP_RETRY_BASE * 2 ** (row.attempts - 1), _SWEEP_RETRY_MAX),
+            )
+        )
+    session.commit()
+    return len(claimed)
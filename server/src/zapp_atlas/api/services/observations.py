@@ -6,12 +6,12 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
-from zapp_atlas.api.services.images import delete_image_row
+from zapp_atlas.api.services.images import delete_observation_images
 from zapp_atlas.api.services.studies import (
     _obs_set_from_create,
     _phenotype_from_create,
 )
-from zapp_atlas.db.image_storage import Storage
+from zapp_atlas.db import retry_on_busy
 
 from zapp_atlas.schema.pydantic_crud import (
     PhenotypeObservationSetCreate,
@@ -24,6 +24,7 @@ from zapp_atlas.schema.sqla import (  # type: ignore
 )
 
 
+@retry_on_busy
 def create_observation_for_exposure(
     session: Session,
     *,
@@ -48,6 +49,7 @@ def get_observation_by_id(
     return session.get(PhenotypeObservationSet, observation_id)
 
 
+@retry_on_busy
 def patch_observation(
     session: Session,
     observation_id: int,
@@ -66,25 +68,21 @@ def patch_observation(
     return obs
 
 
-def delete_observation_row(
-    session: Session, obs: PhenotypeObservationSet, *, storage: Storage
-) -> None:
+def delete_observation_row(session: Session, obs: PhenotypeObservationSet) -> None:
     """Delete an observation set and all of its owned rows + image blobs."""
     for phenotype in list(obs.phenotype or []):
         session.delete(phenotype)
-    for image in list(obs.image or []):
-        delete_image_row(session, image, storage=storage)
+    delete_observation_images(session, obs)
     for ci in list(obs.control_image or []):
         session.delete(ci)
     session.delete(obs)
 
 
-def delete_observation(
-    session: Session, observation_id: int, *, storage: Storage
-) -> bool:
+@retry_on_busy
+def delete_observation(session: Session, observation_id: int) -> bool:
     obs = get_observation_by_id(session, observation_id)
     if obs is None:
         return False
-    delete_observation_row(session, obs, storage=storage)
+    delete_observation_row(session, obs)
     session.commit()
     return True
@@ -0,0 +1,210 @@
+"""Research groups, their members, and what they keep on hand.
+
+These functions do not check who is asking; the router authorizes each
+write against the group it touches (see ``auth.permissions``) first.
+"""
+
+from __future__ import annotations
+
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from zapp_atlas.api.services.studies import _fish_from_payload
+from zapp_atlas.auth.permissions import ADMIN
+from zapp_atlas.db import retry_on_busy
+from zapp_atlas.schema.pydantic_crud import (
+    ChemicalCabinetEntryCreate,
+    ChemicalCabinetEntryUpdate,
+    FishTankEntryCreate,
+    FishTankEntryUpdate,
+    ResearchGroupCreate,
+    ResearchGroupMemberCreate,
+    ResearchGroupMemberUpdate,
+)
+from zapp_atlas.schema.sqla import (  # type: ignore
+    ChemicalCabinetEntry,
+    FishTankEntry,
+    ResearchGroup,
+    ResearchGroupMember,
+)
+
+
+class DuplicateEntryError(ValueError):
+    """The group already has this member, chemical or fish line."""
+
+
+class LastAdminError(ValueError):
+    """The change would leave a group with no admin to manage it."""
+
+
+def _commit(session: Session, row, *, keep_admin_of: int | None = None):
+    """Commit, refreshing ``row`` if given.
+
+    With ``keep_admin_of``, first check that the group still has an admin
+    once the pending changes are flushed; nothing else can make one.
+    """
+    try:
+        session.flush()
+        if keep_admin_of is not None and not _admin_count(session, keep_admin_of):
+            session.rollback()
+            raise LastAdminError(f"research group {keep_admin_of} needs an admin")
+        session.commit()
+    except IntegrityError as exc:
+        session.rollback()
+        raise DuplicateEntryError(str(exc.orig)) from exc
+    if row is not None:
+        session.refresh(row)
+    return row
+
+
+def _admin_count(session: Session, group_id: int) -> int:
+    return session.scalar(
+        select(func.count()).where(
+            ResearchGroupMember.research_group == group_id, ResearchGroupMember.role == ADMIN
+        )
+    )
+
+
+def _apply(row, patch: BaseModel, fields: tuple[str, ...]) -> None:
+    for field in fields:
+        value = getattr(patch, field, None)
+        if value is not None:
+            setattr(row, field, value)
+
+
+@retry_on_busy
+def create_research_group(
+    session: Session, payload: ResearchGroupCreate, *, admin: str
+) -> ResearchGroup:
+    """A new group, with ``admin`` (a member id) as its first admin."""
+    group = ResearchGroup(name=payload.name)
+    session.add(group)
+    session.flush()
+    session.add(ResearchGroupMember(research_group=group.id, member=admin, role=ADMIN))
+    return _commit(session, group)
+
+
+def get_research_group(session: Session, group_id: int) -> ResearchGroup | None:
+    return session.get(ResearchGroup, group_id)
+
+
+# Members
+
+
+def get_member(session: Session, member_id: int) -> ResearchGroupMember | None:
+    return session.get(ResearchGroupMember, member_id)
+
+
+@retry_on_busy
+def create_member(session: Session, payload: ResearchGroupMemberCreate) -> ResearchGroupMember:
+    member = ResearchGroupMember(
+        research_group=payload.research_group,
+        member=payload.member,
+        role=payload.role,
+    )
+    session.add(member)
+    return _commit(session, member)
+
+
+@retry_on_busy
+def patch_member(
+    session: Session, member_id: int, patch: ResearchGroupMemberUpdate
+) -> ResearchGroupMember | None:
+    member = get_member(session, member_id)
+    if member is None:
+        return None
+    # Demoting an admin, or moving one to another group, may leave none.
+    admin_of = member.research_group if member.role == ADMIN else None
+    _apply(member, patch, ("research_group", "member", "role"))
+    return _commit(session, member, keep_admin_of=admin_of)
+
+
+@retry_on_busy
+def delete_member(session: Session, member_id: int) -> bool:
+    member = get_member(session, member_id)
+    if member is None:
+        return False
+    admin_of = member.research_group if member.role == ADMIN else None
+    session.delete(member)
+    _commit(session, None, keep_admin_of=admin_of)
+    return True
+
+
+# Chemical cabinet
+
+
+def get_cabinet_entry(session: Session, entry_id: int) -> ChemicalCabinetEntry | None:
+    return session.get(ChemicalCabinetEntry, entry_id)
+
+
+@retry_on_busy
+def create_cabinet_entry(
+    session: Session, payload: ChemicalCabinetEntryCreate
+) -> ChemicalCabinetEntry:
+    entry = ChemicalCabinetEntry(
+        research_group=payload.research_group, chemical_id=payload.chemical_id
+    )
+    session.add(entry)
+    return _commit(session, entry)
+
+
+@retry_on_busy
+def patch_cabinet_entry(
+    session: Session, entry_id: int, patch: ChemicalCabinetEntryUpdate
+) -> ChemicalCabinetEntry | None:
+    entry = get_cabinet_entry(session, entry_id)
+    if entry is None:
+        return None
+    _apply(entry, patch, ("research_group", "chemical_id"))
+    return _commit(session, entry)
+
+
+@retry_on_busy
+def delete_cabinet_entry(session: Session, entry_id: int) -> bool:
+    entry = get_cabinet_entry(session, entry_id)
+    if entry is None:
+        return False
+    session.delete(entry)
+    session.commit()
+    return True
+
+
+# Fish tank
+
+
+def get_tank_entry(session: Session, entry_id: int) -> FishTankEntry | None:
+    return session.get(FishTankEntry, entry_id)
+
+
+@retry_on_busy
+def create_tank_entry(session: Session, payload: FishTankEntryCreate) -> FishTankEntry:
+    entry = FishTankEntry(
+        research_group=payload.research_group, fish=_fish_from_payload(session, payload.fish)
+    )
+    session.add(entry)
+    return _commit(session, entry)
+
+
+@retry_on_busy
+def patch_tank_entry(
+    session: Session, entry_id: int, patch: FishTankEntryUpdate
+) -> FishTankEntry | None:
+    entry = get_tank_entry(session, entry_id)
+    if entry is None:
+        return None
+    _apply(entry, patch, ("research_group",))
+    if patch.fish is not None:
+        entry.fish = _fish_from_payload(session, patch.fish)
+    return _commit(session, entry)
+
+
+@retry_on_busy
+def delete_tank_entry(session: Session, entry_id: int) -> bool:
+    entry = get_tank_entry(session, entry_id)
+    if entry is None:
+        return False
+    session.delete(entry)
+    session.commit()
+    return True
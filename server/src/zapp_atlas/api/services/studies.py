@@ -11,6 +11,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
+from zapp_atlas.db import retry_on_busy
 from zapp_atlas.schema.pydantic_crud import (
     ControlCreate,
     ExposureEventCreate,
@@ -252,6 +253,7 @@ def _study_from_create(session: Session, payload: StudyCreate) -> Study:
     return study
 
 
+@retry_on_busy
 def create_study(session: Session, payload: StudyCreate) -> Study:
     study = _study_from_create(session, payload)
     session.add(study)
@@ -273,7 +275,8 @@ def list_studies(session: Session, *, limit: int = 50, offset: int = 0) -> list[
     return list(q)
 
 
-def delete_study(session: Session, study_id: int, *, storage) -> bool:
+@retry_on_busy
+def delete_study(session: Session, study_id: int) -> bool:
     # Lazy import to avoid a cycle with experiments → studies.
     from zapp_atlas.api.services.experiments import delete_experiment_row
 
@@ -281,7 +284,7 @@ def delete_study(session: Session, study_id: int, *, storage) -> bool:
     if study is None:
         return False
     for experiment in list(study.experiment or []):
-        delete_experiment_row(session, experiment, storage=storage)
+        delete_experiment_row(session, experiment)
     # Study_annotator assoc rows (no cascade on the generated relationship)
     session.query(StudyAnnotator).filter_by(
         Study_id=study.id
@@ -291,6 +294,7 @@ def delete_study(session: Session, study_id: int, *, storage) -> bool:
     return True
 
 
+@retry_on_busy
 def patch_study(session: Session, study_id: int, patch: StudyUpdate) -> Optional[Study]:
     study = get_study_by_id(session, study_id)
     if study is None:
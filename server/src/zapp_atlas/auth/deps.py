@@ -7,26 +7,65 @@ rather than reaching for the cookie itself.
 
 from typing import Annotated
 
-from fastapi import Cookie, Depends
+import httpx
+from fastapi import Cookie, Depends, Request
 from sqlalchemy.orm import Session
 
-from zapp_atlas.api.deps import get_session
-from zapp_atlas.auth.models import OrcidIdentity
-from zapp_atlas.auth.services import ORCID_AUTH_COOKIE, get_orcid_identity
+from zapp_atlas.api.deps import get_app_settings, get_session, open_session
+from zapp_atlas.auth.services import ORCID_AUTH_COOKIE, get_orcid_identity, make_orcid_client
+from zapp_atlas.auth.sessions import SessionIdentity, SessionSigner, make_session_signer
+
+
+def get_session_signer(request: Request) -> SessionSigner:
+    """The app's session cookie signer, created once and shared by every request."""
+    signer = getattr(request.app.state, "sessions", None)
+    if signer is None:
+        signer = make_session_signer(get_app_settings(request))
+        request.app.state.sessions = signer
+    return signer
+
+
+def get_orcid_client(request: Request) -> httpx.AsyncClient:
+    """The app's HTTP client for ORCID, opened by the lifespan and shared."""
+    client = getattr(request.app.state, "orcid_client", None)
+    if client is None:
+        client = make_orcid_client(get_app_settings(request))
+        request.app.state.orcid_client = client
+    return client
+
+
+def read_session_cookie(request: Request, session: Session | None = None) -> SessionIdentity | None:
+    """The identity the request's session cookie names, or None when signed out.
+
+    A database session is only opened when revalidation needs one, so
+    without it this costs no query.
+    """
+    token = request.cookies.get(ORCID_AUTH_COOKIE)
+    if not token:
+        return None
+
+    def exists(identity_id: str) -> bool:
+        if session is not None:
+            return get_orcid_identity(session, identity_id) is not None
+        with open_session(request) as own:
+            return get_orcid_identity(own, identity_id) is not None
+
+    return get_session_signer(request).current(token, exists)
 
 
 def get_current_identity(
+    request: Request,
     session: Annotated[Session, Depends(get_session)],
-    identity_id: Annotated[str | None, Cookie(alias=ORCID_AUTH_COOKIE)] = None,
-) -> OrcidIdentity | None:
+    token: Annotated[str | None, Cookie(alias=ORCID_AUTH_COOKIE)] = None,
+) -> SessionIdentity | None:
     """The signed-in identity, or None when signed out.
 
-    A cookie naming an identity that no longer exists is treated as signed
-    out; it is stale rather than meaningful.
+    A cookie that is forged, expired, or names an identity that no longer
+    exists is treated as signed out; it is stale rather than meaningful.
     """
-    if identity_id is None:
+    if token is None:
         return None
-    return get_orcid_identity(session, identity_id)
+    return read_session_cookie(request, session)
 
 
-CurrentIdentity = Annotated[OrcidIdentity | None, Depends(get_current_identity)]
+CurrentIdentity = Annotated[SessionIdentity | None, Depends(get_current_identity)]
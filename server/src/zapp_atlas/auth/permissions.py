@@ -0,0 +1,169 @@
+"""Who may write what a research group keeps.
+
+A group's members may edit its chemical cabinet and fish tank; its admins
+may also change who its members are. Writes to those resources check the
+signed-in identity's role in the target group.
+
+Asking the database on every write would put a query in front of each
+one. Instead each process keeps a ``PermissionCache``: an identity's roles
+are read from ``ResearchGroupMember`` (one indexed query, no joins) the
+first time its session writes, and reused by every later request.
+
+A commit that adds, changes or removes a membership drops the affected
+identities' entries from every cache in the process, so it sees the
+change at once. Other workers learn of it when their entry expires, after
+``ZAPP_PERMISSION_CACHE_SECONDS``; that bounds how long a revoked member
+can keep writing there. Membership changes must go through the ORM (as
+``api.services.research_groups`` does) for the commit hook to see them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, attributes
+
+from zapp_atlas.api.deps import get_app_settings, get_session
+from zapp_atlas.auth.deps import CurrentIdentity
+from zapp_atlas.schema.sqla import ResearchGroupMember  # type: ignore
+
+ADMIN = "admin"
+MEMBER = "member"
+# Each role may do everything the roles after it may.
+_RANK = {ADMIN: 2, MEMBER: 1}
+# Identities whose roles are cached; cleared when it grows past this.
+PERMISSION_CACHE_SIZE = 10_000
+
+# session.info key: members whose memberships were flushed since the last commit.
+_CHANGED = "changed_group_members"
+# Every live cache in the process, told of each committed membership change.
+_caches: weakref.WeakSet[PermissionCache] = weakref.WeakSet()
+
+
+def member_id(orcid_id: str) -> str:
+    """How ``ResearchGroupMember.member`` names the holder of an ORCID iD."""
+    return f"ORCID:{orcid_id}"
+
+
+@dataclass(frozen=True)
+class GroupPermissions:
+    """One identity's role in each research group it belongs to."""
+
+    member: str
+    roles: Mapping[int, str]
+
+    def allows(self, group_id: int, role: str = MEMBER) -> bool:
+        held = self.roles.get(group_id)
+        return held is not None and _RANK[held] >= _RANK[role]
+
+    def require(self, group_id: int, role: str = MEMBER) -> None:
+        """Raise 403 unless the identity holds at least ``role`` in the group."""
+        if not self.allows(group_id, role):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Only a research group {role} can do this",
+            )
+
+
+def load_group_roles(session: Session, member: str) -> dict[int, str]:
+    rows = session.execute(
+        select(ResearchGroupMember.research_group, ResearchGroupMember.role).where(
+            ResearchGroupMember.member == member
+        )
+    )
+    return {group_id: role for group_id, role in rows}
+
+
+class PermissionCache:
+    """Each identity's group roles, shared by all requests. Thread-safe."""
+
+    def __init__(self, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        # member -> (valid until, permissions)
+        self._entries: dict[str, tuple[float, GroupPermissions]] = {}
+        # Bumped by every forget, so a load that raced one is not kept.
+        self._generation = 0
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def get(self, member: str, load: Callable[[str], Mapping[int, str]]) -> GroupPermissions:
+        """The cached permissions of ``member``, calling ``load`` on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(member)
+            generation = self._generation
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        permissions = GroupPermissions(member, MappingProxyType(dict(load(member))))
+        with self._lock:
+            if generation == self._generation:
+                if len(self._entries) >= PERMISSION_CACHE_SIZE:
+                    self._entries.clear()
+                self._entries[member] = (now + self.ttl_seconds, permissions)
+        return permissions
+
+    def forget(self, members: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for member in members:
+                self._entries.pop(member, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_members(session: Session, _flush_context) -> None:
+    members: set[str] = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if type(instance) is ResearchGroupMember:
+            # Before and after, so a membership moved to someone else
+            # changes both identities.
+            history = attributes.get_history(
+                instance, "member", passive=attributes.PASSIVE_NO_FETCH
+            )
+            members.update(value for value in history.sum() if value is not None)
+    if members:
+        session.info.setdefault(_CHANGED, set()).update(members)
+
+
+@event.listens_for(Session, "after_commit")
+def _announce_changed_members(session: Session) -> None:
+    members = session.info.pop(_CHANGED, None)
+    if members:
+        for cache in list(_caches):
+            cache.forget(members)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_members(session: Session) -> None:
+    session.info.pop(_CHANGED, None)
+
+
+def get_permission_cache(request: Request) -> PermissionCache:
+    """The app's permission cache, created once and shared by every request."""
+    cache = getattr(request.app.state, "permissions", None)
+    if cache is None:
+        cache = PermissionCache(get_app_settings(request).permission_cache_seconds)
+        request.app.state.permissions = cache
+    return cache
+
+
+def get_group_permissions(
+    identity: CurrentIdentity,
+    session: Annotated[Session, Depends(get_session)],
+    cache: Annotated[PermissionCache, Depends(get_permission_cache)],
+) -> GroupPermissions:
+    """The signed-in identity's group roles; 401 when signed out."""
+    if identity is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Sign in first")
+    return cache.get(member_id(identity.orcid_id), lambda member: load_group_roles(session, member))
+
+
+Permissions = Annotated[GroupPermissions, Depends(get_group_permissions)]
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Annotated
 
+import httpx
+
 from fastapi import (
     APIRouter,
     Cookie,
@@ -16,6 +19,9 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
 from zapp_atlas.api.deps import get_app_settings, get_session
+from zapp_atlas.auth.deps import get_orcid_client, get_session_signer, read_session_cookie
+from zapp_atlas.auth.models import OrcidIdentity
+from zapp_atlas.auth.sessions import SessionSigner
 from zapp_atlas.html.templating import templates
 from zapp_atlas.auth.services import (
     ORCID_AUTH_COOKIE,
@@ -25,7 +31,6 @@ from zapp_atlas.auth.services import (
     build_authorization_url,
     exchange_code_for_token,
     get_orcid_config,
-    get_orcid_identity,
     make_state,
     state_matches,
     store_orcid_identity,
@@ -49,6 +54,19 @@ def _error_page(
     )
 
 
+def _set_session_cookie(
+    response: RedirectResponse, signer: SessionSigner, identity: OrcidIdentity, *, secure: bool
+) -> None:
+    response.set_cookie(
+        ORCID_AUTH_COOKIE,
+        signer.issue(identity.id, identity.orcid_id, identity.name),
+        max_age=signer.max_age,
+        httponly=True,
+        secure=secure,
+        samesite="lax",
+    )
+
+
 @router.get("/auth/orcid/login")
 def login_with_orcid(
     settings: Annotated[AppSettings, Depends(get_app_settings)],
@@ -75,10 +93,12 @@ def login_with_orcid(
 
 
 @router.get("/registered", response_class=HTMLResponse)
-def registered_orcid_callback(
+async def registered_orcid_callback(
     request: Request,
     session: Annotated[Session, Depends(get_session)],
     settings: Annotated[AppSettings, Depends(get_app_settings)],
+    signer: Annotated[SessionSigner, Depends(get_session_signer)],
+    orcid: Annotated[httpx.AsyncClient, Depends(get_orcid_client)],
     code: Annotated[str | None, Query()] = None,
     state: Annotated[str | None, Query()] = None,
     error: Annotated[str | None, Query()] = None,
@@ -94,18 +114,17 @@ def registered_orcid_callback(
 
     try:
         config = get_orcid_config(settings)
-        token_payload = exchange_code_for_token(config, code)
-        identity = store_orcid_identity(session, token_payload)
+        # Awaited, so a slow ORCID holds no worker thread while it answers.
+        token_payload = await exchange_code_for_token(
+            orcid, config, code, retries=settings.orcid_token_retries
+        )
+        identity = await asyncio.to_thread(store_orcid_identity, session, token_payload)
     except (OrcidConfigError, OrcidTokenExchangeError) as exc:
         return _error_page(request, str(exc), status.HTTP_502_BAD_GATEWAY)
 
     response = RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
-    response.set_cookie(
-        ORCID_AUTH_COOKIE,
-        identity.id,
-        httponly=True,
-        secure=config.redirect_uri.startswith("https://"),
-        samesite="lax",
+    _set_session_cookie(
+        response, signer, identity, secure=config.redirect_uri.startswith("https://")
     )
     response.delete_cookie(ORCID_STATE_COOKIE)
     return response
@@ -115,6 +134,7 @@ def registered_orcid_callback(
 def dev_login(
     session: Annotated[Session, Depends(get_session)],
     settings: Annotated[AppSettings, Depends(get_app_settings)],
+    signer: Annotated[SessionSigner, Depends(get_session_signer)],
     name: Annotated[str, Form()] = "Josiah Carberry",
     orcid_id: Annotated[str, Form()] = "0000-0002-1825-0097",
 ) -> RedirectResponse:
@@ -131,13 +151,7 @@ def dev_login(
     identity = store_orcid_identity(session, {"orcid": orcid_id, "name": name})
 
     response = RedirectResponse("/login", status_code=status.HTTP_303_SEE_OTHER)
-    response.set_cookie(
-        ORCID_AUTH_COOKIE,
-        identity.id,
-        httponly=True,
-        secure=False,
-        samesite="lax",
-    )
+    _set_session_cookie(response, signer, identity, secure=False)
     return response
 
 
@@ -152,10 +166,10 @@ def logout_orcid() -> RedirectResponse:
 def orcid_status(
     request: Request,
     session: Annotated[Session, Depends(get_session)],
-    identity_id: Annotated[str | None, Cookie(alias=ORCID_AUTH_COOKIE)] = None,
+    token: Annotated[str | None, Cookie(alias=ORCID_AUTH_COOKIE)] = None,
 ) -> HTMLResponse:
-    identity = None if identity_id is None else get_orcid_identity(session, identity_id)
-    missing = identity_id is not None and identity is None
+    identity = None if token is None else read_session_cookie(request, session)
+    missing = token is not None and identity is None
 
     return templates.TemplateResponse(
         request,
@@ -1,22 +1,26 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import secrets
+import uuid
 from dataclasses import dataclass
+from datetime import UTC, datetime
 from typing import Any
-from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
-from sqlalchemy import select
+import httpx
 from sqlalchemy.orm import Session
 
 from zapp_atlas.auth.models import OrcidIdentity
+from zapp_atlas.db import dialect_insert, retry_on_busy
 from zapp_atlas.settings import AppSettings, load_settings
 
 
 ORCID_STATE_COOKIE = "zapp_orcid_state"
 ORCID_AUTH_COOKIE = "zapp_orcid_auth"
+# Doubled after each failed attempt at the token exchange.
+RETRY_BACKOFF_SECONDS = 0.2
 
 
 class OrcidConfigError(RuntimeError):
@@ -80,52 +84,82 @@ def build_authorization_url(config: OrcidConfig, state: str) -> str:
     return f"{config.authorize_url}?{query}"
 
 
-def exchange_code_for_token(config: OrcidConfig, code: str) -> dict[str, Any]:
-    form = urlencode(
-        {
-            "client_id": config.client_id,
-            "client_secret": config.client_secret,
-            "grant_type": "authorization_code",
-            "code": code,
-            "redirect_uri": config.redirect_uri,
-        }
-    ).encode("utf-8")
-    request = Request(
-        config.token_url,
-        data=form,
-        headers={
-            "Accept": "application/json",
-            "Content-Type": "application/x-www-form-urlencoded",
-        },
-        method="POST",
+# Statuses meaning ORCID did not act on the request, so the single-use
+# authorization code is still good and the exchange can be tried again.
+_RETRY_STATUSES = {429, 502, 503, 504}
+# Failures before the request was sent. A read timeout is not among them:
+# ORCID may have redeemed the code, and a second try would be refused.
+_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def make_orcid_client(settings: AppSettings) -> httpx.AsyncClient:
+    """The pooled client token exchanges go through, kept for the app's life.
+
+    Reusing it keeps the TLS connection to ORCID open between sign-ins.
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.orcid_timeout_seconds),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=5),
+        headers={"Accept": "application/json"},
     )
-    try:
-        with urlopen(request, timeout=15) as response:
-            return json.loads(response.read().decode("utf-8"))
-    except HTTPError as exc:
-        detail = exc.read().decode("utf-8", errors="replace")
+
+
+async def exchange_code_for_token(
+    client: httpx.AsyncClient, config: OrcidConfig, code: str, *, retries: int = 2
+) -> dict[str, Any]:
+    form = {
+        "client_id": config.client_id,
+        "client_secret": config.client_secret,
+        "grant_type": "authorization_code",
+        "code": code,
+        "redirect_uri": config.redirect_uri,
+    }
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(config.token_url, data=form)
+        except _RETRY_ERRORS as exc:
+            if attempt == retries:
+                raise OrcidTokenExchangeError("Could not reach the ORCID token endpoint") from exc
+        except httpx.HTTPError as exc:
+            raise OrcidTokenExchangeError("Could not exchange ORCID authorization code") from exc
+        else:
+            if response.status_code not in _RETRY_STATUSES or attempt == retries:
+                break
+        attempt += 1
+        await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+    if response.is_error:
         raise OrcidTokenExchangeError(
-            f"ORCID token endpoint returned {exc.code}: {detail}"
-        ) from exc
-    except (OSError, URLError, json.JSONDecodeError) as exc:
-        raise OrcidTokenExchangeError("Could not exchange ORCID authorization code") from exc
+            f"ORCID token endpoint returned {response.status_code}: {response.text}"
+        )
+    try:
+        return response.json()
+    except json.JSONDecodeError as exc:
+        raise OrcidTokenExchangeError("ORCID token response was not JSON") from exc
 
 
+@retry_on_busy
 def store_orcid_identity(session: Session, payload: dict[str, Any]) -> OrcidIdentity:
     orcid_id = payload.get("orcid")
     if not orcid_id:
         raise OrcidTokenExchangeError("ORCID token response was missing identity")
 
-    identity = session.scalar(
-        select(OrcidIdentity)
-        .where(OrcidIdentity.orcid_id == orcid_id)
-        .order_by(OrcidIdentity.created_at)
+    # Upsert on orcid_id, so two first sign-ins at once can't both insert.
+    now = datetime.now(UTC)
+    stmt = dialect_insert(session.get_bind(), OrcidIdentity).values(
+        id=str(uuid.uuid4()),
+        orcid_id=orcid_id,
+        name=payload.get("name"),
+        created_at=now,
+        updated_at=now,
     )
-    if identity is None:
-        identity = OrcidIdentity(orcid_id=orcid_id)
-        session.add(identity)
-
-    identity.name = payload.get("name")
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OrcidIdentity.orcid_id],
+        set_={"name": stmt.excluded.name, "updated_at": now},
+    )
+    identity_id = session.scalar(stmt.returning(OrcidIdentity.id))
+    identity = session.get(OrcidIdentity, identity_id)
 
     session.commit()
     session.refresh(identity)
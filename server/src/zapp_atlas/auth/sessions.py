@@ -0,0 +1,152 @@
+"""Signed, expiring session cookies.
+
+The ``zapp_orcid_auth`` cookie carries who is signed in: the identity's id,
+ORCID iD and name, and an expiry, as base64url JSON signed with HMAC-SHA256.
+Checking it needs only the key, so the header's user chip and the login page
+cost no query.
+
+Tokens look like ``v1.<key id>.<payload>.<signature>``. The first of
+``ZAPP_SESSION_KEYS`` signs and any of them verifies, so a key is rotated by
+putting the new one first and dropping the old one once every token it
+signed has expired (``ZAPP_SESSION_MAX_AGE_SECONDS``).
+
+A signature can't say whether the identity has since been deleted. With
+``ZAPP_SESSION_REVALIDATE_SECONDS`` above zero, ``SessionSigner.current``
+also asks the database, at most once per identity per that many seconds.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from zapp_atlas.settings import AppSettings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+# Identities whose existence was checked recently; cleared when it grows past this.
+REVALIDATE_CACHE_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class SessionIdentity:
+    """Who a verified session cookie says is signed in."""
+
+    id: str
+    orcid_id: str
+    name: str | None
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _key_id(key: bytes) -> str:
+    return hashlib.sha256(key).hexdigest()[:8]
+
+
+class SessionSigner:
+    """Issues and verifies session tokens. Safe to share between threads."""
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        *,
+        max_age: int,
+        revalidate_seconds: float = 0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if not keys:
+            raise ValueError("at least one session key is required")
+        encoded = [key.encode() for key in keys]
+        self._signing_key = encoded[0]
+        self._keys = {_key_id(key): key for key in encoded}
+        self.max_age = max_age
+        self.revalidate_seconds = revalidate_seconds
+        self._clock = clock
+        # identity id -> (checked until, exists)
+        self._checked: dict[str, tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def _sign(self, key: bytes, message: str) -> str:
+        return _b64encode(hmac.new(key, message.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, identity_id: str, orcid_id: str, name: str | None) -> str:
+        claims = {
+            "sub": identity_id,
+            "orcid": orcid_id,
+            "name": name,
+            "exp": int(self._clock()) + self.max_age,
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        message = f"{TOKEN_VERSION}.{_key_id(self._signing_key)}.{payload}"
+        return f"{message}.{self._sign(self._signing_key, message)}"
+
+    def verify(self, token: str) -> SessionIdentity | None:
+        """The identity ``token`` names, or None if it is forged, malformed or expired."""
+        if not token.isascii():
+            # Anything we issued is ASCII; signing or comparing more would raise.
+            return None
+        try:
+            version, key_id, payload, signature = token.split(".")
+        except ValueError:
+            return None
+        key = self._keys.get(key_id)
+        if version != TOKEN_VERSION or key is None:
+            return None
+        expected = self._sign(key, f"{version}.{key_id}.{payload}")
+        if not hmac.compare_digest(signature, expected):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims["exp"] <= self._clock():
+            return None
+        return SessionIdentity(id=claims["sub"], orcid_id=claims["orcid"], name=claims["name"])
+
+    def current(self, token: str, exists: Callable[[str], bool]) -> SessionIdentity | None:
+        """Like ``verify``, and, if revalidation is on, drop identities that no
+        longer exist. ``exists`` is only called when the cache has no answer."""
+        identity = self.verify(token)
+        if identity is None or self.revalidate_seconds <= 0:
+            return identity
+        now = self._clock()
+        with self._lock:
+            checked = self._checked.get(identity.id)
+        if checked is None or checked[0] <= now:
+            # Asked outside the lock, so a slow query holds up no one else.
+            checked = (now + self.revalidate_seconds, exists(identity.id))
+            with self._lock:
+                if len(self._checked) >= REVALIDATE_CACHE_SIZE:
+                    self._checked.clear()
+                self._checked[identity.id] = checked
+        return identity if checked[1] else None
+
+
+def make_session_signer(settings: AppSettings) -> SessionSigner:
+    keys = [key.strip() for key in settings.session_keys.split(",") if key.strip()]
+    if not keys:
+        logger.warning(
+            "ZAPP_SESSION_KEYS is not set; signing sessions with a random key, "
+            "so everyone is signed out when the server restarts."
+        )
+        keys = [secrets.token_urlsafe(32)]
+    return SessionSigner(
+        keys,
+        max_age=settings.session_max_age_seconds,
+        revalidate_seconds=settings.session_revalidate_seconds,
+    )
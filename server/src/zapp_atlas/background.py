@@ -0,0 +1,146 @@
+"""Work the app does after it has started serving.
+
+The lifespan starts each of these as an asyncio task rather than awaiting it,
+so a large backlog never delays the first request. Blocking work runs in a
+worker thread one batch at a time, which is also where cancellation at
+shutdown takes effect.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from sqlalchemy.orm import sessionmaker
+
+from zapp_atlas.api.services.images import (
+    SWEEP_BATCH,
+    migrate_image_batch,
+    sweep_blob_deletion_batch,
+)
+from zapp_atlas.db.image_storage import Storage
+from zapp_atlas.db.replication import Replicator
+from zapp_atlas.html.prerender import StudyPrerenderer
+from zapp_atlas.seed import seed
+
+logger = logging.getLogger(__name__)
+
+
+def _seed_once(session_factory: sessionmaker) -> None:
+    with session_factory() as session:
+        seed(session)
+
+
+async def seed_database(session_factory: sessionmaker) -> None:
+    """Apply the demo seed data once the app is already serving."""
+    try:
+        await asyncio.to_thread(_seed_once, session_factory)
+    except Exception:
+        # The lifespan discards task results, so this is the only report.
+        logger.exception("Seeding demo data failed")
+        return
+    logger.info("Seeded demo data")
+
+
+def _migrate_images_once(
+    session_factory: sessionmaker, storage: Storage, after_id: int, batch_size: int
+) -> int | None:
+    with session_factory() as session:
+        return migrate_image_batch(session, storage, after_id=after_id, limit=batch_size)
+
+
+async def migrate_images(
+    session_factory: sessionmaker,
+    storage: Storage,
+    *,
+    batch_size: int = 100,
+    retry_interval: float = 30,
+) -> None:
+    """Backfill image metadata and re-lay local blobs, until none are left.
+
+    A batch that fails is retried every ``retry_interval`` seconds.
+    """
+    after_id = 0
+    while True:
+        try:
+            last = await asyncio.to_thread(
+                _migrate_images_once, session_factory, storage, after_id, batch_size
+            )
+        except Exception:
+            # Nothing of the batch committed; it is picked up again as is.
+            logger.exception("Image migration failed after id %d; retrying", after_id)
+            await asyncio.sleep(retry_interval)
+            continue
+        if last is None:
+            return
+        after_id = last
+        logger.info("Migrated images up to id %d", after_id)
+
+
+def _sweep_once(session_factory: sessionmaker, storage: Storage) -> int:
+    with session_factory() as session:
+        return sweep_blob_deletion_batch(session, storage)
+
+
+async def sweep_blob_deletions(
+    session_factory: sessionmaker, storage: Storage, *, interval: float
+) -> None:
+    """Drain the blob-deletion outbox for as long as the app runs.
+
+    A full batch means more rows are probably due, so the next one starts
+    immediately; otherwise the sweeper sleeps ``interval`` seconds.
+    """
+    while True:
+        try:
+            handled = await asyncio.to_thread(_sweep_once, session_factory, storage)
+        except Exception:
+            # A broken sweep must not end the loop; the rows are still queued.
+            logger.exception("Blob deletion sweep failed")
+            handled = 0
+        if handled < SWEEP_BATCH:
+            await asyncio.sleep(interval)
+
+
+def _replicate_once(replicator: Replicator) -> None:
+    try:
+        replicator.sync()
+    except Exception:
+        # Unshipped, the WAL would grow for as long as the replica is down.
+        replicator.relieve()
+        raise
+
+
+async def replicate_database(replicator: Replicator, *, interval: float) -> None:
+    """Ship the database's WAL to the replica every ``interval`` seconds.
+
+    Ships whatever is left, and closes the replicator, when cancelled.
+    """
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(_replicate_once, replicator)
+            except Exception:
+                logger.exception("Database replication failed; retrying")
+            await asyncio.sleep(interval)
+    finally:
+        await asyncio.to_thread(replicator.close)
+
+
+async def catch_up_prerendered(prerenderer: StudyPrerenderer) -> None:
+    """Render the study pages that changed, or went missing, while the app was down."""
+    rendered = await asyncio.to_thread(prerenderer.catch_up)
+    logger.info("Pre-rendered %d studies at startup", rendered)
+
+
+async def prerender_studies(prerenderer: StudyPrerenderer, *, interval: float) -> None:
+    """Re-render the studies this process's commits changed, every ``interval`` seconds.
+
+    Waiting a moment folds a burst of writes to one study into one render.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(prerenderer.render_pending)
+        except Exception:
+            # The studies stay queued for the next pass.
+            logger.exception("Pre-rendering studies failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,355 @@
+"""Compressing responses on the way out.
+
+Study JSON and pages repeat the same field names and ontology labels over
+and over, and shrink several times over when compressed. ``CompressionMiddleware``
+encodes any response worth it with the best coding the client accepts:
+
+    zstd    fastest for its ratio; Python 3.14's ``compression.zstd``, or the
+            ``backports.zstd`` package before that
+    br      smallest, but the slowest per byte, so only up to ``BROTLI_MAX_BYTES``;
+            needs the ``brotli`` package
+    gzip    always available, and understood everywhere
+
+The codings whose packages are missing are simply never offered (install the
+``compression`` extra for all three). Nothing under ``MIN_BYTES`` is
+compressed, since the saving would be smaller than the headers announcing it.
+A streamed response's size is unknown until it ends, so it is compressed
+chunk by chunk, flushing each, which keeps it streaming; brotli is not used
+for those.
+
+Responses that already carry a ``Content-Encoding`` (the precompressed static
+files, see ``html/assets.py``) are left alone, as are formats that are
+compressed already, such as PNG and JPEG images and ZIP exports.
+
+Bytes in and out and the CPU time spent, per coding, are kept in
+``CompressionMetrics`` and reported at ``/health/compression``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from typing import Protocol
+
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from zapp_atlas.html.assets import accepted_encodings
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Below this, the saving is smaller than the headers that announce it.
+MIN_BYTES = 1024
+# Above this, brotli costs several times the CPU of zstd for a few percent.
+BROTLI_MAX_BYTES = 1024 * 1024
+# Whole bodies larger than this are compressed off the event loop.
+OFFLOAD_BYTES = 256 * 1024
+
+# Dynamic content: levels that stay cheap per request, not the build-time
+# maximums of client/scripts/precompress.mjs.
+ZSTD_LEVEL = 3
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+
+# Image formats that are not compressed already.
+_COMPRESSIBLE_IMAGES = {"image/svg+xml", "image/bmp", "image/x-ms-bmp"}
+_COMPRESSED_TYPES = {
+    "application/gzip",
+    "application/octet-stream",
+    "application/pdf",
+    "application/zip",
+    "application/zstd",
+    "font/woff",
+    "font/woff2",
+}
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        """Compress ``data``, flushed so that everything so far decodes."""
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipEncoder:
+    def __init__(self) -> None:
+        # wbits 31: a gzip header and trailer around the deflate stream.
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _ZstdEncoder:
+    def __init__(self) -> None:
+        self._compressor = zstd.ZstdCompressor(level=ZSTD_LEVEL)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data, mode=zstd.ZstdCompressor.FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+@dataclass(frozen=True)
+class Coding:
+    name: str
+    compress: Callable[[bytes], bytes]
+    # None when the coding is not used for streamed responses.
+    encoder: Callable[[], Encoder] | None
+    max_bytes: int | None = None
+
+
+def _available_codings() -> tuple[Coding, ...]:
+    """The codings this process can produce, most preferred first."""
+    codings = []
+    if zstd is not None:
+        codings.append(
+            Coding("zstd", lambda data: zstd.compress(data, level=ZSTD_LEVEL), _ZstdEncoder)
+        )
+    if brotli is not None:
+        codings.append(
+            Coding(
+                "br",
+                lambda data: brotli.compress(data, quality=BROTLI_QUALITY),
+                None,
+                max_bytes=BROTLI_MAX_BYTES,
+            )
+        )
+    codings.append(
+        Coding("gzip", lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0), _GzipEncoder)
+    )
+    return tuple(codings)
+
+
+CODINGS = _available_codings()
+
+
+def choose_coding(
+    accept_encoding: str, size: int | None, *, streamed: bool = False, min_bytes: int = MIN_BYTES
+) -> Coding | None:
+    """The coding to send a body of ``size`` bytes in, if any.
+
+    ``size`` is None for a streamed body of unknown length.
+    """
+    if size is not None and size < min_bytes:
+        return None
+    accepted = accepted_encodings(accept_encoding)
+    for coding in CODINGS:
+        if coding.name not in accepted or (streamed and coding.encoder is None):
+            continue
+        if coding.max_bytes is not None and (size is None or size > coding.max_bytes):
+            continue
+        return coding
+    return None
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+    if not content_type or content_type in _COMPRESSED_TYPES:
+        return False
+    major = content_type.partition("/")[0]
+    if major in ("image", "audio", "video"):
+        return content_type in _COMPRESSIBLE_IMAGES
+    return True
+
+
+@dataclass(frozen=True)
+class CodingStats:
+    responses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+
+
+class CompressionMetrics:
+    """Per-coding totals since the process started."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, CodingStats] = {}
+        self._uncompressed = 0
+
+    def record(
+        self, coding: str, bytes_in: int, bytes_out: int, cpu_seconds: float, *, response: bool
+    ) -> None:
+        with self._lock:
+            stats = self._stats.get(coding, CodingStats())
+            self._stats[coding] = replace(
+                stats,
+                responses=stats.responses + response,
+                bytes_in=stats.bytes_in + bytes_in,
+                bytes_out=stats.bytes_out + bytes_out,
+                cpu_seconds=stats.cpu_seconds + cpu_seconds,
+            )
+
+    def record_uncompressed(self) -> None:
+        with self._lock:
+            self._uncompressed += 1
+
+    def stats(self) -> dict[str, CodingStats]:
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def uncompressed(self) -> int:
+        with self._lock:
+            return self._uncompressed
+
+
+def get_compression_metrics(request: Request) -> CompressionMetrics:
+    return request.app.state.compression
+
+
+class CompressionMiddleware:
+    def __init__(
+        self, app: ASGIApp, metrics: CompressionMetrics, min_bytes: int = MIN_BYTES
+    ) -> None:
+        self.app = app
+        self.metrics = metrics
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if not accept_encoding:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(send, accept_encoding, self.metrics, self.min_bytes)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    """Holds back the response start until the first body shows its size."""
+
+    def __init__(
+        self, send: Send, accept_encoding: str, metrics: CompressionMetrics, min_bytes: int
+    ) -> None:
+        self._send = send
+        self.accept_encoding = accept_encoding
+        self.metrics = metrics
+        self.min_bytes = min_bytes
+        self.start: Message | None = None
+        self.coding: Coding | None = None
+        self.encoder: Encoder | None = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if self.start is None:
+            # Early hints before the start, or the body of a response
+            # already decided on.
+            if self.encoder is not None and message["type"] == "http.response.body":
+                message = self._encode_chunk(message)
+            await self._send(message)
+            return
+
+        start, self.start = self.start, None
+        headers = Headers(raw=start["headers"])
+        if message["type"] != "http.response.body" or not _is_compressible(headers):
+            await self._pass(start, message)
+            return
+
+        body = message.get("body", b"")
+        streaming = message.get("more_body", False)
+        if not streaming:
+            size = len(body)
+        elif "content-length" in headers:
+            size = int(headers["content-length"])
+        else:
+            size = None
+        self.coding = choose_coding(
+            self.accept_encoding, size, streamed=streaming, min_bytes=self.min_bytes
+        )
+        if self.coding is None:
+            await self._pass(start, message)
+            return
+
+        if streaming:
+            self.encoder = self.coding.encoder()
+            _encoded_headers(start, self.coding.name, None)
+            await self._send(start)
+            await self._send(self._encode_chunk(message, first=True))
+            return
+
+        if len(body) > OFFLOAD_BYTES:
+            compressed = await asyncio.to_thread(self._compress, body)
+        else:
+            compressed = self._compress(body)
+        _encoded_headers(start, self.coding.name, len(compressed))
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _pass(self, start: Message, message: Message) -> None:
+        self.metrics.record_uncompressed()
+        await self._send(start)
+        await self._send(message)
+
+    def _compress(self, body: bytes) -> bytes:
+        started = time.thread_time()
+        compressed = self.coding.compress(body)
+        self.metrics.record(
+            self.coding.name,
+            len(body),
+            len(compressed),
+            time.thread_time() - started,
+            response=True,
+        )
+        return compressed
+
+    def _encode_chunk(self, message: Message, *, first: bool = False) -> Message:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        started = time.thread_time()
+        chunk = self.encoder.compress(body) if body else b""
+        if not more_body:
+            chunk += self.encoder.finish()
+        self.metrics.record(
+            self.coding.name, len(body), len(chunk), time.thread_time() - started, response=first
+        )
+        return {"type": "http.response.body", "body": chunk, "more_body": more_body}
+
+
+def _encoded_headers(start: Message, coding: str, length: int | None) -> None:
+    headers = MutableHeaders(scope=start)
+    headers["Content-Encoding"] = coding
+    if length is None:
+        del headers["Content-Length"]
+    else:
+        headers["Content-Length"] = str(length)
+    vary = headers.get("vary", "")
+    if "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+    # The ETag is kept as it is, so that it matches the one on a 304 (which
+    # has no body to compress); Vary keeps caches from mixing encodings.
@@ -1,2 +1,3 @@
 from .db import *
 from .init_db import *
+from .versions import *
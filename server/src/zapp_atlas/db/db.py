@@ -1,21 +1,172 @@
+import functools
+import logging
+import random
+import sqlite3
+import time
 from pathlib import Path
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Connection, Table, create_engine, event, insert, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
 
 from zapp_atlas.settings import AppSettings, DEFAULT_DB_PATH, load_settings
 from zapp_atlas.schema.sqla import Base
 import zapp_atlas.auth.models  # noqa: F401
+import zapp_atlas.db.models
+
+logger = logging.getLogger(__name__)
+
+# A write that still finds the database busy after ``busy_timeout`` is
+# re-run this many times in total, with jittered exponential backoff.
+BUSY_ATTEMPTS = 5
+_BUSY_BACKOFF_BASE = 0.05
 
 
 def get_db_path(settings: AppSettings | None = None) -> Path:
     return (settings or load_settings()).db_path
 
 
+# SQLSTATEs for which Postgres asks the client to re-run the transaction.
+_PG_RETRY_SQLSTATES = ("40001", "40P01")  # serialization_failure, deadlock_detected
+
+
 def get_engine(db_path: Path | None = None, settings: AppSettings | None = None):
-    path = db_path or get_db_path(settings)
+    """Engine for the app's database, configured for several processes.
+
+    ``database_url`` selects a server database, with a pool sized by the
+    ``db_pool_*`` settings. Otherwise it is the SQLite file at ``db_path``:
+    each connection waits up to ``sqlite_busy_timeout_ms`` for a lock and
+    uses ``sqlite_journal_mode`` — WAL by default, so readers never block
+    the writer, or each other.
+    """
+    settings = settings or load_settings()
+    if db_path is None and not settings.uses_sqlite:
+        return create_engine(
+            settings.database_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            # A connection the server closed is replaced, not handed to a request.
+            pool_pre_ping=True,
+        )
+    path = db_path or settings.db_path
     path.parent.mkdir(parents=True, exist_ok=True)
-    return create_engine(f"sqlite:///{path}", echo=False)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        echo=False,
+        connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000},
+    )
+    journal_mode = settings.sqlite_journal_mode
+    replicated = bool(settings.replica_prefix)
+
+    @event.listens_for(engine, "connect")
+    def _set_journal_mode(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+        if journal_mode == "wal":
+            # Durable at every checkpoint rather than every commit: the WAL
+            # guarantees consistency, and commits no longer wait on fsync.
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        if replicated:
+            # The replicator checkpoints, once it has shipped the frames.
+            cursor.execute("PRAGMA wal_autocheckpoint = 0")
+        cursor.close()
+
+    return engine
+
+
+def is_busy_error(exc: BaseException) -> bool:
+    """Whether ``exc`` is a conflict with another connection that a re-run can resolve.
+
+    For SQLite that is a lock held elsewhere; for Postgres, a serialization
+    failure or a deadlock.
+    """
+    orig = getattr(exc, "orig", exc)
+    if getattr(orig, "sqlstate", None) in _PG_RETRY_SQLSTATES:
+        return True
+    if not isinstance(orig, sqlite3.OperationalError):
+        return False
+    # Extended codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in the low byte.
+    code = getattr(orig, "sqlite_errorcode", 0) & 0xFF
+    return code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+def retry_on_busy(fn):
+    """Re-run a write service when the database reports a conflicting writer.
+
+    ``busy_timeout`` already makes a connection wait for the write lock,
+    but a transaction that read before writing fails at once if another
+    process committed in between — waiting cannot help it. The decorated
+    function takes the session first; it is rolled back and the call
+    repeated from scratch, so the function must do all its work (and
+    commit) inside the call and must not have touched anything outside
+    the database.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(session: Session, *args, **kwargs):
+        for attempt in range(1, BUSY_ATTEMPTS + 1):
+            try:
+                return fn(session, *args, **kwargs)
+            except OperationalError as exc:
+                if attempt == BUSY_ATTEMPTS or not is_busy_error(exc):
+                    raise
+                session.rollback()
+                delay = random.uniform(0, _BUSY_BACKOFF_BASE * 2**attempt)
+                logger.info("%s: database busy, retrying in %.3fs", fn.__name__, delay)
+                time.sleep(delay)
+
+    return wrapper
+
+
+def dialect_insert(bind, table):
+    """``INSERT`` for ``bind``'s dialect, which has ``on_conflict_do_update``.
+
+    SQLite and Postgres share the ``ON CONFLICT`` syntax, so an upsert
+    built on this runs unchanged on either.
+    """
+    if bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def bulk_insert(conn: Connection, table: Table, rows: list[dict]) -> None:
+    """Insert many rows at once: ``COPY`` on Postgres, executemany elsewhere.
+
+    Every row must have the same keys. Explicit primary keys don't advance
+    Postgres sequences; call ``reset_sequences`` after the load.
+    """
+    if not rows:
+        return
+    if conn.dialect.name != "postgresql":
+        conn.execute(insert(table), rows)
+        return
+    columns = list(rows[0])
+    names = ", ".join(f'"{name}"' for name in columns)
+    cursor = conn.connection.dbapi_connection.cursor()
+    with cursor.copy(f'COPY "{table.name}" ({names}) FROM STDIN') as copy:
+        for row in rows:
+            copy.write_row([row[name] for name in columns])
+
+
+def reset_sequences(conn: Connection) -> None:
+    """Move each Postgres id sequence past the largest id in its table."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        column = table.autoincrement_column
+        if column is None:
+            continue
+        conn.execute(
+            text(
+                "SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f'COALESCE(MAX("{column.name}"), 1), MAX("{column.name}") IS NOT NULL) '
+                f'FROM "{table.name}"'
+            ),
+            {"table": f'"{table.name}"', "column": column.name},
+        )
 
 
 def get_session_factory(engine=None):
@@ -23,7 +174,31 @@ def get_session_factory(engine=None):
     return sessionmaker(bind=engine)
 
 
+def _add_missing_columns(engine) -> None:
+    """Add nullable columns the schema has gained since a table was created.
+
+    ``create_all`` only creates missing tables, so a slot added to an existing
+    class would otherwise never reach a deployed database. Only additive,
+    nullable changes are handled; anything else needs a real migration.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                )
+
+
 def init_db(engine=None):
     engine = engine or get_engine()
     Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
     return engine
@@ -8,27 +8,82 @@ Two backends:
   R2, MinIO, Backblaze B2, ...). Activated when ``ZAPP_AWS_ENDPOINT_URL_S3``
   and ``ZAPP_BUCKET_NAME`` are both set.
 
+Either can be wrapped in ``CachingStorage``, a size-bounded local disk cache
+(enabled by ``ZAPP_STORAGE_CACHE_DIR``) that saves re-downloading blobs the
+app streams itself.
+
 Callers get a ``Storage`` instance from ``get_storage()``; backends are
 swapped without the caller noticing.
 """
 
 from __future__ import annotations
 
+import hashlib
+import os
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
 from dataclasses import dataclass
 from pathlib import Path
+from urllib.parse import quote, unquote
 
 from zapp_atlas.settings import AppSettings, load_settings
 
+# S3's DeleteObjects accepts at most this many keys per request.
+DELETE_BATCH_MAX = 1000
+
+# Presigned GET URLs are signed for an hour, reused until five minutes
+# before they expire, and remembered for this many keys at most.
+PRESIGNED_URL_TTL = 3600
+PRESIGNED_URL_REFRESH_MARGIN = 300
+PRESIGNED_URL_CACHE_SIZE = 10_000
+
 
 @dataclass
 class StoredObject:
-    """Bytes + their content type. Returned from ``Storage.get()``."""
+    """Bytes + their content type. Returned from ``Storage.get()``.
+
+    Backends that keep no per-object metadata report
+    ``application/octet-stream``; the ``Image`` row is authoritative.
+    """
 
     data: bytes
     content_type: str
 
 
+@dataclass
+class ObjectInfo:
+    """Size + content type of a stored object, without its bytes."""
+
+    size: int
+    content_type: str
+
+
+@dataclass
+class ObjectUrl:
+    """A URL clients can fetch an object from directly.
+
+    ``expires_in`` is how many more seconds the URL stays valid, or None if
+    it never expires (a public bucket URL).
+    """
+
+    url: str
+    expires_in: int | None = None
+
+
+@dataclass
+class PresignedUpload:
+    """Where and how a client sends bytes straight to the backend."""
+
+    url: str
+    method: str
+    headers: dict[str, str]
+    expires_in: int
+
+
 class Storage(ABC):
     @abstractmethod
     def put(self, key: str, data: bytes, content_type: str) -> None: ...
@@ -40,49 +95,115 @@ class Storage(ABC):
     def delete(self, key: str) -> None:
         """Remove the object at ``key``. Silent no-op if it doesn't exist."""
 
+    def delete_many(self, keys: Sequence[str]) -> dict[str, str]:
+        """Remove several objects; return ``{key: error}`` for those that failed.
+
+        The default deletes one key at a time. Backends with a bulk delete
+        override it.
+        """
+        failed: dict[str, str] = {}
+        for key in keys:
+            try:
+                self.delete(key)
+            except Exception as exc:  # reported back per key
+                failed[key] = str(exc)
+        return failed
+
     @abstractmethod
-    def url_for(self, key: str) -> str | None:
+    def head(self, key: str) -> ObjectInfo | None:
+        """Describe the object at ``key`` without fetching it, or None if absent."""
+
+    @abstractmethod
+    def url_for(self, key: str) -> ObjectUrl | None:
         """Return a URL clients can fetch directly, or None to force streaming."""
 
+    def presign_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> PresignedUpload | None:
+        """Let a client write ``key`` directly, bypassing the app.
+
+        None when the backend cannot accept direct uploads; callers then
+        fall back to streaming the bytes through the app.
+        """
+        return None
+
 
 class LocalFilesystemStorage(Storage):
-    """Writes blobs under ``root``; companions a ``.type`` file per blob for
-    content-type roundtrip."""
+    """Writes blobs under ``root``, one file per key, in hashed subdirectories.
+
+    A key lives at ``root/ab/cd/<quoted key>``, where ``abcd…`` is the SHA-256
+    of the key, so no directory grows past a few hundred entries. Nothing but
+    the bytes is stored: content type and size live on the ``Image`` row, so
+    serving a blob is a single file read. Objects read back from here report
+    ``application/octet-stream``.
+
+    Earlier versions wrote ``root/<key>`` plus a ``<key>.type`` sidecar. Those
+    files are still read, and ``migrate_legacy`` moves them into place.
+    """
 
     def __init__(self, root: Path) -> None:
         self.root = root
         self.root.mkdir(parents=True, exist_ok=True)
 
-    def _path(self, key: str) -> Path:
-        return self.root / key
+    def path_for(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / digest[2:4] / quote(key, safe="")
+
+    def _legacy_paths(self, key: str) -> tuple[Path, Path]:
+        path = self.root / key
+        return path, path.with_suffix(path.suffix + ".type")
+
+    def _legacy_type(self, type_path: Path) -> str:
+        if type_path.is_file():
+            return type_path.read_text().strip()
+        return "application/octet-stream"
 
     def put(self, key: str, data: bytes, content_type: str) -> None:
-        path = self._path(key)
+        path = self.path_for(key)
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_bytes(data)
-        path.with_suffix(path.suffix + ".type").write_text(content_type)
 
     def get(self, key: str) -> StoredObject | None:
-        path = self._path(key)
-        if not path.is_file():
+        try:
+            return StoredObject(
+                data=self.path_for(key).read_bytes(),
+                content_type="application/octet-stream",
+            )
+        except FileNotFoundError:
+            pass
+        legacy, type_path = self._legacy_paths(key)
+        if not legacy.is_file():
             return None
-        type_path = path.with_suffix(path.suffix + ".type")
-        content_type = (
-            type_path.read_text().strip()
-            if type_path.is_file()
-            else "application/octet-stream"
-        )
-        return StoredObject(data=path.read_bytes(), content_type=content_type)
+        return StoredObject(data=legacy.read_bytes(), content_type=self._legacy_type(type_path))
 
     def delete(self, key: str) -> None:
-        path = self._path(key)
-        type_path = path.with_suffix(path.suffix + ".type")
-        path.unlink(missing_ok=True)
-        type_path.unlink(missing_ok=True)
+        self.path_for(key).unlink(missing_ok=True)
+        for path in self._legacy_paths(key):
+            path.unlink(missing_ok=True)
+
+    def head(self, key: str) -> ObjectInfo | None:
+        path = self.path_for(key)
+        if path.is_file():
+            return ObjectInfo(size=path.stat().st_size, content_type="application/octet-stream")
+        legacy, type_path = self._legacy_paths(key)
+        if not legacy.is_file():
+            return None
+        return ObjectInfo(size=legacy.stat().st_size, content_type=self._legacy_type(type_path))
 
-    def url_for(self, key: str) -> str | None:
+    def url_for(self, key: str) -> ObjectUrl | None:
         return None  # force streaming via the app
 
+    def migrate_legacy(self, key: str) -> bool:
+        """Move ``key`` from the flat layout into its shard. True if it moved."""
+        legacy, type_path = self._legacy_paths(key)
+        if not legacy.is_file():
+            return False
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        legacy.replace(path)
+        type_path.unlink(missing_ok=True)
+        return True
+
 
 class BucketStorage(Storage):
     """S3-compatible object-store backend (Tigris, R2, MinIO, ...). Lazy-imports boto3."""
@@ -95,11 +216,12 @@ class BucketStorage(Storage):
         self._bucket = bucket
         self._client = boto3.client("s3", endpoint_url=endpoint_url)
         self._public_url_prefix = public_url_prefix
+        # key -> (presigned GET url, time.monotonic() at which it expires)
+        self._url_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._url_lock = threading.Lock()
 
     def put(self, key: str, data: bytes, content_type: str) -> None:
-        self._client.put_object(
-            Bucket=self._bucket, Key=key, Body=data, ContentType=content_type
-        )
+        self._client.put_object(Bucket=self._bucket, Key=key, Body=data, ContentType=content_type)
 
     def get(self, key: str) -> StoredObject | None:
         try:
@@ -112,19 +234,247 @@ class BucketStorage(Storage):
         )
 
     def delete(self, key: str) -> None:
+        self._forget_urls([key])
         try:
             self._client.delete_object(Bucket=self._bucket, Key=key)
         except self._client.exceptions.NoSuchKey:
             pass
 
-    def url_for(self, key: str) -> str | None:
+    def delete_many(self, keys: Sequence[str]) -> dict[str, str]:
+        self._forget_urls(keys)
+        failed: dict[str, str] = {}
+        for start in range(0, len(keys), DELETE_BATCH_MAX):
+            chunk = keys[start : start + DELETE_BATCH_MAX]
+            try:
+                resp = self._client.delete_objects(
+                    Bucket=self._bucket,
+                    Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+                )
+            except Exception as exc:  # the whole chunk is retried
+                failed.update(dict.fromkeys(chunk, str(exc)))
+                continue
+            # Quiet mode lists only failures; a key that was already gone
+            # counts as deleted.
+            for error in resp.get("Errors", []):
+                failed[error["Key"]] = f"{error.get('Code')}: {error.get('Message')}"
+        return failed
+
+    def head(self, key: str) -> ObjectInfo | None:
+        from botocore.exceptions import ClientError  # lazy, optional
+
+        try:
+            resp = self._client.head_object(Bucket=self._bucket, Key=key)
+        except ClientError as exc:
+            # HEAD has no body, so a missing key arrives as a bare 404 rather
+            # than the modelled NoSuchKey.
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        return ObjectInfo(
+            size=resp["ContentLength"],
+            content_type=resp.get("ContentType", "application/octet-stream"),
+        )
+
+    def presign_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> PresignedUpload | None:
+        # ContentType is part of the signature, so the client must send the
+        # exact header back; anything else is rejected by the bucket.
+        url = self._client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self._bucket, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires_in,
+        )
+        return PresignedUpload(
+            url=url,
+            method="PUT",
+            headers={"Content-Type": content_type},
+            expires_in=expires_in,
+        )
+
+    def url_for(self, key: str) -> ObjectUrl | None:
         if self._public_url_prefix:
-            return f"{self._public_url_prefix.rstrip('/')}/{key}"
-        return self._client.generate_presigned_url(
+            return ObjectUrl(url=f"{self._public_url_prefix.rstrip('/')}/{key}")
+
+        # Signing costs CPU, and a fresh signature is a fresh URL that no
+        # browser or CDN has cached; reuse one until it is nearly expired.
+        now = time.monotonic()
+        with self._url_lock:
+            cached = self._url_cache.get(key)
+            if cached is not None and cached[1] - now > PRESIGNED_URL_REFRESH_MARGIN:
+                self._url_cache.move_to_end(key)
+                url, expires_at = cached
+                return ObjectUrl(url=url, expires_in=int(expires_at - now))
+
+        url = self._client.generate_presigned_url(
             "get_object",
             Params={"Bucket": self._bucket, "Key": key},
-            ExpiresIn=3600,
+            ExpiresIn=PRESIGNED_URL_TTL,
         )
+        with self._url_lock:
+            self._url_cache[key] = (url, now + PRESIGNED_URL_TTL)
+            self._url_cache.move_to_end(key)
+            while len(self._url_cache) > PRESIGNED_URL_CACHE_SIZE:
+                self._url_cache.popitem(last=False)
+        return ObjectUrl(url=url, expires_in=PRESIGNED_URL_TTL)
+
+    def _forget_urls(self, keys: Iterable[str]) -> None:
+        with self._url_lock:
+            for key in keys:
+                self._url_cache.pop(key, None)
+
+
+@dataclass
+class CacheStats:
+    """Counters for a ``CachingStorage``, since the process started."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class CachingStorage(Storage):
+    """Read-through, write-through local disk cache in front of another backend.
+
+    ``get`` serves from disk when it can and otherwise fetches from the
+    backend and keeps a copy; ``put`` writes to both; ``delete`` drops the
+    copy first. Least recently used blobs are evicted once the cache holds
+    more than ``max_bytes``. Each file is the content type, a newline, then
+    the bytes, so the index can be rebuilt from disk after a restart.
+    """
+
+    def __init__(self, backend: Storage, root: Path, max_bytes: int) -> None:
+        self.backend = backend
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # key -> (size of the blob, its content type); oldest use first
+        self._index: OrderedDict[str, tuple[int, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats(max_bytes=max_bytes)
+        self._load_index()
+
+    def path_for(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.root / digest[:2] / digest[2:4] / quote(key, safe="")
+
+    def _load_index(self) -> None:
+        files = [
+            path
+            for path in self.root.glob("*/*/*")
+            if path.is_file() and not path.name.startswith(".")
+        ]
+        for path in sorted(files, key=lambda path: path.stat().st_atime):
+            with path.open("rb") as fh:
+                content_type = fh.readline().rstrip(b"\n").decode()
+            size = path.stat().st_size - len(content_type) - 1
+            self._index[unquote(path.name)] = (size, content_type)
+            self._bytes += size
+        self._evict()
+
+    def _store(self, key: str, data: bytes, content_type: str) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write aside and rename, so a reader never sees half a file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".partial-")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content_type.encode() + b"\n")
+            fh.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0]
+            self._index[key] = (len(data), content_type)
+            self._bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under budget. Holds the lock."""
+        while self._bytes > self.max_bytes and self._index:
+            key, (size, _) = self._index.popitem(last=False)
+            self._bytes -= size
+            self._stats.evictions += 1
+            self.path_for(key).unlink(missing_ok=True)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0]
+        self.path_for(key).unlink(missing_ok=True)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=len(self._index),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self.backend.put(key, data, content_type)
+        self._store(key, data, content_type)
+
+    def get(self, key: str) -> StoredObject | None:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                self._index.move_to_end(key)
+        if entry is not None:
+            try:
+                raw = self.path_for(key).read_bytes()
+            except FileNotFoundError:
+                self._forget(key)
+            else:
+                with self._lock:
+                    self._stats.hits += 1
+                return StoredObject(data=raw[raw.index(b"\n") + 1 :], content_type=entry[1])
+
+        with self._lock:
+            self._stats.misses += 1
+        stored = self.backend.get(key)
+        if stored is not None:
+            self._store(key, stored.data, stored.content_type)
+        return stored
+
+    def delete(self, key: str) -> None:
+        self._forget(key)
+        self.backend.delete(key)
+
+    def delete_many(self, keys: Sequence[str]) -> dict[str, str]:
+        for key in keys:
+            self._forget(key)
+        return self.backend.delete_many(keys)
+
+    def head(self, key: str) -> ObjectInfo | None:
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is not None:
+            return ObjectInfo(size=entry[0], content_type=entry[1])
+        return self.backend.head(key)
+
+    def url_for(self, key: str) -> ObjectUrl | None:
+        return self.backend.url_for(key)
+
+    def presign_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> PresignedUpload | None:
+        return self.backend.presign_upload(key, content_type, expires_in=expires_in)
 
 
 def _default_local_dir(settings: AppSettings | None = None) -> Path:
@@ -135,13 +485,20 @@ def get_storage(settings: AppSettings | None = None) -> Storage:
     settings = settings or load_settings()
     endpoint = settings.aws_endpoint_url_s3
     bucket = settings.bucket_name
+    storage: Storage
     if endpoint and bucket:
-        return BucketStorage(
+        storage = BucketStorage(
             endpoint_url=endpoint,
             bucket=bucket,
             public_url_prefix=settings.bucket_public_url_prefix,
         )
-    return LocalFilesystemStorage(root=_default_local_dir(settings))
+    else:
+        storage = LocalFilesystemStorage(root=_default_local_dir(settings))
+    if settings.storage_cache_dir:
+        storage = CachingStorage(
+            storage, settings.storage_cache_dir, settings.storage_cache_max_bytes
+        )
+    return storage
 
 
 def max_upload_bytes(settings: AppSettings | None = None) -> int:
@@ -0,0 +1,80 @@
+"""Copy an existing SQLite atlas into an empty Postgres database.
+
+    python -m zapp_atlas.db.migrate_postgres zapp.db postgresql+psycopg://zapp@localhost/zapp
+
+Creates the schema on the target, then streams each table out of SQLite
+and into Postgres with ``COPY``, parents before children, all in one
+transaction: a failure leaves the target as empty as it was. Ids are kept,
+and the sequences moved past them, so existing links and URLs still work.
+Stop the app (or at least its writers) first; rows written during the
+copy may be missed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from zapp_atlas.db.db import bulk_insert, init_db, reset_sequences
+from zapp_atlas.schema.sqla import Base
+
+BATCH_ROWS = 10_000
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def migrate(sqlite_path: Path, database_url: str, *, batch: int = BATCH_ROWS) -> dict[str, int]:
+    """Copy every table; return the number of rows copied per table."""
+    if not sqlite_path.exists():
+        raise MigrationError(f"{sqlite_path} does not exist")
+    source = create_engine(f"sqlite:///{sqlite_path}")
+    target = create_engine(database_url)
+    try:
+        init_db(target)
+        present = inspect(source).get_table_names()
+        counts: dict[str, int] = {}
+        with source.connect() as reader, target.begin() as writer:
+            # SQLite hands back naive datetimes, which the app wrote in UTC.
+            writer.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+            for table in Base.metadata.sorted_tables:
+                if writer.scalar(select(func.count()).select_from(table)):
+                    raise MigrationError(f"{table.name} already has rows in the target")
+                if table.name not in present:
+                    continue
+                # An older file may lack columns added since; they stay null.
+                names = {column["name"] for column in inspect(source).get_columns(table.name)}
+                columns = [column for column in table.columns if column.name in names]
+                result = reader.execution_options(yield_per=batch).execute(select(*columns))
+                copied = 0
+                for rows in result.mappings().partitions():
+                    bulk_insert(writer, table, [dict(row) for row in rows])
+                    copied += len(rows)
+                counts[table.name] = copied
+            reset_sequences(writer)
+        return counts
+    finally:
+        source.dispose()
+        target.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m zapp_atlas.db.migrate_postgres")
+    parser.add_argument("sqlite_path", type=Path, help="SQLite atlas to copy from")
+    parser.add_argument("database_url", help="SQLAlchemy URL of an empty Postgres database")
+    parser.add_argument("--batch", type=int, default=BATCH_ROWS, help="rows per COPY batch")
+    args = parser.parse_args(argv)
+    try:
+        counts = migrate(args.sqlite_path, args.database_url, batch=args.batch)
+    except MigrationError as exc:
+        sys.exit(f"error: {exc}")
+    for table, rows in counts.items():
+        print(f"{rows:>10}  {table}")
+
+
+if __name__ == "__main__":
+    main()
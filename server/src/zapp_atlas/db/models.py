@@ -0,0 +1,122 @@
+"""Bookkeeping tables for blob storage and the app itself.
+
+These are plumbing, not part of the atlas data model, so they are
+declared here by hand rather than in the LinkML schema — the same way
+``auth.models`` declares ``OrcidIdentity``. They share the generated
+``Base`` so ``init_db`` creates them alongside everything else.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, Text, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from zapp_atlas.schema.sqla import Base
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+class Blob(Base):
+    """One stored object, shared by every image that references it.
+
+    ``ref_count`` is the number of ``ImageBlob`` rows pointing here; the
+    object is removed from storage only when it drops to zero.
+    """
+
+    __tablename__ = "Blob"
+
+    key: Mapped[str] = mapped_column(Text(), primary_key=True)
+    ref_count: Mapped[int] = mapped_column(Integer(), default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
+
+
+class ImageBlob(Base):
+    """Which blob holds an image's bytes.
+
+    Content-addressed and direct (presigned) uploads record their key here;
+    images without a row live at the per-id key ``images/{id}``.
+    """
+
+    __tablename__ = "ImageBlob"
+
+    image_id: Mapped[int] = mapped_column(Integer(), ForeignKey("Image.id"), primary_key=True)
+    blob_key: Mapped[str] = mapped_column(Text(), ForeignKey("Blob.key"), index=True)
+
+
+class PendingImageUpload(Base):
+    """A direct-to-bucket upload that has been granted but not finalized.
+
+    The client PUTs to ``blob_key`` with a presigned URL, then finalizes;
+    only then does an ``Image`` row exist. Rows past ``expires_at`` are
+    abandoned uploads.
+    """
+
+    __tablename__ = "PendingImageUpload"
+
+    id: Mapped[str] = mapped_column(Text(), primary_key=True)
+    observation_id: Mapped[int] = mapped_column(Integer(), ForeignKey("PhenotypeObservationSet.id"))
+    blob_key: Mapped[str] = mapped_column(Text())
+    content_type: Mapped[str] = mapped_column(Text())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+
+class BlobDeletion(Base):
+    """A stored object waiting to be removed — the blob-deletion outbox.
+
+    Request handlers never call the storage backend to delete; they insert a
+    row here in the same transaction that drops the last reference, and the
+    background sweeper (``background.sweep_blob_deletions``) removes the
+    objects in batches. A rolled-back request therefore never loses bytes a
+    surviving row still points at, and a failed delete is simply retried.
+
+    ``next_attempt_at`` is null until the first failure, then pushed back
+    exponentially; ``last_error`` keeps the most recent failure for operators.
+    """
+
+    __tablename__ = "BlobDeletion"
+
+    id: Mapped[int] = mapped_column(Integer(), primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(Text(), index=True)
+    attempts: Mapped[int] = mapped_column(Integer(), default=0, server_default=text("0"))
+    next_attempt_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    last_error: Mapped[str | None] = mapped_column(Text(), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=_utcnow, server_default=func.now()
+    )
+
+
+class Meta(Base):
+    """Small key/value facts about the database itself.
+
+    Holds e.g. the fingerprint of the seed data last applied, so startup can
+    tell with one primary-key lookup whether seeding has anything to do.
+    """
+
+    __tablename__ = "Meta"
+
+    key: Mapped[str] = mapped_column(Text(), primary_key=True)
+    value: Mapped[str] = mapped_column(Text())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=_utcnow, onupdate=_utcnow
+    )
+
+
+class StudyVersion(Base):
+    """How many times anything in a study has changed.
+
+    Bumped by ``db.versions`` whenever a flush touches the study or any row
+    under it, so rendered fragments can be cached under ``(study, version)``
+    and never need invalidating. The row outlives its study: ids are not
+    reused, but if one were, its version would still only go up.
+    """
+
+    __tablename__ = "StudyVersion"
+
+    study_id: Mapped[int] = mapped_column(Integer(), primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(Integer(), default=1)
@@ -0,0 +1,357 @@
+"""Continuous replication of the SQLite file to blob storage.
+
+The database stays on local disk; this module keeps a copy in ``Storage``
+(a bucket in production, a directory in tests) that is at most one sync
+interval behind, and restores from it on a machine that starts empty.
+
+A replica is a series of *generations*. Each one starts with a snapshot
+of the database file, followed by numbered *segments*: raw WAL bytes,
+cut at commit boundaries, in the order SQLite wrote them. Under ``prefix``:
+
+    latest                      {"generation": ..., "page_size": ...}
+    <generation>/snapshot       the database file
+    <generation>/00000000.wal   WAL bytes (from offset 0, with the WAL header,
+    <generation>/00000001.wal   whenever a new WAL cycle starts)
+
+Nothing is ever listed or rewritten except ``latest``, which moves once per
+generation, so any object store with put/get works.
+
+SQLite's own checkpoints would let WAL frames reach the database file and
+the WAL restart before they were shipped, so app connections run with
+``wal_autocheckpoint=0`` (see ``get_engine``) and ``Replicator`` checkpoints
+instead, right after shipping. If it ever finds frames it could not ship —
+the WAL restarted under it, or a write landed between shipping and the
+checkpoint — it starts a new generation rather than leave a gap. While the
+replica is unreachable nothing is shipped or checkpointed, so once the WAL
+passes ``MAX_WAL_BYTES`` ``relieve`` checkpoints it anyway and the next
+successful sync starts a new generation.
+
+Only one process may replicate a given prefix.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import secrets
+import sqlite3
+import struct
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from zapp_atlas.db.image_storage import CachingStorage, Storage
+
+logger = logging.getLogger(__name__)
+
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+_WAL_MAGIC = (0x377F0682, 0x377F0683)  # little-, big-endian checksums
+
+# Checkpoint (and so restart the WAL) once this much has been shipped.
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+# Checkpoint unshipped frames past this, rather than let every read slow down.
+MAX_WAL_BYTES = 64 * 1024 * 1024
+# Start a new generation after this many segments, which bounds restore time.
+SEGMENTS_PER_GENERATION = 1000
+
+_CONTENT_TYPE = "application/octet-stream"
+
+
+class ReplicationError(RuntimeError):
+    """The replica is unusable: a generation is missing objects it needs."""
+
+
+def replica_storage(storage: Storage) -> Storage:
+    """The backend to replicate to: never through the local blob cache."""
+    return storage.backend if isinstance(storage, CachingStorage) else storage
+
+
+def _checksum(data: bytes, s0: int, s1: int, big_endian: bool) -> tuple[int, int]:
+    words = struct.unpack(f"{'>' if big_endian else '<'}{len(data) // 4}I", data)
+    for i in range(0, len(words), 2):
+        s0 = (s0 + words[i] + s1) & 0xFFFFFFFF
+        s1 = (s1 + words[i + 1] + s0) & 0xFFFFFFFF
+    return s0, s1
+
+
+@dataclass(frozen=True)
+class WalHeader:
+    page_size: int
+    salts: bytes
+    checksum: tuple[int, int]
+    big_endian: bool
+
+    @classmethod
+    def parse(cls, data: bytes) -> WalHeader | None:
+        """The header, or ``None`` if ``data`` doesn't start with a valid one."""
+        if len(data) < WAL_HEADER_SIZE:
+            return None
+        magic, _version, page_size, _seq = struct.unpack(">IIII", data[:16])
+        if magic not in _WAL_MAGIC:
+            return None
+        big_endian = magic == _WAL_MAGIC[1]
+        checksum = struct.unpack(">II", data[24:32])
+        if _checksum(data[:24], 0, 0, big_endian) != checksum:
+            return None
+        return cls(page_size, data[16:24], checksum, big_endian)
+
+    @property
+    def frame_size(self) -> int:
+        return WAL_FRAME_HEADER_SIZE + self.page_size
+
+
+def committed_end(
+    data: bytes, start: int, header: WalHeader, checksum: tuple[int, int]
+) -> tuple[int, tuple[int, int]]:
+    """Offset just past the last committed frame at or after ``start``.
+
+    Walks frames from ``start`` (with ``checksum`` being the running value
+    there) while their salts and checksums hold, as SQLite's own recovery
+    does; a frame still being written, or left from an earlier WAL cycle,
+    ends the walk. Returns that offset and the running checksum at it.
+    """
+    end, end_checksum = start, checksum
+    offset = start
+    while offset + header.frame_size <= len(data):
+        frame = data[offset : offset + header.frame_size]
+        if frame[8:16] != header.salts:
+            break
+        checksum = _checksum(
+            frame[:8] + frame[WAL_FRAME_HEADER_SIZE:], *checksum, header.big_endian
+        )
+        if checksum != struct.unpack(">II", frame[16:24]):
+            break
+        offset += header.frame_size
+        if struct.unpack(">I", frame[4:8])[0]:  # database size: set on commit frames
+            end, end_checksum = offset, checksum
+    return end, end_checksum
+
+
+def apply_segment(db, data: bytes, page_size: int) -> None:
+    """Write the pages of a segment's frames into the open database file ``db``."""
+    offset = WAL_HEADER_SIZE if WalHeader.parse(data) else 0
+    frame_size = WAL_FRAME_HEADER_SIZE + page_size
+    while offset + frame_size <= len(data):
+        page_number, db_pages = struct.unpack(">II", data[offset : offset + 8])
+        db.seek((page_number - 1) * page_size)
+        db.write(data[offset + WAL_FRAME_HEADER_SIZE : offset + frame_size])
+        if db_pages:
+            db.truncate(db_pages * page_size)
+        offset += frame_size
+
+
+def _latest_key(prefix: str) -> str:
+    return f"{prefix}/latest"
+
+
+def _snapshot_key(prefix: str, generation: str) -> str:
+    return f"{prefix}/{generation}/snapshot"
+
+
+def _segment_key(prefix: str, generation: str, index: int) -> str:
+    return f"{prefix}/{generation}/{index:08d}.wal"
+
+
+def _read_latest(storage: Storage, prefix: str) -> dict | None:
+    stored = storage.get(_latest_key(prefix))
+    return json.loads(stored.data) if stored is not None else None
+
+
+def restore(storage: Storage, prefix: str, db_path: Path) -> bool:
+    """Rebuild ``db_path`` from the latest generation, if the file is missing.
+
+    Returns whether anything was restored: an existing database is never
+    touched, and an empty replica leaves the path for ``init_db`` to create.
+    """
+    if db_path.exists():
+        return False
+    latest = _read_latest(storage, prefix)
+    if latest is None:
+        return False
+    generation, page_size = latest["generation"], latest["page_size"]
+    snapshot = storage.get(_snapshot_key(prefix, generation))
+    if snapshot is None:
+        raise ReplicationError(f"Generation {generation} has no snapshot")
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = db_path.with_name(db_path.name + ".restoring")
+    partial.write_bytes(snapshot.data)
+    segments = 0
+    with partial.open("r+b") as db:
+        while (segment := storage.get(_segment_key(prefix, generation, segments))) is not None:
+            apply_segment(db, segment.data, page_size)
+            segments += 1
+    # A WAL left beside a missing database belongs to some other file.
+    for suffix in ("-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    partial.replace(db_path)
+    logger.info("Restored %s from generation %s (%d segments)", db_path, generation, segments)
+    return True
+
+
+class Replicator:
+    """Ships one database's WAL to ``storage`` under ``prefix``.
+
+    Not thread-safe: call ``sync`` from one thread at a time, as the
+    background task does.
+    """
+
+    def __init__(
+        self, db_path: Path, storage: Storage, prefix: str, *, busy_timeout: float = 5.0
+    ) -> None:
+        self.db_path = db_path
+        self.wal_path = Path(f"{db_path}-wal")
+        self.storage = storage
+        self.prefix = prefix
+        self._conn = sqlite3.connect(
+            db_path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        mode = self._conn.execute("PRAGMA journal_mode = wal").fetchone()[0]
+        if mode != "wal":
+            raise ReplicationError(f"{db_path} is in {mode} mode; replication needs WAL")
+        self._conn.execute("PRAGMA wal_autocheckpoint = 0")
+        self.generation: str | None = None
+        self._segments = 0
+        self._header: WalHeader | None = None
+        self._offset = 0
+        self._checksum = (0, 0)
+        # Set once everything in the current WAL is shipped and checkpointed,
+        # so the next writer may restart it.
+        self._may_restart = False
+        self._stale = False
+
+    def _read_wal(self, start: int = 0) -> tuple[bytes, bytes]:
+        """The WAL header and the bytes from ``start`` on (both empty if absent)."""
+        try:
+            with self.wal_path.open("rb") as wal:
+                header = wal.read(WAL_HEADER_SIZE)
+                wal.seek(start)
+                return header, wal.read()
+        except FileNotFoundError:
+            return b"", b""
+
+    def _put(self, key: str, data: bytes) -> None:
+        self.storage.put(key, data, _CONTENT_TYPE)
+
+    def _ship(self, data: bytes) -> None:
+        self._put(_segment_key(self.prefix, self.generation, self._segments), data)
+        self._segments += 1
+
+    def snapshot(self) -> None:
+        """Start a new generation from the database as it is now."""
+        previous = self.generation or (_read_latest(self.storage, self.prefix) or {}).get(
+            "generation"
+        )
+        generation = f"{datetime.now(UTC):%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+        # Fold the WAL into the file first, so the generation starts small.
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        # Hold the write lock so the file and the WAL agree with each other.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            database = self.db_path.read_bytes()
+            raw_header, wal = self._read_wal()
+        finally:
+            self._conn.execute("ROLLBACK")
+
+        header = WalHeader.parse(raw_header)
+        self.generation, self._segments = generation, 0
+        self._put(_snapshot_key(self.prefix, generation), database)
+        if header is None:
+            self._header, self._offset, self._may_restart = None, 0, True
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        else:
+            end, checksum = committed_end(wal, WAL_HEADER_SIZE, header, header.checksum)
+            if end > WAL_HEADER_SIZE:
+                self._ship(wal[:end])
+            self._header, self._offset, self._checksum = header, end, checksum
+            self._may_restart = False
+            page_size = header.page_size
+        self._put(
+            _latest_key(self.prefix),
+            json.dumps({"generation": generation, "page_size": page_size}).encode(),
+        )
+        self._stale = False
+        logger.info("Started replica generation %s (%d bytes)", generation, len(database))
+        if previous and previous != generation:
+            self._delete_generation(previous)
+
+    def _delete_generation(self, generation: str) -> None:
+        keys = [_snapshot_key(self.prefix, generation)]
+        while self.storage.head(key := _segment_key(self.prefix, generation, len(keys) - 1)):
+            keys.append(key)
+        failed = self.storage.delete_many(keys)
+        if failed:
+            logger.warning("Could not delete %d objects of generation %s", len(failed), generation)
+
+    def sync(self) -> int:
+        """Ship frames committed since the last call; returns the bytes shipped."""
+        if self.generation is None or self._stale or self._segments >= SEGMENTS_PER_GENERATION:
+            self.snapshot()
+
+        raw_header, _ = self._read_wal(WAL_HEADER_SIZE)
+        header = WalHeader.parse(raw_header)
+        if header is None:
+            return 0
+        if self._header is None or header.salts != self._header.salts:
+            if not self._may_restart:
+                logger.warning("WAL restarted before it was shipped; taking a new snapshot")
+                self.snapshot()
+                return 0
+            # A new WAL cycle: ship it from the top, header included.
+            self._header, self._offset, self._checksum = header, 0, header.checksum
+            self._may_restart = False
+
+        start = max(self._offset, WAL_HEADER_SIZE)
+        _, data = self._read_wal(start)
+        end, checksum = committed_end(data, 0, header, self._checksum)
+        if end == 0:
+            return 0
+        shipped = data[:end]
+        if self._offset == 0:
+            shipped = raw_header + shipped
+        self._ship(shipped)
+        self._offset, self._checksum = start + end, checksum
+        if self._offset >= CHECKPOINT_BYTES:
+            self.checkpoint()
+        return len(shipped)
+
+    def checkpoint(self) -> None:
+        """Copy the shipped WAL into the database file so the WAL can restart."""
+        _busy, log_frames, checkpointed = self._conn.execute(
+            "PRAGMA wal_checkpoint(RESTART)"
+        ).fetchone()
+        if checkpointed != log_frames or self._header is None:
+            return  # readers held it back; nothing was lost, try again later
+        shipped = (self._offset - WAL_HEADER_SIZE) // self._header.frame_size
+        if log_frames == shipped:
+            self._may_restart = True
+        else:
+            # A write landed after the last sync; once the WAL restarts it is
+            # only in the database file.
+            self._stale = True
+
+    def relieve(self) -> bool:
+        """Checkpoint a WAL past ``MAX_WAL_BYTES`` even though it wasn't shipped.
+
+        For when shipping keeps failing. The unshipped frames then exist only
+        in the database file, so the next ``sync`` takes a new snapshot.
+        Returns whether the WAL was checkpointed.
+        """
+        try:
+            size = self.wal_path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size < MAX_WAL_BYTES:
+            return False
+        logger.warning("WAL is %d bytes and unshipped; checkpointing it anyway", size)
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._stale = True
+        return True
+
+    def close(self) -> None:
+        """Ship what is left and release the connection."""
+        try:
+            self.sync()
+        finally:
+            self._conn.close()
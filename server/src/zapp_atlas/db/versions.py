@@ -0,0 +1,165 @@
+"""Per-study version numbers, bumped on every write under a study.
+
+An ``after_flush`` listener on every ``Session`` walks each inserted,
+updated or deleted row up its parent foreign keys to the study that owns
+it and bumps that study's ``StudyVersion``. Services need do nothing, and
+a write that is rolled back rolls its bump back with it. Code that must
+react once a change is durable subscribes with ``on_studies_committed``.
+
+Writes that bypass the ORM (``synth``'s bulk load, ``migrate_postgres``)
+leave no version row; such studies read as version 0 until their first
+change, which is right as long as the process serving them starts after
+the load.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, attributes
+
+from zapp_atlas.db.db import dialect_insert
+from zapp_atlas.db.models import StudyVersion
+from zapp_atlas.schema.sqla import (  # type: ignore
+    Control,
+    ControlImage,
+    Experiment,
+    ExposureEvent,
+    Image,
+    Phenotype,
+    PhenotypeObservationSet,
+    StressorChemical,
+    StressorChemicalSynonym,
+    Study,
+    StudyAnnotator,
+    VehicleOfTransmission,
+)
+
+__all__ = ["on_studies_committed", "owning_study_id", "study_version"]
+
+# session.info key: ids of the studies flushed since the last commit.
+_CHANGED = "changed_study_ids"
+_subscribers: list[Callable[[Session, set[int]], None]] = []
+
+# class -> (foreign key attribute naming its parent, parent class)
+PARENTS: dict[type, tuple[str, type]] = {
+    StudyAnnotator: ("Study_id", Study),
+    Experiment: ("Study_id", Study),
+    Control: ("Experiment_id", Experiment),
+    ExposureEvent: ("Experiment_id", Experiment),
+    StressorChemical: ("ExposureEvent_id", ExposureEvent),
+    VehicleOfTransmission: ("ExposureEvent_id", ExposureEvent),
+    PhenotypeObservationSet: ("ExposureEvent_id", ExposureEvent),
+    StressorChemicalSynonym: ("StressorChemical_id", StressorChemical),
+    Phenotype: ("PhenotypeObservationSet_id", PhenotypeObservationSet),
+    Image: ("PhenotypeObservationSet_id", PhenotypeObservationSet),
+    ControlImage: ("PhenotypeObservationSet_id", PhenotypeObservationSet),
+}
+PARENT_CLASSES = {parent for _, parent in PARENTS.values()}
+
+
+def _parent_ids(instance, attr: str) -> set[int]:
+    """The parent ids ``instance`` points at now, and pointed at before this flush."""
+    history = attributes.get_history(instance, attr, passive=attributes.PASSIVE_NO_FETCH)
+    return {value for value in history.sum() if value is not None}
+
+
+def owning_study_id(session: Session, instance) -> int | None:
+    """The id of the study ``instance`` belongs to, or None if it has none.
+
+    Parents are taken from the identity map where loaded and fetched
+    otherwise, one primary-key lookup per level.
+    """
+    return next(iter(_owning_study_ids(session, instance, {}, {})), None)
+
+
+def _owning_study_ids(session: Session, instance, flushed: dict, memo: dict) -> set[int]:
+    cls = type(instance)
+    if cls is Study:
+        return {instance.id}
+    if cls not in PARENTS:
+        return set()
+    attr, parent_cls = PARENTS[cls]
+    studies: set[int] = set()
+    for parent_id in _parent_ids(instance, attr):
+        if parent_cls is Study:
+            studies.add(parent_id)
+            continue
+        key = (parent_cls, parent_id)
+        if key not in memo:
+            # A parent deleted in the same flush is gone from the database
+            # and the identity map, but still in the flush's own objects.
+            with session.no_autoflush:
+                parent = flushed.get(key) or session.get(parent_cls, parent_id)
+            memo[key] = (
+                set() if parent is None else _owning_study_ids(session, parent, flushed, memo)
+            )
+        studies |= memo[key]
+    return studies
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_study_versions(session: Session, _flush_context) -> None:
+    # The session still lists what this flush wrote, with its history.
+    dirty = [instance for instance in session.dirty if session.is_modified(instance)]
+    changed = [
+        instance
+        for instance in (*session.new, *dirty, *session.deleted)
+        if type(instance) is Study or type(instance) in PARENTS
+    ]
+    if not changed:
+        return
+    flushed = {
+        (type(instance), instance.id): instance
+        for instance in changed
+        if type(instance) in PARENT_CLASSES
+    }
+    memo: dict = {}
+    study_ids: set[int] = set()
+    for instance in changed:
+        study_ids |= _owning_study_ids(session, instance, flushed, memo)
+    if not study_ids:
+        return
+    session.info.setdefault(_CHANGED, set()).update(study_ids)
+    table = StudyVersion.__table__
+    conn = session.connection()
+    conn.execute(
+        dialect_insert(conn, table).on_conflict_do_update(
+            index_elements=[table.c.study_id], set_={"version": table.c.version + 1}
+        ),
+        [{"study_id": study_id, "version": 1} for study_id in sorted(study_ids)],
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _announce_committed_studies(session: Session) -> None:
+    study_ids = session.info.pop(_CHANGED, None)
+    if study_ids:
+        for callback in _subscribers.copy():
+            callback(session, study_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_studies(session: Session) -> None:
+    session.info.pop(_CHANGED, None)
+
+
+def on_studies_committed(callback: Callable[[Session, set[int]], None]) -> Callable[[], None]:
+    """Call ``callback(session, study_ids)`` after each commit that changed studies.
+
+    It runs inside ``commit()``, so it must be quick and must not raise.
+    Returns a function that unsubscribes it.
+    """
+    _subscribers.append(callback)
+    return lambda: _subscribers.remove(callback)
+
+
+def study_version(session: Session, study_id: int) -> int | None:
+    """The study's current version, or None if there is no such study."""
+    return session.execute(
+        select(func.coalesce(StudyVersion.version, 0))
+        .select_from(Study)
+        .outerjoin(StudyVersion, StudyVersion.study_id == Study.id)
+        .where(Study.id == study_id)
+    ).scalar_one_or_none()
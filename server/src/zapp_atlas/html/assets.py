@@ -0,0 +1,95 @@
+"""Static files, sent precompressed and with the right caching headers.
+
+``StaticFiles`` sends every file as it is on disk. ``AssetFiles`` first
+looks for a brotli (``.br``) or gzip (``.gz``) copy beside the file, written
+at build time by ``client/scripts/precompress.mjs``, and sends the best one
+the browser accepts, with ``Content-Encoding`` set. A copy older than its
+file is ignored, so editing ``styles.css`` in development never serves a
+stale sidecar.
+
+Caching depends on whether a file's name changes with its content:
+
+- ``immutable=True`` (the Vite build, whose names carry a content hash):
+  cached for a year and never revalidated; a new build means new names.
+- Otherwise (``/static``): ``no-cache``, i.e. the browser keeps the file but
+  revalidates it each time, getting a 304 while it is unchanged.
+
+Every response carries an ``ETag`` (one per encoding) and
+``Vary: Accept-Encoding``.
+"""
+
+from __future__ import annotations
+
+import os
+from mimetypes import guess_type
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Most compact first.
+SIDECARS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """The codings an ``Accept-Encoding`` header allows (``q`` above zero)."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(coding for coding, _ in SIDECARS)
+    return accepted
+
+
+class AssetFiles(StaticFiles):
+    def __init__(self, *, immutable: bool = False, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        path = os.fspath(full_path)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for coding, suffix in SIDECARS:
+            if coding not in accepted:
+                continue
+            try:
+                sidecar_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            if sidecar_stat.st_mtime >= stat_result.st_mtime:
+                path, stat_result = path + suffix, sidecar_stat
+                headers["Content-Encoding"] = coding
+                break
+
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=guess_type(os.fspath(full_path))[0] or "text/plain",
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
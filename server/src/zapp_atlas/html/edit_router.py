@@ -9,6 +9,7 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, Request, status
 from fastapi.responses import HTMLResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from zapp_atlas.api.deps import get_app_settings
 from zapp_atlas.html.templating import templates
@@ -38,6 +39,46 @@ def make_edit_router(dist_dir: Path) -> APIRouter:
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        return templates.TemplateResponse(request, "edit.html", {"vite": vite})
+        headers = {"Link": ", ".join(vite.preload_links)} if vite.preload_links else None
+        return templates.TemplateResponse(request, "edit.html", {"vite": vite}, headers=headers)
 
     return router
+
+
+def _is_edit_document(path: str) -> bool:
+    return path == "/edit" or (path.startswith("/edit/") and not path.startswith("/edit/assets/"))
+
+
+class EarlyHintsMiddleware:
+    """Send the /edit document's preload links as a 103 Early Hints response.
+
+    The browser can then fetch the client's chunks while the document is
+    still being rendered. Only servers offering the ASGI
+    `http.response.early_hint` extension (e.g. Hypercorn) can send one;
+    under others this does nothing, and the `Link` header on the document
+    still names the same chunks.
+    """
+
+    def __init__(self, app: ASGIApp, dist_dir: Path) -> None:
+        self.app = app
+        self.dist_dir = dist_dir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and "http.response.early_hint" in scope.get("extensions", {})
+            and _is_edit_document(scope["path"])
+        ):
+            settings = scope["app"].state.settings
+            try:
+                links = get_vite_assets(self.dist_dir, settings.vite_dev_server).preload_links
+            except ViteAssetsUnavailable:
+                links = ()
+            if links:
+                await send(
+                    {
+                        "type": "http.response.early_hint",
+                        "links": [link.encode() for link in links],
+                    }
+                )
+        await self.app(scope, receive, send)
@@ -0,0 +1,97 @@
+"""Rendered HTML fragments, cached by the version of the study they show.
+
+Every fragment of the study pages is keyed by what it shows and the
+study's ``StudyVersion`` (see ``db.versions``). A write bumps the version,
+so later requests simply ask for a different key and the stale entries age
+out of the LRU; nothing is ever invalidated by hand. Each server process
+keeps its own cache, and since versions live in the database, every worker
+agrees on which entries are current.
+
+Fragments are rendered without the request, so they hold nothing specific
+to who is asking.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+from fastapi import Request
+from markupsafe import Markup
+
+from zapp_atlas.api.deps import get_app_settings
+from zapp_atlas.html.templating import templates
+
+
+@dataclass(frozen=True)
+class FragmentCacheStats:
+    hits: int
+    misses: int
+    entries: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class FragmentCache:
+    """A thread-safe LRU of rendered fragments."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Markup] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Markup | None:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return html
+
+    def put(self, key: Hashable, html: str) -> Markup:
+        html = Markup(html)
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str | None]) -> Markup | None:
+        """The cached fragment for ``key``, rendering it on a miss.
+
+        ``render`` returns None when there is nothing to show (e.g. the
+        entity is not part of the study); that is not cached.
+        """
+        html = self.get(key)
+        if html is not None:
+            return html
+        rendered = render()
+        return None if rendered is None else self.put(key, rendered)
+
+    def stats(self) -> FragmentCacheStats:
+        with self._lock:
+            return FragmentCacheStats(self._hits, self._misses, len(self._entries))
+
+
+def render_fragment(name: str, **context) -> str:
+    """Render ``partials/<name>.html`` from ``context`` alone — no request."""
+    return templates.get_template(f"partials/{name}.html").render(**context)
+
+
+def get_fragment_cache(request: Request) -> FragmentCache:
+    """The app's fragment cache, created once and shared by every request."""
+    cache = getattr(request.app.state, "fragments", None)
+    if cache is None:
+        cache = FragmentCache(get_app_settings(request).fragment_cache_max_entries)
+        request.app.state.fragments = cache
+    return cache
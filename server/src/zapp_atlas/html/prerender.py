@@ -0,0 +1,241 @@
+"""Pre-rendered study pages for anonymous readers.
+
+With ``ZAPP_PRERENDER_DIR`` set, every study gets its public page and its
+JSON written under that directory, which the app serves at ``/public``
+through ``StaticFiles``, and which a CDN can serve without the app:
+
+    studies/{id}/index.html   the study page, every section inlined
+    studies/{id}/study.json   what GET /api/studies/{id} returns
+    studies/{id}/version      the StudyVersion the files were rendered from
+
+Anonymous requests for ``/studies/{id}`` are answered with ``index.html``
+straight from disk, with no query and no template. A commit that changes
+studies (see ``db.versions``) queues those studies, and only those, for a
+background task that re-renders them a moment later. At startup,
+``catch_up`` renders every study whose files are missing or behind its
+version, or every study if the templates have changed since.
+
+Several workers may render the same study. Files are swapped in whole,
+under an exclusive lock, and never replaced by a render of an older
+version, so a slow render cannot undo a newer one. A deleted study leaves
+only its ``version`` file behind for the same reason.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from markupsafe import Markup
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from zapp_atlas.db import on_studies_committed
+from zapp_atlas.db.models import StudyVersion
+from zapp_atlas.html.studies import (
+    render_experiment_exposures,
+    render_exposure_observations,
+    render_observation_images,
+    render_study_experiments,
+    render_study_summary,
+)
+from zapp_atlas.html.templating import TEMPLATES_DIR, templates
+from zapp_atlas.schema.pydantic_crud import StudyRead
+from zapp_atlas.schema.sqla import (  # type: ignore
+    Experiment,
+    ExposureEvent,
+    PhenotypeObservationSet,
+    Study,
+)
+
+STUDIES_DIR = "studies"
+PAGE_FILE = "index.html"
+JSON_FILE = "study.json"
+VERSION_FILE = "version"
+# Hash of the templates the pages on disk were rendered with.
+FINGERPRINT_FILE = "templates.sha256"
+
+
+def study_page_path(directory: Path, study_id: int) -> Path:
+    return directory / STUDIES_DIR / str(study_id) / PAGE_FILE
+
+
+def templates_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for path in sorted(TEMPLATES_DIR.rglob("*")):
+        if path.is_file():
+            digest.update(str(path.relative_to(TEMPLATES_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class StudyDocument:
+    html: str
+    json: str
+
+
+def render_study_document(session: Session, study_id: int) -> StudyDocument | None:
+    """The whole public page for a study, and its JSON; None if there is no such study."""
+    summary = render_study_summary(session, study_id)
+    if summary is None:
+        return None
+    experiment_ids = session.scalars(
+        select(Experiment.id).where(Experiment.Study_id == study_id)
+    ).all()
+    exposure_ids = session.scalars(
+        select(ExposureEvent.id).where(ExposureEvent.Experiment_id.in_(experiment_ids))
+    ).all()
+    observation_ids = session.scalars(
+        select(PhenotypeObservationSet.id).where(
+            PhenotypeObservationSet.ExposureEvent_id.in_(exposure_ids)
+        )
+    ).all()
+
+    # Deepest first, so each level can inline the one beneath it.
+    inline: dict[tuple[str, int], Markup] = {}
+    for observation_id in observation_ids:
+        html = render_observation_images(session, study_id, observation_id)
+        inline["images", observation_id] = Markup(html)
+    for exposure_id in exposure_ids:
+        html = render_exposure_observations(session, study_id, exposure_id, inline)
+        inline["observations", exposure_id] = Markup(html)
+    for experiment_id in experiment_ids:
+        html = render_experiment_exposures(session, study_id, experiment_id, inline)
+        inline["exposures", experiment_id] = Markup(html)
+    inline["experiments", study_id] = Markup(render_study_experiments(session, study_id, inline))
+
+    page = templates.get_template("study.html").render(
+        request=None,
+        current_identity=None,
+        study_id=study_id,
+        summary=Markup(summary),
+        inline=inline,
+    )
+    study = session.get(Study, study_id)
+    return StudyDocument(
+        html=page, json=StudyRead.model_validate(study, from_attributes=True).model_dump_json()
+    )
+
+
+def _replace(path: Path, text: str) -> None:
+    partial = path.with_name(f".{path.name}.tmp")
+    partial.write_text(text, encoding="utf-8")
+    os.replace(partial, path)
+
+
+class StudyPrerenderer:
+    """Writes and refreshes the pre-rendered study files. Safe to share between threads."""
+
+    def __init__(self, directory: Path, session_factory: sessionmaker) -> None:
+        self.directory = directory
+        directory.mkdir(parents=True, exist_ok=True)
+        self._session_factory = session_factory
+        self._pending: set[int] = set()
+        self._pending_lock = threading.Lock()
+
+    def queue(self, study_ids: Iterable[int]) -> None:
+        with self._pending_lock:
+            self._pending.update(study_ids)
+
+    def subscribe(self) -> Callable[[], None]:
+        """Queue the studies each commit on our database changes; returns the unsubscriber."""
+        bind = self._session_factory.kw.get("bind")
+
+        def committed(session: Session, study_ids: set[int]) -> None:
+            if session.bind is bind:
+                self.queue(study_ids)
+
+        return on_studies_committed(committed)
+
+    def render_pending(self) -> int:
+        """Re-render every queued study; return how many were handled."""
+        with self._pending_lock:
+            study_ids, self._pending = sorted(self._pending), set()
+        for index, study_id in enumerate(study_ids):
+            try:
+                self.render(study_id)
+            except Exception:
+                self.queue(study_ids[index:])
+                raise
+        return len(study_ids)
+
+    def render(self, study_id: int, *, force: bool = False) -> bool:
+        """Bring one study's files up to date; return whether anything was written.
+
+        ``force`` also rewrites files already at the current version.
+        """
+        with self._session_factory() as session:
+            # Read before the data, so the files are never labelled newer
+            # than what they show.
+            version = session.scalar(
+                select(StudyVersion.version).where(StudyVersion.study_id == study_id)
+            )
+            document = render_study_document(session, study_id)
+        return self._write(study_id, version or 0, document, force=force)
+
+    def catch_up(self) -> int:
+        """Render whatever changed while no process was listening; return how many."""
+        fingerprint = templates_fingerprint()
+        fingerprint_path = self.directory / FINGERPRINT_FILE
+        templates_changed = (
+            not fingerprint_path.exists() or fingerprint_path.read_text() != fingerprint
+        )
+        with self._session_factory() as session:
+            versions = dict(
+                session.execute(
+                    select(Study.id, func.coalesce(StudyVersion.version, 0)).outerjoin(
+                        StudyVersion, StudyVersion.study_id == Study.id
+                    )
+                ).all()
+            )
+        rendered = 0
+        for study_id, version in versions.items():
+            if templates_changed or self._disk_version(study_id) != version:
+                rendered += self.render(study_id, force=templates_changed)
+        # Studies deleted since: their pages must go.
+        studies_dir = self.directory / STUDIES_DIR
+        if studies_dir.is_dir():
+            for folder in studies_dir.iterdir():
+                gone = folder.name.isdigit() and int(folder.name) not in versions
+                if gone and (folder / PAGE_FILE).exists():
+                    rendered += self.render(int(folder.name))
+        _replace(fingerprint_path, fingerprint)
+        return rendered
+
+    def _disk_version(self, study_id: int) -> int | None:
+        try:
+            return int((self.directory / STUDIES_DIR / str(study_id) / VERSION_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Shared by every worker process writing to the directory.
+        with open(self.directory / ".lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+    def _write(
+        self, study_id: int, version: int, document: StudyDocument | None, *, force: bool
+    ) -> bool:
+        folder = self.directory / STUDIES_DIR / str(study_id)
+        with self._locked():
+            on_disk = self._disk_version(study_id)
+            if on_disk is not None and (on_disk > version or (on_disk == version and not force)):
+                return False
+            folder.mkdir(parents=True, exist_ok=True)
+            if document is None:
+                (folder / PAGE_FILE).unlink(missing_ok=True)
+                (folder / JSON_FILE).unlink(missing_ok=True)
+            else:
+                _replace(folder / JSON_FILE, document.json)
+                _replace(folder / PAGE_FILE, document.html)
+            _replace(folder / VERSION_FILE, str(version))
+        return True
@@ -0,0 +1,157 @@
+"""Template responses that send the page while it is still rendering.
+
+``templates.TemplateResponse`` renders the whole template to a string
+before the first byte leaves, so a long page keeps the reader staring at a
+blank tab until its last row is drawn. ``StreamingTemplateResponse`` runs
+Jinja's ``generate()`` in a worker thread and hands the output to the
+response as an async iterator of chunks, instead.
+
+Large tables go in the context as ``RowBatches``: a query that runs only
+when the template loops over it, fetching ``batch_size`` rows at a time.
+Whatever the template has produced is sent just before each batch is
+fetched, so the ``<head>`` and the site header reach the browser (and it
+starts on the stylesheet) before the first row is read, and each batch of
+rows follows as it arrives. Between batches, output goes out in chunks of
+about ``STREAM_CHUNK_BYTES``.
+
+The status line and headers leave with the first chunk, so anything that
+can fail with a 404 has to be checked before the response is returned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+from starlette.types import Receive, Scope, Send
+
+from zapp_atlas.api.deps import open_session
+from zapp_atlas.html.templating import templates
+
+STREAM_CHUNK_BYTES = 16 * 1024
+# Chunks rendered ahead of a slow reader before the renderer waits.
+_QUEUE_DEPTH = 8
+
+
+class RowBatches:
+    """The rows of ``statement``, fetched as a template iterates over them.
+
+    Only usable inside a ``StreamingTemplateResponse``, which runs the query
+    on its own session.
+    """
+
+    def __init__(self, statement: Select, *, batch_size: int = 100) -> None:
+        self.statement = statement
+        self.batch_size = batch_size
+        self._session: Session | None = None
+        self._flush: Callable[[], None] = lambda: None
+
+    def _bind(self, session: Session, flush: Callable[[], None]) -> None:
+        self._session = session
+        self._flush = flush
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._session is None:
+            raise RuntimeError("RowBatches can only be rendered by a StreamingTemplateResponse")
+        self._flush()
+        result = self._session.execute(self.statement.execution_options(yield_per=self.batch_size))
+        while batch := result.fetchmany(self.batch_size):
+            yield from batch
+            self._flush()
+
+
+class _ReaderGone(Exception):
+    pass
+
+
+class StreamingTemplateResponse(StreamingResponse):
+    """Like ``templates.TemplateResponse``, but sent as the template renders."""
+
+    def __init__(
+        self,
+        request: Request,
+        name: str,
+        context: dict[str, Any],
+        *,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        context = {"request": request, **context}
+        for context_processor in templates.context_processors:
+            context.update(context_processor(request))
+        self._chunks = _render(request, name, context)
+        super().__init__(
+            self._chunks, status_code=status_code, headers=headers, media_type="text/html"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # A reader who hangs up leaves the chunks suspended mid-page;
+            # closing them now stops the renderer rather than whenever
+            # they are garbage collected.
+            await self._chunks.aclose()
+
+
+async def _render(request: Request, name: str, context: dict[str, Any]) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue[str | BaseException | None] = asyncio.Queue(maxsize=_QUEUE_DEPTH)
+    reader_gone = threading.Event()
+
+    def send(item: str | BaseException | None) -> None:
+        if reader_gone.is_set():
+            raise _ReaderGone
+        asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+    def render() -> None:
+        pending: list[str] = []
+        size = 0
+
+        def flush() -> None:
+            nonlocal size
+            if pending:
+                send("".join(pending))
+                pending.clear()
+                size = 0
+
+        try:
+            with open_session(request) as session:
+                for value in context.values():
+                    if isinstance(value, RowBatches):
+                        value._bind(session, flush)
+                for piece in templates.get_template(name).generate(context):
+                    pending.append(piece)
+                    size += len(piece)
+                    if size >= STREAM_CHUNK_BYTES:
+                        flush()
+                flush()
+            send(None)
+        except _ReaderGone:
+            pass
+        except Exception as exc:
+            # Too late for an error page: the status has been sent. Failing
+            # the stream makes the server drop the connection mid-page.
+            try:
+                send(exc)
+            except _ReaderGone:
+                pass
+
+    loop.run_in_executor(None, render)
+    try:
+        while (item := await chunks.get()) is not None:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # The reader is done, or gone: stop the renderer, and free it if it
+        # is waiting for room in the queue.
+        reader_gone.set()
+        while not chunks.empty():
+            chunks.get_nowait()
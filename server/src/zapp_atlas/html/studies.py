@@ -0,0 +1,341 @@
+"""Server-rendered study browser.
+
+``/studies`` lists studies and ``/studies/{id}`` shows one. The detail page
+arrives with the study's summary only; experiments, exposures, observation
+tables and image galleries are HTMX partials fetched as they scroll into
+view, each one level deeper than the last.
+
+Every fragment comes from the ``FragmentCache`` under the study's current
+version, so a warm read costs one version lookup plus cache hits. The
+entity is loaded, and checked to belong to the study, only on a miss.
+
+``/studies/{id}/phenotypes`` is the one page with everything at once: every
+phenotype in the study as a single table, which runs to hundreds of rows.
+It streams (see ``html.streaming``) rather than being cached.
+"""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from zapp_atlas.api.deps import get_app_settings, get_session
+from zapp_atlas.auth.services import ORCID_AUTH_COOKIE
+from zapp_atlas.db import owning_study_id, study_version
+from zapp_atlas.db.models import StudyVersion
+from zapp_atlas.html.fragments import FragmentCache, get_fragment_cache, render_fragment
+from zapp_atlas.html.streaming import RowBatches, StreamingTemplateResponse
+from zapp_atlas.html.templating import templates
+from zapp_atlas.schema.sqla import (  # type: ignore
+    Experiment,
+    ExposureEvent,
+    Fish,
+    Image,
+    Phenotype,
+    PhenotypeObservationSet,
+    StressorChemical,
+    Study,
+)
+from zapp_atlas.settings import AppSettings
+
+router = APIRouter(tags=["html"])
+
+SessionDep = Annotated[Session, Depends(get_session)]
+FragmentsDep = Annotated[FragmentCache, Depends(get_fragment_cache)]
+SettingsDep = Annotated[AppSettings, Depends(get_app_settings)]
+
+STUDIES_PER_PAGE = 25
+PHENOTYPES_PER_BATCH = 100
+
+
+def _version_or_404(session: Session, study_id: int) -> int:
+    # Read before the fragment's rows, so a fragment is never cached under
+    # a version newer than its data — at worst under an older one, which
+    # the next write makes unreachable anyway.
+    version = study_version(session, study_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Study not found")
+    return version
+
+
+def _summary_or_404(session: Session, fragments: FragmentCache, study_id: int) -> str:
+    version = _version_or_404(session, study_id)
+    summary = fragments.get_or_render(
+        ("study_summary", study_id, version), lambda: render_study_summary(session, study_id)
+    )
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Study not found")
+    return summary
+
+
+def _fragment_or_404(html: str | None) -> HTMLResponse:
+    if html is None:
+        raise HTTPException(status_code=404, detail="Not part of this study")
+    return HTMLResponse(html)
+
+
+def _experiment_counts(session: Session, study_ids: list[int]) -> dict[int, int]:
+    return dict(
+        session.execute(
+            select(Experiment.Study_id, func.count())
+            .where(Experiment.Study_id.in_(study_ids))
+            .group_by(Experiment.Study_id)
+        ).all()
+    )
+
+
+def _render_study_rows(session: Session, study_ids: list[int]) -> dict[int, str]:
+    studies = session.scalars(
+        select(Study).where(Study.id.in_(study_ids)).options(selectinload(Study.annotator_rel))
+    )
+    counts = _experiment_counts(session, study_ids)
+    return {
+        study.id: render_fragment(
+            "study_row", study=study, experiment_count=counts.get(study.id, 0)
+        )
+        for study in studies
+    }
+
+
+@router.get("/studies", response_class=HTMLResponse)
+def studies_page(
+    request: Request,
+    session: SessionDep,
+    fragments: FragmentsDep,
+    page: Annotated[int, Query(ge=1)] = 1,
+) -> HTMLResponse:
+    listed = session.execute(
+        select(Study.id, func.coalesce(StudyVersion.version, 0))
+        .outerjoin(StudyVersion, StudyVersion.study_id == Study.id)
+        .order_by(Study.id)
+        .offset((page - 1) * STUDIES_PER_PAGE)
+        .limit(STUDIES_PER_PAGE + 1)
+    ).all()
+    has_next = len(listed) > STUDIES_PER_PAGE
+    listed = listed[:STUDIES_PER_PAGE]
+
+    rows = {study_id: fragments.get(("study_row", study_id, v)) for study_id, v in listed}
+    missing = [study_id for study_id, html in rows.items() if html is None]
+    if missing:
+        # One batch for every row the cache lacks, not a query per row.
+        versions = dict(listed)
+        for study_id, html in _render_study_rows(session, missing).items():
+            rows[study_id] = fragments.put(("study_row", study_id, versions[study_id]), html)
+    return templates.TemplateResponse(
+        request,
+        "studies.html",
+        {
+            "rows": [html for html in rows.values() if html is not None],
+            "page": page,
+            "has_next": has_next,
+        },
+    )
+
+
+# The render_* functions below draw each section with placeholders for the
+# level beneath it. ``inline`` maps a placeholder's (kind, id) to markup to
+# put there instead; the pre-renderer uses it to build whole pages.
+
+
+def render_study_summary(session: Session, study_id: int) -> str | None:
+    study = session.get(Study, study_id)
+    if study is None:
+        return None
+    counts = _experiment_counts(session, [study_id])
+    return render_fragment("study_summary", study=study, experiment_count=counts.get(study_id, 0))
+
+
+def render_study_experiments(session: Session, study_id: int, inline: dict | None = None) -> str:
+    experiments = session.scalars(
+        select(Experiment)
+        .where(Experiment.Study_id == study_id)
+        .order_by(Experiment.id)
+        .options(selectinload(Experiment.fish), selectinload(Experiment.control))
+    ).all()
+    return render_fragment(
+        "study_experiments", study_id=study_id, experiments=experiments, inline=inline or {}
+    )
+
+
+def render_experiment_exposures(
+    session: Session, study_id: int, experiment_id: int, inline: dict | None = None
+) -> str | None:
+    experiment = session.get(Experiment, experiment_id)
+    if experiment is None or experiment.Study_id != study_id:
+        return None
+    exposures = session.scalars(
+        select(ExposureEvent)
+        .where(ExposureEvent.Experiment_id == experiment_id)
+        .order_by(ExposureEvent.id)
+        .options(
+            selectinload(ExposureEvent.route),
+            selectinload(ExposureEvent.exposure_type),
+            selectinload(ExposureEvent.stressor).selectinload(StressorChemical.concentration),
+            selectinload(ExposureEvent.vehicle),
+        )
+    ).all()
+    return render_fragment(
+        "experiment_exposures", study_id=study_id, exposures=exposures, inline=inline or {}
+    )
+
+
+def render_exposure_observations(
+    session: Session, study_id: int, exposure_id: int, inline: dict | None = None
+) -> str | None:
+    exposure = session.get(ExposureEvent, exposure_id)
+    if exposure is None or owning_study_id(session, exposure) != study_id:
+        return None
+    observations = session.scalars(
+        select(PhenotypeObservationSet)
+        .where(PhenotypeObservationSet.ExposureEvent_id == exposure_id)
+        .order_by(PhenotypeObservationSet.id)
+        .options(
+            selectinload(PhenotypeObservationSet.phenotype).selectinload(
+                Phenotype.phenotype_term_id
+            ),
+            selectinload(PhenotypeObservationSet.phenotype).selectinload(Phenotype.prevalence),
+        )
+    ).all()
+    image_counts = dict(
+        session.execute(
+            select(Image.PhenotypeObservationSet_id, func.count())
+            .where(Image.PhenotypeObservationSet_id.in_([obs.id for obs in observations]))
+            .group_by(Image.PhenotypeObservationSet_id)
+        ).all()
+    )
+    return render_fragment(
+        "exposure_observations",
+        study_id=study_id,
+        observations=observations,
+        image_counts=image_counts,
+        inline=inline or {},
+    )
+
+
+def render_observation_images(session: Session, study_id: int, observation_id: int) -> str | None:
+    observation = session.get(PhenotypeObservationSet, observation_id)
+    if observation is None or owning_study_id(session, observation) != study_id:
+        return None
+    images = session.scalars(
+        select(Image).where(Image.PhenotypeObservationSet_id == observation_id).order_by(Image.id)
+    ).all()
+    return render_fragment("observation_images", images=images)
+
+
+@router.get("/studies/{study_id}", response_class=HTMLResponse)
+def study_page(
+    request: Request,
+    study_id: int,
+    session: SessionDep,
+    fragments: FragmentsDep,
+    settings: SettingsDep,
+) -> HTMLResponse:
+    if settings.prerender_dir and ORCID_AUTH_COOKIE not in request.cookies:
+        # Lazy import: the pre-renderer builds its pages from this module.
+        from zapp_atlas.html.prerender import study_page_path
+
+        # Signed out: the pre-rendered page is the same for everyone.
+        page = study_page_path(settings.prerender_dir, study_id)
+        if page.is_file():
+            return FileResponse(page, media_type="text/html")
+    summary = _summary_or_404(session, fragments, study_id)
+    return templates.TemplateResponse(
+        request, "study.html", {"study_id": study_id, "summary": summary}
+    )
+
+
+@router.get("/studies/{study_id}/phenotypes", response_class=HTMLResponse)
+def study_phenotypes_page(
+    request: Request, study_id: int, session: SessionDep, fragments: FragmentsDep
+) -> StreamingTemplateResponse:
+    # Checked now: once streaming starts, the status is already sent.
+    summary = _summary_or_404(session, fragments, study_id)
+    phenotypes = RowBatches(
+        select(
+            Phenotype,
+            Fish.name.label("fish"),
+            ExposureEvent.exposure_start_stage,
+            ExposureEvent.exposure_end_stage,
+        )
+        .join(
+            PhenotypeObservationSet,
+            Phenotype.PhenotypeObservationSet_id == PhenotypeObservationSet.id,
+        )
+        .join(ExposureEvent, PhenotypeObservationSet.ExposureEvent_id == ExposureEvent.id)
+        .join(Experiment, ExposureEvent.Experiment_id == Experiment.id)
+        .outerjoin(Fish, Experiment.fish_zfin_id == Fish.zfin_id)
+        .where(Experiment.Study_id == study_id)
+        .order_by(Experiment.id, ExposureEvent.id, PhenotypeObservationSet.id, Phenotype.id)
+        .options(joinedload(Phenotype.phenotype_term_id), joinedload(Phenotype.prevalence)),
+        batch_size=PHENOTYPES_PER_BATCH,
+    )
+    return StreamingTemplateResponse(
+        request,
+        "study_phenotypes.html",
+        {"study_id": study_id, "summary": summary, "phenotypes": phenotypes},
+    )
+
+
+@router.get("/partials/studies/{study_id}/experiments", response_class=HTMLResponse)
+def study_experiments_partial(
+    study_id: int, session: SessionDep, fragments: FragmentsDep
+) -> HTMLResponse:
+    version = _version_or_404(session, study_id)
+    return _fragment_or_404(
+        fragments.get_or_render(
+            ("study_experiments", study_id, version),
+            lambda: render_study_experiments(session, study_id),
+        )
+    )
+
+
+@router.get(
+    "/partials/studies/{study_id}/experiments/{experiment_id}/exposures",
+    response_class=HTMLResponse,
+)
+def experiment_exposures_partial(
+    study_id: int, experiment_id: int, session: SessionDep, fragments: FragmentsDep
+) -> HTMLResponse:
+    version = _version_or_404(session, study_id)
+    return _fragment_or_404(
+        fragments.get_or_render(
+            ("experiment_exposures", experiment_id, study_id, version),
+            lambda: render_experiment_exposures(session, study_id, experiment_id),
+        )
+    )
+
+
+@router.get(
+    "/partials/studies/{study_id}/exposures/{exposure_id}/observations",
+    response_class=HTMLResponse,
+)
+def exposure_observations_partial(
+    study_id: int, exposure_id: int, session: SessionDep, fragments: FragmentsDep
+) -> HTMLResponse:
+    version = _version_or_404(session, study_id)
+    return _fragment_or_404(
+        fragments.get_or_render(
+            ("exposure_observations", exposure_id, study_id, version),
+            lambda: render_exposure_observations(session, study_id, exposure_id),
+        )
+    )
+
+
+@router.get(
+    "/partials/studies/{study_id}/observations/{observation_id}/images",
+    response_class=HTMLResponse,
+)
+def observation_images_partial(
+    study_id: int, observation_id: int, session: SessionDep, fragments: FragmentsDep
+) -> HTMLResponse:
+    version = _version_or_404(session, study_id)
+    return _fragment_or_404(
+        fragments.get_or_render(
+            ("observation_images", observation_id, study_id, version),
+            lambda: render_observation_images(session, study_id, observation_id),
+        )
+    )
@@ -4,15 +4,24 @@ Every HTML response in the app — pages, HTMX partials, and error pages —
 renders through the single `templates` object defined here, so that all
 user-visible markup lives under `html/templates/` and can be edited without
 touching Python.
+
+Jinja compiles a template the first time it is used, in every process. The
+lifespan loads them all up front (``warm_templates``), so no request pays
+for that, and with ``ZAPP_TEMPLATE_CACHE_DIR`` the compiled code is kept on
+disk, so a new process loads it instead of compiling again. The Docker
+build fills that cache:
+
+    python -m zapp_atlas.html.templating /app/template-cache
 """
 
+import argparse
 from pathlib import Path
 
 from fastapi import Request
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 
-from zapp_atlas.api.deps import open_session
-from zapp_atlas.auth.services import ORCID_AUTH_COOKIE, get_orcid_identity
+from zapp_atlas.auth.deps import read_session_cookie
 
 
 TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
@@ -21,15 +30,43 @@ TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
 def _current_identity(request: Request) -> dict[str, object]:
     """Expose the signed-in identity to every template as `current_identity`,
     so the shared header can show a user chip without each route passing it.
+    The signed cookie carries the name and ORCID iD, so this costs no query.
     """
-    identity_id = request.cookies.get(ORCID_AUTH_COOKIE)
-    if not identity_id:
-        return {"current_identity": None}
-    with open_session(request) as session:
-        return {"current_identity": get_orcid_identity(session, identity_id)}
+    return {"current_identity": read_session_cookie(request)}
 
 
 templates = Jinja2Templates(
     directory=TEMPLATES_DIR,
     context_processors=[_current_identity],
 )
+
+
+def use_bytecode_cache(directory: Path) -> None:
+    """Keep compiled templates in `directory`. Jinja checks each entry against
+    its template's source, so an edited template is simply compiled again.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    templates.env.bytecode_cache = FileSystemBytecodeCache(str(directory))
+
+
+def warm_templates() -> int:
+    """Load (and so compile) every template now; return how many there are."""
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m zapp_atlas.html.templating",
+        description="Compile every template into a bytecode cache directory.",
+    )
+    parser.add_argument("cache_dir", type=Path)
+    args = parser.parse_args(argv)
+    use_bytecode_cache(args.cache_dir)
+    print(f"Compiled {warm_templates()} templates into {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,19 @@ stylesheet itself, and where those live depends on how the app is running:
            dev server so HMR works. Vite injects the CSS itself.
     built  read client/dist/.vite/manifest.json to resolve the hashed
            filenames produced by `npm run build`.
+
+A built entry imports shared chunks, which import others; left alone, the
+browser finds each level only after fetching and parsing the one above it.
+So the whole static import graph is read from the manifest and named up
+front, as `<link rel=modulepreload>` tags and a `Link` header (which also
+goes out as a 103 Early Hints response on servers that support one; see
+`EarlyHintsMiddleware`). Chunks behind dynamic `import()`s are only
+prefetched, at idle priority, since the page may never need them.
 """
 
 import json
 from dataclasses import dataclass, field
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pathlib import Path
 
 
@@ -32,6 +40,21 @@ class ViteAssets:
     stylesheets: tuple[str, ...] = ()
     # The dev client must load before the entry module for HMR to attach.
     dev_client: str | None = field(default=None)
+    # Chunks the entry imports, directly or not.
+    modulepreloads: tuple[str, ...] = ()
+    # Chunks only reachable through dynamic imports.
+    prefetches: tuple[str, ...] = ()
+
+    @cached_property
+    def preload_links(self) -> tuple[str, ...]:
+        """`Link` header values for everything the page needs to start."""
+        if self.dev_client:
+            # The dev server resolves modules on request; there is no graph.
+            return ()
+        return (
+            *(f"<{href}>; rel=preload; as=style" for href in self.stylesheets),
+            *(f"<{src}>; rel=modulepreload" for src in (*self.scripts, *self.modulepreloads)),
+        )
 
 
 def dev_assets(dev_server_url: str) -> ViteAssets:
@@ -59,13 +82,39 @@ def built_assets(dist_dir: Path) -> ViteAssets:
             f"Vite manifest at {manifest_path} has no entry for {ENTRY!r}."
         )
 
+    static = _reachable(manifest, ENTRY, ("imports",))
+    lazy = [
+        key
+        for key in _reachable(manifest, ENTRY, ("imports", "dynamicImports"))
+        if key not in static
+    ]
+    stylesheets = dict.fromkeys(
+        href for key in (ENTRY, *static) for href in manifest[key].get("css", ())
+    )
+
     # Asset URLs are the build's `base` ('/edit/') joined to the manifest path.
     return ViteAssets(
         scripts=(f"/edit/{entry['file']}",),
-        stylesheets=tuple(f"/edit/{href}" for href in entry.get("css", ())),
+        stylesheets=tuple(f"/edit/{href}" for href in stylesheets),
+        modulepreloads=tuple(f"/edit/{manifest[key]['file']}" for key in static),
+        prefetches=tuple(f"/edit/{manifest[key]['file']}" for key in lazy),
     )
 
 
+def _reachable(manifest: dict, entry: str, edges: tuple[str, ...]) -> list[str]:
+    """The chunks reachable from `entry` along `edges`, nearest first."""
+    found: dict[str, None] = {entry: None}
+    pending = [entry]
+    while pending:
+        chunk = manifest[pending.pop(0)]
+        for edge in edges:
+            for key in chunk.get(edge, ()):
+                if key not in found and key in manifest:
+                    found[key] = None
+                    pending.append(key)
+    return list(found)[1:]
+
+
 @lru_cache(maxsize=8)
 def _cached_built_assets(dist_dir: Path, _mtime: float) -> ViteAssets:
     # _mtime is part of the cache key only, so a rebuild is picked up without
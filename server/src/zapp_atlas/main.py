@@ -6,23 +6,46 @@ Notes
 * The LinkML-generated models are imported from the schema package.
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from dataclasses import asdict
 from pathlib import Path
+from typing import Annotated
 
-from fastapi import APIRouter, FastAPI
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
 
-from zapp_atlas.auth.router import router as auth_router
+from zapp_atlas.api.deps import get_app_storage
 from zapp_atlas.api.routers.experiments import router as experiments_router
 from zapp_atlas.api.routers.exposures import router as exposures_router
 from zapp_atlas.api.routers.images import router as images_router
 from zapp_atlas.api.routers.observations import router as observations_router
+from zapp_atlas.api.routers.research_groups import router as research_groups_router
 from zapp_atlas.api.routers.studies import router as studies_router
+from zapp_atlas.auth.router import router as auth_router
+from zapp_atlas.auth.services import make_orcid_client
+from zapp_atlas.auth.sessions import make_session_signer
+from zapp_atlas.background import (
+    catch_up_prerendered,
+    migrate_images,
+    prerender_studies,
+    replicate_database,
+    seed_database,
+    sweep_blob_deletions,
+)
+from zapp_atlas.compress import CompressionMetrics, CompressionMiddleware, get_compression_metrics
 from zapp_atlas.db import get_engine, get_session_factory, init_db
-from zapp_atlas.html.edit_router import make_edit_router
+from zapp_atlas.db.image_storage import CachingStorage, Storage, get_storage
+from zapp_atlas.db.replication import Replicator, replica_storage, restore
+from zapp_atlas.html.assets import AssetFiles
+from zapp_atlas.html.edit_router import EarlyHintsMiddleware, make_edit_router
+from zapp_atlas.html.fragments import FragmentCache, get_fragment_cache
+from zapp_atlas.html.prerender import StudyPrerenderer
 from zapp_atlas.html.router import router as html_router
-from zapp_atlas.seed import seed
+from zapp_atlas.html.studies import router as studies_html_router
+from zapp_atlas.html.templating import use_bytecode_cache, warm_templates
+from zapp_atlas.seed import seed_is_current
 from zapp_atlas.settings import AppSettings, load_settings
 
 
@@ -38,15 +61,69 @@ CLIENT_DIST_DIR = PACKAGE_DIR.parents[2] / "client" / "dist"
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings = app.state.settings
+    storage = get_storage(settings)
+    app.state.storage = storage
+    if settings.uses_sqlite and settings.replica_prefix:
+        restore(replica_storage(storage), settings.replica_prefix, settings.db_path)
+
     engine = get_engine(settings=settings)
     app.state.engine = engine
     app.state.session_factory = get_session_factory(engine)
     init_db(engine)
-    if not settings.skip_seed:
-        Session = app.state.session_factory
-        with Session() as session:
-            seed(session)
+    # Compile every template before the first request instead of during it.
+    warm_templates()
+    app.state.orcid_client = make_orcid_client(settings)
+
+    background = []
+    unsubscribe_prerenderer = None
+    if settings.prerender_dir:
+        # Every worker re-renders the studies its own commits change.
+        prerenderer = StudyPrerenderer(settings.prerender_dir, app.state.session_factory)
+        unsubscribe_prerenderer = prerenderer.subscribe()
+        background.append(
+            asyncio.create_task(
+                prerender_studies(prerenderer, interval=settings.prerender_interval_seconds)
+            )
+        )
+        if settings.background_tasks:
+            background.append(asyncio.create_task(catch_up_prerendered(prerenderer)))
+    # With several workers only one runs these; see zapp_atlas.serve.
+    if settings.background_tasks:
+        if not settings.skip_seed:
+            with app.state.session_factory() as session:
+                stale = not seed_is_current(session)
+            # Seeding builds whole study graphs; the first request shouldn't wait.
+            if stale:
+                background.append(asyncio.create_task(seed_database(app.state.session_factory)))
+        background += [
+            asyncio.create_task(migrate_images(app.state.session_factory, storage)),
+            asyncio.create_task(
+                sweep_blob_deletions(
+                    app.state.session_factory,
+                    storage,
+                    interval=settings.blob_sweep_interval_seconds,
+                )
+            ),
+        ]
+        if settings.uses_sqlite and settings.replica_prefix:
+            replicator = Replicator(
+                settings.db_path,
+                replica_storage(storage),
+                settings.replica_prefix,
+                busy_timeout=settings.sqlite_busy_timeout_ms / 1000,
+            )
+            background.append(
+                asyncio.create_task(
+                    replicate_database(replicator, interval=settings.replica_sync_interval_seconds)
+                )
+            )
     yield
+    if unsubscribe_prerenderer is not None:
+        unsubscribe_prerenderer()
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await app.state.orcid_client.aclose()
 
 
 def create_app(settings: AppSettings | None = None) -> FastAPI:
@@ -56,12 +133,49 @@ def create_app(settings: AppSettings | None = None) -> FastAPI:
         lifespan=lifespan,
     )
     app.state.settings = settings or load_settings()
+    # Made here rather than in the lifespan so that, without configured keys,
+    # the workers forked by serve.py share the parent's random one.
+    app.state.sessions = make_session_signer(app.state.settings)
+    if app.state.settings.template_cache_dir:
+        use_bytecode_cache(app.state.settings.template_cache_dir)
 
     @app.get("/health")
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/health/storage-cache")
+    def storage_cache_health(
+        storage: Annotated[Storage, Depends(get_app_storage)],
+    ) -> dict[str, float]:
+        """Hit ratio and size of the local blob cache, if one is configured."""
+        if not isinstance(storage, CachingStorage):
+            raise HTTPException(status_code=404, detail="No storage cache configured")
+        stats = storage.stats()
+        return {**asdict(stats), "hit_ratio": stats.hit_ratio}
+
+    @app.get("/health/compression")
+    def compression_health(
+        metrics: Annotated[CompressionMetrics, Depends(get_compression_metrics)],
+    ) -> dict[str, float | dict[str, float]]:
+        """Bytes in and out, and CPU time, of each response coding."""
+        return {
+            "uncompressed": metrics.uncompressed,
+            **{
+                coding: {**asdict(totals), "ratio": totals.ratio}
+                for coding, totals in metrics.stats().items()
+            },
+        }
+
+    @app.get("/health/fragment-cache")
+    def fragment_cache_health(
+        fragments: Annotated[FragmentCache, Depends(get_fragment_cache)],
+    ) -> dict[str, float]:
+        """Hit ratio and size of this process's rendered-fragment cache."""
+        stats = fragments.stats()
+        return {**asdict(stats), "hit_ratio": stats.hit_ratio}
+
     app.include_router(html_router)
+    app.include_router(studies_html_router)
     app.include_router(auth_router)
 
     api = APIRouter(prefix="/api")
@@ -70,10 +184,18 @@ def create_app(settings: AppSettings | None = None) -> FastAPI:
     api.include_router(exposures_router)
     api.include_router(observations_router)
     api.include_router(images_router)
+    api.include_router(research_groups_router)
     app.include_router(api)
 
-    # Static assets for the server-rendered (HTMX) viewing app.
-    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    # Static assets for the server-rendered (HTMX) viewing app. Their names
+    # don't change with their content, so browsers revalidate them.
+    app.mount("/static", AssetFiles(directory=STATIC_DIR), name="static")
+
+    # Pre-rendered public study pages and JSON (html/prerender.py).
+    prerender_dir = app.state.settings.prerender_dir
+    if prerender_dir:
+        prerender_dir.mkdir(parents=True, exist_ok=True)
+        app.mount("/public", StaticFiles(directory=prerender_dir, html=True), name="public")
 
     # The React editing client's compiled JS/CSS. The HTML document that loads
     # them is rendered by the edit router below (templates/edit.html), so that
@@ -85,7 +207,8 @@ def create_app(settings: AppSettings | None = None) -> FastAPI:
     if client_assets_dir.is_dir():
         app.mount(
             "/edit/assets",
-            StaticFiles(directory=client_assets_dir),
+            # Vite puts a content hash in every name: cache them for good.
+            AssetFiles(directory=client_assets_dir, immutable=True),
             name="edit-assets",
         )
     else:
@@ -97,6 +220,14 @@ def create_app(settings: AppSettings | None = None) -> FastAPI:
         )
 
     app.include_router(make_edit_router(CLIENT_DIST_DIR))
+    app.add_middleware(EarlyHintsMiddleware, dist_dir=CLIENT_DIST_DIR)
+    # Added last, so it is outermost and sees every response.
+    app.state.compression = CompressionMetrics()
+    app.add_middleware(
+        CompressionMiddleware,
+        metrics=app.state.compression,
+        min_bytes=app.state.settings.compression_min_bytes,
+    )
 
     return app
 
@@ -0,0 +1,26 @@
+# GENERATED FILE. DO NOT EDIT.
+"""Constraints ``gen-sqla`` cannot emit, compiled from the LinkML schema.
+
+Written by ``zapp_atlas.schema.constraints_gen`` and applied by
+``zapp_atlas.schema.constraints``. Regenerate with ``make schema``.
+"""
+
+# class -> unique key name -> generated column names
+UNIQUE_KEYS: dict[str, dict[str, tuple[str, ...]]] = {
+    "ChemicalCabinetEntry": {
+        "cabinet_grain": ("research_group", "chemical_id"),
+    },
+    "FishTankEntry": {
+        "tank_grain": ("research_group", "fish_zfin_id"),
+    },
+    "ResearchGroupMember": {
+        "membership_grain": ("research_group", "member"),
+    },
+}
+
+# classes annotated `timestamped`, which get created_at/updated_at
+TIMESTAMPED: tuple[str, ...] = (
+    "ChemicalCabinetEntry",
+    "FishTankEntry",
+    "ResearchGroupMember",
+)
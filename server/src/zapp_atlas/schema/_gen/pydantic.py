@@ -585,8 +585,24 @@ class Image(ZappEntity):
     magnification: Optional[str] = Field(default=None, description="""The factor by which a microscope enlarges the apparent size of a subject compared to its actual size.""", json_schema_extra = { "linkml_meta": {'domain_of': ['Image', 'ControlImage']} })
     resolution: Optional[str] = Field(default=None, description="""The level of detail in the image.""", json_schema_extra = { "linkml_meta": {'domain_of': ['Image', 'ControlImage']} })
     scale_bar: Optional[str] = Field(default=None, description="""Scale bar information, including the physical length it represents and the unit of measurement.""", json_schema_extra = { "linkml_meta": {'domain_of': ['Image', 'ControlImage']} })
+    content_type: Optional[str] = Field(default=None, description="""Media type of the stored image file, recorded when it is uploaded.""", json_schema_extra = { "linkml_meta": {'domain_of': ['Image']} })
+    byte_size: Optional[int] = Field(default=None, description="""Size of the stored image file in bytes.""", ge=0, json_schema_extra = { "linkml_meta": {'domain_of': ['Image']} })
+    checksum: Optional[str] = Field(default=None, description="""Hex-encoded SHA-256 digest of the stored image file.""", json_schema_extra = { "linkml_meta": {'domain_of': ['Image']} })
     id: int = Field(default=..., description="""Auto-generated integer identifier.""", json_schema_extra = { "linkml_meta": {'domain_of': ['ZappEntity']} })
 
+    @field_validator('checksum')
+    def pattern_checksum(cls, v):
+        pattern=re.compile(r"^[0-9a-f]{64}$")
+        if isinstance(v, list):
+            for element in v:
+                if isinstance(element, str) and not pattern.search(element):
+                    err_msg = f"Invalid checksum format: {element}"
+                    raise ValueError(err_msg)
+        elif isinstance(v, str) and not pattern.search(v):
+            err_msg = f"Invalid checksum format: {v}"
+            raise ValueError(err_msg)
+        return v
+
 
 class ControlImage(ZappEntity):
     """
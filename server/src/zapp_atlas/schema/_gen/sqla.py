@@ -351,11 +351,14 @@ class Image(ZappEntity):
     magnification: Mapped[str | None] = mapped_column(Text())
     resolution: Mapped[str | None] = mapped_column(Text())
     scale_bar: Mapped[str | None] = mapped_column(Text())
+    content_type: Mapped[str | None] = mapped_column(Text())
+    byte_size: Mapped[int | None] = mapped_column(Integer())
+    checksum: Mapped[str | None] = mapped_column(Text())
     id: Mapped[int] = mapped_column(Integer(), primary_key=True)
     PhenotypeObservationSet_id: Mapped[int | None] = mapped_column(Integer(), ForeignKey("PhenotypeObservationSet.id"))
 
     def __repr__(self):
-        return f"Image(magnification={self.magnification},resolution={self.resolution},scale_bar={self.scale_bar},id={self.id},PhenotypeObservationSet_id={self.PhenotypeObservationSet_id},)"
+        return f"Image(magnification={self.magnification},resolution={self.resolution},scale_bar={self.scale_bar},content_type={self.content_type},byte_size={self.byte_size},checksum={self.checksum},id={self.id},PhenotypeObservationSet_id={self.PhenotypeObservationSet_id},)"
 
     __mapper_args__ = {"concrete": True}
 
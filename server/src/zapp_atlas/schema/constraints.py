@@ -1,59 +1,41 @@
 """Constraints the LinkML generator cannot yet emit.
 
 ``gen-sqla`` renders neither ``unique_keys`` nor timestamp defaults. Both are
-read back out of the schema and attached to the generated tables, so the YAML
-stays the single source of truth. Delete this module once the generator
+compiled out of the schema at build time (``constraints_gen``, run by ``make
+schema``) into ``_gen/constraints.py`` and attached to the generated tables
+here, so the YAML stays the single source of truth without the app parsing it
+— or importing LinkML — on every start. Delete this module once the generator
 supports them.
+
+It also repairs references to ontology terms. ``gen-sqla`` types them as
+integers and points them at ``term_uri``, which is only half of the term
+table's composite primary key. SQLite accepts both; Postgres rejects the
+table, so each such column takes its target's type and the target gets a
+unique index of its own.
 """
 
 from __future__ import annotations
 
 from datetime import UTC, datetime
-from pathlib import Path
 
-from linkml_runtime import SchemaView
-from linkml_runtime.linkml_model.meta import ClassDefinition
-from sqlalchemy import Column, DateTime, Index, Table
+from sqlalchemy import Column, DateTime, Index, UniqueConstraint
 
+from zapp_atlas.schema._gen.constraints import TIMESTAMPED, UNIQUE_KEYS
 from zapp_atlas.schema._gen.sqla import Base
 
-SCHEMA_PATH = Path(__file__).resolve().parent / "zebrafish_toxicology_atlas_schema.yaml"
-
-TIMESTAMPED = "timestamped"
-
 
 def _utcnow() -> datetime:
     return datetime.now(UTC)
 
 
-def _column(view: SchemaView, table: Table, class_name: str, slot_name: str) -> Column:
-    """Resolve a LinkML slot to the column ``gen-sqla`` generated for it.
-
-    An inlined slot whose range carries an identifier becomes
-    ``<slot>_<identifier>`` (``fish`` -> ``fish_zfin_id``); every other slot
-    keeps its own name.
-    """
-    if slot_name in table.c:
-        return table.c[slot_name]
-
-    identifier = view.get_identifier_slot(view.induced_slot(slot_name, class_name).range)
-    if identifier is not None:
-        qualified = f"{slot_name}_{identifier.name}"
-        if qualified in table.c:
-            return table.c[qualified]
-
-    raise KeyError(f"{class_name}.{slot_name} has no generated column")
-
-
-def _apply_unique_keys(view: SchemaView, model: type, definition: ClassDefinition) -> None:
+def _apply_unique_keys(model: type, keys: dict[str, tuple[str, ...]]) -> None:
     table = model.__table__
     existing = {index.name for index in table.indexes}
-    for key_name, key in definition.unique_keys.items():
-        name = f"uq_{definition.name}_{key_name}"
+    for key_name, columns in keys.items():
+        name = f"uq_{model.__name__}_{key_name}"
         if name in existing:
             continue
-        columns = [_column(view, table, definition.name, s) for s in key.unique_key_slots]
-        Index(name, *columns, unique=True)
+        Index(name, *(table.c[column] for column in columns), unique=True)
 
 
 def _apply_timestamps(model: type) -> None:
@@ -65,14 +47,40 @@ def _apply_timestamps(model: type) -> None:
     model.updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
 
 
-def apply_schema_constraints(schema_path: Path = SCHEMA_PATH) -> None:
+def _is_unique(column: Column) -> bool:
+    table = column.table
+    unique_sets = [list(table.primary_key.columns)]
+    unique_sets += [list(index.columns) for index in table.indexes if index.unique]
+    unique_sets += [
+        list(constraint.columns)
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    ]
+    return [column] in unique_sets
+
+
+def _repair_term_references() -> None:
+    """Give each foreign key column its target's type, and the target a unique index.
+
+    Runs when ``zapp_atlas.schema.sqla`` is imported, before any table is
+    created, and rewrites the generated tables' column types in place.
+    Idempotent: a column already of its target's type, or a target already
+    unique, is left alone.
+    """
+    for table in Base.metadata.sorted_tables:
+        for foreign_key in table.foreign_keys:
+            target = foreign_key.column
+            if type(foreign_key.parent.type) is not type(target.type):
+                foreign_key.parent.type = target.type
+            if not _is_unique(target):
+                Index(f"uq_{target.table.name}_{target.name}", target, unique=True)
+
+
+def apply_schema_constraints() -> None:
     """Attach every schema-declared unique key and timestamp pair. Idempotent."""
-    view = SchemaView(str(schema_path))
+    _repair_term_references()
     models = {mapper.class_.__name__: mapper.class_ for mapper in Base.registry.mappers}
-    for class_name, definition in view.all_classes().items():
-        model = models.get(class_name)
-        if model is None:
-            continue
-        _apply_unique_keys(view, model, definition)
-        if TIMESTAMPED in definition.annotations:
-            _apply_timestamps(model)
+    for class_name, keys in UNIQUE_KEYS.items():
+        _apply_unique_keys(models[class_name], keys)
+    for class_name in TIMESTAMPED:
+        _apply_timestamps(models[class_name])
@@ -0,0 +1,111 @@
+"""Compile the constraints ``gen-sqla`` cannot emit into ``_gen/constraints.py``.
+
+``gen-sqla`` renders neither ``unique_keys`` nor timestamp annotations. This
+build-time generator reads both out of the schema with ``SchemaView``,
+resolves each key slot to the column ``gen-sqla`` produced for it, and writes
+plain Python literals that ``schema.constraints`` applies at import — so the
+app never parses the YAML, or imports LinkML, at startup.
+
+Run by ``make schema``::
+
+    python -m zapp_atlas.schema.constraints_gen path/to/schema.yaml
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import click
+from linkml_runtime import SchemaView
+from sqlalchemy import Column, Table
+
+from zapp_atlas.schema._gen.sqla import Base
+
+SCHEMA_PATH = Path(__file__).resolve().parent / "zebrafish_toxicology_atlas_schema.yaml"
+
+TIMESTAMPED = "timestamped"
+
+HEADER = '''"""Constraints ``gen-sqla`` cannot emit, compiled from the LinkML schema.
+
+Written by ``zapp_atlas.schema.constraints_gen`` and applied by
+``zapp_atlas.schema.constraints``. Regenerate with ``make schema``.
+"""
+'''
+
+
+def _column(view: SchemaView, table: Table, class_name: str, slot_name: str) -> Column:
+    """Resolve a LinkML slot to the column ``gen-sqla`` generated for it.
+
+    An inlined slot whose range carries an identifier becomes
+    ``<slot>_<identifier>`` (``fish`` -> ``fish_zfin_id``); every other slot
+    keeps its own name.
+    """
+    if slot_name in table.c:
+        return table.c[slot_name]
+
+    identifier = view.get_identifier_slot(view.induced_slot(slot_name, class_name).range)
+    if identifier is not None:
+        qualified = f"{slot_name}_{identifier.name}"
+        if qualified in table.c:
+            return table.c[qualified]
+
+    raise KeyError(f"{class_name}.{slot_name} has no generated column")
+
+
+def render(schema_path: Path = SCHEMA_PATH) -> str:
+    """The source of ``_gen/constraints.py``, minus its generated-file header."""
+    view = SchemaView(str(schema_path))
+    models = {mapper.class_.__name__: mapper.class_ for mapper in Base.registry.mappers}
+
+    unique_keys: dict[str, dict[str, tuple[str, ...]]] = {}
+    timestamped: list[str] = []
+    for class_name, definition in sorted(view.all_classes().items()):
+        model = models.get(class_name)
+        if model is None:
+            continue
+        table = model.__table__
+        keys = {
+            key_name: tuple(
+                _column(view, table, class_name, slot).name for slot in key.unique_key_slots
+            )
+            for key_name, key in definition.unique_keys.items()
+        }
+        if keys:
+            unique_keys[class_name] = keys
+        if TIMESTAMPED in definition.annotations:
+            timestamped.append(class_name)
+
+    lines = [HEADER.rstrip("\n"), "", "# class -> unique key name -> generated column names"]
+    lines.append("UNIQUE_KEYS: dict[str, dict[str, tuple[str, ...]]] = {")
+    for class_name, keys in unique_keys.items():
+        lines.append(f"    {_literal(class_name)}: {{")
+        for key_name, columns in keys.items():
+            names = ", ".join(_literal(column) for column in columns)
+            if len(columns) == 1:
+                names += ","
+            lines.append(f"        {_literal(key_name)}: ({names}),")
+        lines.append("    },")
+    lines.append("}")
+    lines.append("")
+    lines.append("# classes annotated `timestamped`, which get created_at/updated_at")
+    lines.append("TIMESTAMPED: tuple[str, ...] = (")
+    lines.extend(f"    {_literal(class_name)}," for class_name in timestamped)
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def _literal(name: str) -> str:
+    # Double-quoted, matching the rest of the generated code.
+    return json.dumps(name)
+
+
+@click.command()
+@click.argument("schema", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def cli(schema: Path) -> None:
+    """Print the compiled constraints module for SCHEMA."""
+    click.echo(render(schema), nl=False)
+
+
+if __name__ == "__main__":
+    cli()
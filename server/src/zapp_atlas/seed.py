@@ -19,9 +19,14 @@ Currently seeded:
 
 from __future__ import annotations
 
+import hashlib
+from functools import cache
+from pathlib import Path
+
 from sqlalchemy.orm import Session
 
 from zapp_atlas.db import get_engine, get_session_factory, init_db
+from zapp_atlas.db.models import Meta
 from zapp_atlas.schema.sqla import (  # type: ignore
     ExposureEvent,
     ExposureRoute,
@@ -37,6 +42,8 @@ from zapp_atlas.schema.sqla import (  # type: ignore
 )
 
 
+SEED_FINGERPRINT_KEY = "seed_fingerprint"
+
 SEEDED_PUBLICATIONS = {
     "PMID:22194820",
     "PMID:40359302",
@@ -331,8 +338,27 @@ def _build_moreira_guanitoxin_study(session: Session) -> Study:
 # ---------------------------------------------------------------------------
 
 
+@cache
+def seed_fingerprint() -> str:
+    """SHA-256 of this module: changes whenever the seed definitions do."""
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def seed_is_current(session: Session) -> bool:
+    """Whether the database was last seeded from these exact definitions.
+
+    One primary-key lookup, so startup can skip seeding without touching
+    the study tables.
+    """
+    stored = session.get(Meta, SEED_FINGERPRINT_KEY)
+    return stored is not None and stored.value == seed_fingerprint()
+
+
 def seed(session: Session) -> None:
-    """Seed the database with demo data. Idempotent on `Study.publication`."""
+    """Seed the database with demo data. Idempotent on `Study.publication`.
+
+    Records the seed fingerprint afterwards, in the same commit.
+    """
 
     existing = {
         pub
@@ -352,6 +378,7 @@ def seed(session: Session) -> None:
             continue
         session.add(builder(session))
 
+    session.merge(Meta(key=SEED_FINGERPRINT_KEY, value=seed_fingerprint()))
     session.commit()
 
 
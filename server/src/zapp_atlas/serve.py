@@ -0,0 +1,129 @@
+"""Production server: one preloaded app, ``ZAPP_WORKERS`` forked workers.
+
+    python -m zapp_atlas.serve --host 0.0.0.0 --port 8080
+
+The parent imports the app, creates the schema, compiles the templates and
+binds the socket once, then forks. Workers share the warmed imports and
+templates copy-on-write and accept on the inherited socket; each opens its
+own engine in its lifespan, since SQLite connections must not cross a fork.
+Writes from several workers are coordinated by SQLite itself — WAL,
+``busy_timeout`` and ``retry_on_busy`` (see ``zapp_atlas.db``) — or, with
+``ZAPP_DATABASE_URL``, by Postgres, each worker drawing on its own
+connection pool.
+
+Only the first worker runs the background tasks (seeding, image migration,
+the blob sweeper), so they never race each other. A worker that exits is
+replaced; SIGTERM or SIGINT stops every worker gracefully.
+
+Run ``uvicorn zapp_atlas.main:app`` directly for development.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+from zapp_atlas.db import get_engine, init_db
+from zapp_atlas.db.image_storage import get_storage
+from zapp_atlas.db.replication import replica_storage, restore
+from zapp_atlas.html.templating import warm_templates
+from zapp_atlas.main import app
+
+logger = logging.getLogger(__name__)
+
+# Pause before replacing a worker that exited, so a crash loop can't spin.
+RESPAWN_DELAY = 1.0
+
+
+def _serve(app: FastAPI, sock: socket.socket, index: int) -> None:
+    if index:
+        app.state.settings = app.state.settings.model_copy(update={"background_tasks": False})
+    config = uvicorn.Config(app)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _fork_worker(app: FastAPI, sock: socket.socket, index: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 1
+    try:
+        _serve(app, sock, index)
+        code = 0
+    except Exception:
+        logger.exception("Worker %d failed", index)
+    finally:
+        os._exit(code)
+
+
+def supervise(app: FastAPI, sock: socket.socket, workers: int) -> None:
+    """Fork ``workers`` servers on ``sock`` and keep that many running."""
+    children: dict[int, int] = {}
+    stopping = False
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        children[_fork_worker(app, sock, index)] = index
+    logger.info("Started %d workers: %s", workers, ", ".join(map(str, children)))
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid)
+        if stopping:
+            continue
+        logger.warning(
+            "Worker %d (pid %d) exited with status %d; replacing it",
+            index,
+            pid,
+            os.waitstatus_to_exitcode(status),
+        )
+        time.sleep(RESPAWN_DELAY)
+        if not stopping:
+            children[_fork_worker(app, sock, index)] = index
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m zapp_atlas.serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+
+    settings = app.state.settings
+    if settings.uses_sqlite and settings.replica_prefix:
+        restore(replica_storage(get_storage(settings)), settings.replica_prefix, settings.db_path)
+    # Create tables here, once, rather than racing DDL in every worker.
+    engine = get_engine(settings=settings)
+    init_db(engine)
+    engine.dispose()
+    # Compiled once, here, the templates are shared with every worker.
+    warm_templates()
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    if settings.workers <= 1:
+        _serve(app, sock, 0)
+    else:
+        supervise(app, sock, settings.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -24,18 +25,99 @@ class AppSettings(BaseSettings):
     )
 
     db_path: Path = DEFAULT_DB_PATH
+    # SQLAlchemy URL of a server database, e.g.
+    # "postgresql+psycopg://zapp@localhost/zapp" (needs the `postgres` extra).
+    # Empty uses the SQLite file at db_path; the sqlite_* and replica_*
+    # settings apply only then.
+    database_url: str = ""
+    # Connection pool per server process, for database_url. Keep
+    # workers * (db_pool_size + db_max_overflow) under Postgres's
+    # max_connections (100 by default).
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout_seconds: float = 10.0
+    # Replace connections older than this, before a proxy or the server
+    # drops them while idle.
+    db_pool_recycle_seconds: int = 1800
+    # WAL lets readers run alongside the single writer, which is what makes
+    # several workers worthwhile. It needs a local disk; use "delete" when
+    # the database sits on a network or FUSE filesystem.
+    sqlite_journal_mode: Literal["wal", "delete", "truncate", "persist"] = "wal"
+    # How long a connection waits for another process's write lock before
+    # SQLite reports the database busy.
+    sqlite_busy_timeout_ms: int = 5000
+    # Replicate the database to blob storage under this key prefix (e.g.
+    # "replica/zapp"), and restore from it when the file is missing at
+    # startup. Empty disables replication. See zapp_atlas.db.replication.
+    replica_prefix: str = ""
+    replica_sync_interval_seconds: float = 1.0
+    # Server processes started by `python -m zapp_atlas.serve`.
+    workers: int = 1
+    # Run seeding, image migration and the blob sweeper in this process. The
+    # multi-worker server turns this off in every worker but the first.
+    background_tasks: bool = True
     upload_dir: Path = DEFAULT_UPLOAD_DIR
     max_upload_bytes: int = DEFAULT_MAX_UPLOAD_BYTES
+    # Batch image uploads: most files accepted per request, and how many
+    # blobs are written to storage at once.
+    max_batch_upload_files: int = 50
+    upload_concurrency: int = 8
+    # Key image blobs by the SHA-256 of their bytes, so an image uploaded to
+    # several observations is stored once. Existing images keep their
+    # per-id keys; only new uploads are deduplicated.
+    content_addressed_images: bool = False
+    # Idle pause, in seconds, between passes of the background sweeper that
+    # deletes released image blobs from storage.
+    blob_sweep_interval_seconds: float = 5.0
+    # Local disk cache for blobs the app reads from storage itself (streamed
+    # images, ZIP exports). Off unless a directory is given.
+    storage_cache_dir: Path | None = None
+    storage_cache_max_bytes: int = 1024 * 1024 * 1024
+    # Rendered study-page fragments kept per server process, least recently
+    # used dropped first. They are keyed by study version, so an entry made
+    # stale by a write is never served, only left to age out.
+    fragment_cache_max_entries: int = 10_000
+    # Write every study's public page and JSON under this directory, served
+    # at /public and to anonymous readers of /studies/{id} (or by a CDN).
+    # Off unless a directory is given. See html/prerender.py.
+    prerender_dir: Path | None = None
+    # Pause between passes that re-render the studies changed since the last.
+    prerender_interval_seconds: float = 0.5
+    # Where compiled Jinja templates are kept between processes, so a cold
+    # start loads them rather than compiling each one. The Docker image
+    # ships one filled at build time. See html/templating.py.
+    template_cache_dir: Path | None = None
+    # Responses smaller than this are sent uncompressed: the saving would be
+    # less than the headers cost. See compress.py.
+    compression_min_bytes: int = 1024
     skip_seed: bool = False
 
     aws_endpoint_url_s3: str | None = None
     bucket_name: str | None = None
     bucket_public_url_prefix: str | None = None
 
+    # Comma-separated HMAC keys for session cookies, newest first: the first
+    # signs, all verify. Blank uses a random key per server start, which
+    # signs everyone out on restart; set it in any deployment.
+    session_keys: str = ""
+    session_max_age_seconds: int = 14 * 24 * 60 * 60
+    # Check that a session's identity still exists at most this often, per
+    # identity. Zero trusts the signature alone, so pages need no query.
+    session_revalidate_seconds: float = 0
+    # How long a process trusts its cached research group roles for an
+    # identity. Changes made in this process apply at once; this bounds how
+    # long other workers act on the old roles. See auth/permissions.py.
+    permission_cache_seconds: float = 60
+
     orcid_client_id: str = ""
     orcid_client_secret: str = ""
     orcid_redirect_uri: str = DEFAULT_ORCID_REDIRECT_URI
     orcid_base_url: str = DEFAULT_ORCID_BASE_URL
+    # Each attempt at the token exchange gives up after this long (per
+    # connect, read or write), and is retried at most this many more times
+    # when ORCID was not reached or answered that it was unavailable.
+    orcid_timeout_seconds: float = 10.0
+    orcid_token_retries: int = 2
 
     # Point at a running Vite dev server (e.g. http://localhost:5173) to load
     # the editing client's modules from it, giving HMR while FastAPI still
@@ -47,6 +129,10 @@ class AppSettings(BaseSettings):
     # it is an unauthenticated way to obtain a session cookie.
     dev_auth: bool = False
 
+    @property
+    def uses_sqlite(self) -> bool:
+        return not self.database_url
+
 
 def load_settings(**overrides) -> AppSettings:
     return AppSettings(**overrides)
@@ -0,0 +1,355 @@
+"""Deterministic synthetic atlases for scale testing.
+
+    python -m zapp_atlas.synth data/synth.db --studies 50000 --phenotypes 1000000
+
+The same ``--seed`` always produces the same database, row for row. Rows are
+written with bulk Core inserts (``COPY`` on Postgres) and explicit ids
+rather than through the ORM, at roughly 300k phenotypes a second into
+SQLite: the example above takes under a minute, and ten times that (about
+1 GB of SQLite) a few minutes.
+
+The vocabulary is the one ``seed.py`` curates, widened with other chemicals
+common in zebrafish toxicology. Chemicals, phenotype terms, labs and fish
+lines are drawn with Zipf-like weights, so a few dominate and a long tail
+appears rarely, as in the literature. The curated phenotype terms head that
+tail; the rest of it is synthetic ``ZP:9xxxxxx`` terms, labelled as such.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, event
+
+from zapp_atlas.db import bulk_insert, init_db, reset_sequences
+from zapp_atlas.schema.sqla import (  # type: ignore
+    Experiment,
+    ExposureEvent,
+    ExposureRoute,
+    ExposureType,
+    Fish,
+    Phenotype,
+    PhenotypeObservationSet,
+    PhenotypeTerm,
+    QuantityValue,
+    StressorChemical,
+    Study,
+    StudyAnnotator,
+    VehicleOfTransmission,
+)
+
+DEFAULT_SEED = 20_110_101
+PHENOTYPES_PER_STUDY = 20
+FLUSH_ROWS = 50_000
+
+# (chemical_id, cas_id, chemical_name, usual unit), most-studied first.
+CHEMICALS = [
+    ("CHEBI:33216", "80-05-7", "bisphenol A", "µM"),
+    ("CHEBI:16236", "64-17-5", "ethanol", "%"),
+    ("CHEBI:27732", "58-08-2", "caffeine", "mg/L"),
+    ("CHEBI:35456", "10108-64-2", "cadmium dichloride", "µg/L"),
+    ("CHEBI:39421", "1763-23-1", "perfluorooctane-1-sulfonic acid", "µM"),
+    ("CHEBI:15367", "302-79-4", "all-trans-retinoic acid", "µM"),
+    ("CHEBI:18723", "54-11-5", "nicotine", "µM"),
+    ("CHEBI:39867", "99-66-1", "valproic acid", "µM"),
+    ("CHEBI:34631", "2921-88-2", "chlorpyrifos", "µg/L"),
+    ("CHEBI:164200", "3380-34-5", "triclosan", "µg/L"),
+    ("CHEBI:28119", "1746-01-6", "2,3,7,8-tetrachlorodibenzodioxine", "ng/L"),
+    ("CHEBI:15930", "1912-24-9", "atrazine", "µg/L"),
+    ("CHEBI:16469", "50-28-2", "17beta-estradiol", "ng/L"),
+    ("CHEBI:41879", "50-02-2", "dexamethasone", "µM"),
+    ("CHEBI:23414", "7758-98-7", "copper(II) sulfate", "µg/L"),
+    ("CHEBI:6651", "121-75-5", "malathion", "µM"),
+    ("CHEBI:9747", "52-68-6", "trichlorfon", "µM"),
+]
+
+# Exposure-type terms the seed data curates, keyed by chemical.
+EXPOSURE_TYPES = {
+    "CHEBI:33216": ("ECTO:9000057", "exposure to bisphenol A"),
+    "CHEBI:6651": ("ECTO:9001150", "exposure to malathion"),
+}
+
+CURATED_PHENOTYPE_TERMS = [
+    ("ZP:0105827", "edematous pericardial region"),
+    ("ZP:0001609", "abnormal head morphology"),
+]
+SYNTHETIC_PHENOTYPE_TERMS = 500
+
+FISH = [
+    ("ZFIN:ZDB-GENO-960809-7", "AB", 0.60),
+    ("ZFIN:ZDB-GENO-990623-3", "TU", 0.20),
+    ("ZFIN:ZDB-GENO-990623-2", "TL", 0.10),
+    ("ZFIN:ZDB-GENO-010531-2", "WIK", 0.10),
+]
+
+AQUATIC_ROUTE = ("ExO:0000161", "ambient acquatic environment route")
+
+# Exposures start in the first day and run into larval stages; phenotypes
+# are scored at or after the end of exposure.
+START_STAGES = ["ZFS:0000011", "ZFS:0000013", "ZFS:0000016", "ZFS:0000029"]
+END_STAGES = ["ZFS:0000035", "ZFS:0000039", "ZFS:0000044", "ZFS:0000050"]
+SEVERITIES = [("mild", 0.45), ("moderate", 0.35), ("severe", 0.20)]
+VEHICLES = [("dmso", 0.55), ("water", 0.30), ("ethanol", 0.10), ("embryonic_media", 0.05)]
+LABS = 2_000
+ANNOTATORS = 500
+
+
+def _zipf(n: int, s: float = 1.1) -> list[float]:
+    """Cumulative Zipf weights for ``n`` ranks, ready for ``cum_weights=``."""
+    return list(itertools.accumulate(1 / (rank**s) for rank in range(1, n + 1)))
+
+
+@dataclass
+class Counts:
+    """Rows written per table."""
+
+    rows: dict[str, int] = field(default_factory=dict)
+
+    def add(self, table: str, n: int) -> None:
+        self.rows[table] = self.rows.get(table, 0) + n
+
+
+class _Writer:
+    """Buffers rows per table and flushes them with ``bulk_insert``."""
+
+    def __init__(self, conn, counts: Counts) -> None:
+        self.conn = conn
+        self.counts = counts
+        self.pending: dict = {}
+
+    def add(self, model, row: dict) -> None:
+        rows = self.pending.setdefault(model.__table__, [])
+        rows.append(row)
+        if len(rows) >= FLUSH_ROWS:
+            self.flush()
+
+    def _flush(self, table) -> None:
+        rows = self.pending.pop(table, [])
+        if rows:
+            bulk_insert(self.conn, table, rows)
+            self.counts.add(table.name, len(rows))
+
+    def flush(self) -> None:
+        # Parents before children, so foreign keys hold at every flush.
+        for table in [t for t in Study.metadata.sorted_tables if t in self.pending]:
+            self._flush(table)
+
+
+def _shape(rng: random.Random, studies: int) -> list[list[int]]:
+    """Exposure count per experiment, per study.
+
+    Most studies run one or two experiments of one or two exposures;
+    a few screening studies run many.
+    """
+    shape = []
+    for _ in range(studies):
+        experiments = 1 + min(int(rng.expovariate(1.5)), 7)
+        shape.append([1 + min(int(rng.expovariate(1.2)), 5) for _ in range(experiments)])
+    return shape
+
+
+def _allocate(rng: random.Random, slots: int, total: int) -> list[int]:
+    """Split ``total`` phenotypes over ``slots`` observation sets, skewed."""
+    weights = [rng.expovariate(1.0) for _ in range(slots)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for index in rng.choices(range(slots), weights=weights, k=total - sum(counts)):
+        counts[index] += 1
+    return counts
+
+
+def _write_vocabulary(writer: _Writer) -> list[tuple[str, str]]:
+    for zfin_id, name, _ in FISH:
+        writer.add(Fish, {"zfin_id": zfin_id, "name": name})
+    writer.add(ExposureRoute, {"term_uri": AQUATIC_ROUTE[0], "term_label": AQUATIC_ROUTE[1]})
+    for term_uri, term_label in EXPOSURE_TYPES.values():
+        writer.add(ExposureType, {"term_uri": term_uri, "term_label": term_label})
+    terms = CURATED_PHENOTYPE_TERMS + [
+        (f"ZP:9{n:06d}", f"synthetic phenotype {n}")
+        for n in range(1, SYNTHETIC_PHENOTYPE_TERMS + 1)
+    ]
+    for term_uri, term_label in terms:
+        writer.add(PhenotypeTerm, {"term_uri": term_uri, "term_label": term_label})
+    return terms
+
+
+def generate(engine: Engine, *, studies: int, phenotypes: int, seed: int = DEFAULT_SEED) -> Counts:
+    """Write a synthetic atlas into an empty database behind ``engine``."""
+    shape_rng, rng = random.Random(seed), random.Random(seed + 1)
+    shape = _shape(shape_rng, studies)
+    per_observation = iter(
+        _allocate(shape_rng, sum(sum(exposures) for exposures in shape), phenotypes)
+    )
+
+    chemical_weights = _zipf(len(CHEMICALS))
+    fish_weights = list(itertools.accumulate(weight for *_, weight in FISH))
+    lab_weights = _zipf(LABS)
+    annotator_weights = _zipf(ANNOTATORS, s=0.8)
+    severities, severity_weights = zip(*SEVERITIES, strict=True)
+    severity_weights = list(itertools.accumulate(severity_weights))
+    vehicles, vehicle_weights = zip(*VEHICLES, strict=True)
+    vehicle_weights = list(itertools.accumulate(vehicle_weights))
+
+    ids = {model: itertools.count(1) for model in (Experiment, ExposureEvent, Phenotype)}
+    quantity_ids = itertools.count(1)
+    counts = Counts()
+    init_db(engine)
+    with engine.begin() as conn:
+        writer = _Writer(conn, counts)
+        terms = _write_vocabulary(writer)
+        term_weights = _zipf(len(terms))
+
+        def quantity(unit: str, value: float) -> int:
+            quantity_id = next(quantity_ids)
+            writer.add(
+                QuantityValue, {"id": quantity_id, "unit": unit, "numeric_value": f"{value:g}"}
+            )
+            return quantity_id
+
+        for study_id, experiments in enumerate(shape, start=1):
+            lab = rng.choices(range(LABS), cum_weights=lab_weights)[0]
+            writer.add(
+                Study,
+                {
+                    "id": study_id,
+                    "publication": f"PMID:{90_000_000 + study_id}",
+                    "lab": f"ZFIN:ZDB-LAB-{lab:06d}-1",
+                },
+            )
+            for annotator in set(
+                rng.choices(range(ANNOTATORS), cum_weights=annotator_weights, k=2)
+            ):
+                writer.add(
+                    StudyAnnotator,
+                    {"Study_id": study_id, "annotator": f"ORCID:0000-0002-{annotator:04d}-0000"},
+                )
+
+            for exposures in experiments:
+                experiment_id = next(ids[Experiment])
+                writer.add(
+                    Experiment,
+                    {
+                        "id": experiment_id,
+                        "Study_id": study_id,
+                        "standard_rearing_condition": rng.random() < 0.9,
+                        "fish_zfin_id": rng.choices(FISH, cum_weights=fish_weights)[0][0],
+                    },
+                )
+                for _ in range(exposures):
+                    exposure_id = next(ids[ExposureEvent])
+                    start = rng.randrange(len(START_STAGES))
+                    end = rng.randrange(len(END_STAGES))
+                    mixture = 2 if rng.random() < 0.2 else 1
+                    chemicals = rng.choices(CHEMICALS, cum_weights=chemical_weights, k=mixture)
+                    exposure_type = EXPOSURE_TYPES.get(chemicals[0][0])
+                    writer.add(
+                        ExposureEvent,
+                        {
+                            "id": exposure_id,
+                            "Experiment_id": experiment_id,
+                            "route_term_uri": AQUATIC_ROUTE[0],
+                            "exposure_type_term_uri": exposure_type and exposure_type[0],
+                            "exposure_start_stage": START_STAGES[start],
+                            "exposure_end_stage": END_STAGES[end],
+                        },
+                    )
+                    for chemical_id, cas_id, name, unit in chemicals:
+                        writer.add(
+                            StressorChemical,
+                            {
+                                "ExposureEvent_id": exposure_id,
+                                "chemical_id": chemical_id,
+                                "cas_id": cas_id,
+                                "chemical_name": name,
+                                "concentration_id": quantity(
+                                    unit, round(10 ** rng.uniform(-2, 3), 2)
+                                ),
+                            },
+                        )
+                    if rng.random() < 0.7:
+                        vehicle = rng.choices(vehicles, cum_weights=vehicle_weights)[0]
+                        writer.add(
+                            VehicleOfTransmission,
+                            {
+                                "ExposureEvent_id": exposure_id,
+                                "vehicle_type": vehicle,
+                                "concentration_id": quantity("%", 0.1),
+                            },
+                        )
+
+                    writer.add(
+                        PhenotypeObservationSet,
+                        {"id": exposure_id, "ExposureEvent_id": exposure_id},
+                    )
+                    for _ in range(next(per_observation)):
+                        term_uri, _ = rng.choices(terms, cum_weights=term_weights)[0]
+                        writer.add(
+                            Phenotype,
+                            {
+                                "id": next(ids[Phenotype]),
+                                "PhenotypeObservationSet_id": exposure_id,
+                                "stage": END_STAGES[rng.randrange(end, len(END_STAGES))],
+                                "severity": rng.choices(severities, cum_weights=severity_weights)[
+                                    0
+                                ],
+                                "phenotype_term_id_term_uri": term_uri,
+                                "prevalence_id": quantity("%", rng.randint(5, 100)),
+                            },
+                        )
+        writer.flush()
+        reset_sequences(conn)
+    return counts
+
+
+def _fast_bulk_load(dbapi_connection, _record) -> None:
+    # The file is rebuilt from scratch on failure, so durability buys nothing.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=OFF")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def build(path: Path, *, studies: int, phenotypes: int, seed: int = DEFAULT_SEED) -> Counts:
+    """Build a synthetic atlas at ``path``, replacing any file already there."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    partial.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{partial}")
+    event.listen(engine, "connect", _fast_bulk_load)
+    try:
+        counts = generate(engine, studies=studies, phenotypes=phenotypes, seed=seed)
+    finally:
+        engine.dispose()
+    partial.replace(path)
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m zapp_atlas.synth", description=__doc__)
+    parser.formatter_class = argparse.RawDescriptionHelpFormatter
+    parser.add_argument("path", type=Path, help="SQLite file to write (replaced if present)")
+    parser.add_argument("--studies", type=int, default=1_000)
+    parser.add_argument(
+        "--phenotypes", type=int, help=f"total phenotypes (default {PHENOTYPES_PER_STUDY}/study)"
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    phenotypes = args.phenotypes
+    if phenotypes is None:
+        phenotypes = args.studies * PHENOTYPES_PER_STUDY
+    start = time.perf_counter()
+    counts = build(args.path, studies=args.studies, phenotypes=phenotypes, seed=args.seed)
+    for table, n in sorted(counts.rows.items()):
+        print(f"{n:>12,}  {table}")
+    size = args.path.stat().st_size / 2**20
+    print(f"wrote {args.path} ({size:,.0f} MiB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
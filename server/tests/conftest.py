@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -8,19 +10,36 @@ from sqlalchemy.pool import StaticPool
 
 from zapp_atlas.api.deps import get_session
 from zapp_atlas.main import create_app
+from zapp_atlas.schema.sqla import Base
 from zapp_atlas.settings import AppSettings
 
+# A throwaway Postgres database (e.g. from `just test-postgres`). When set,
+# every test using `client` runs against it as well as against SQLite.
+TEST_DATABASE_URL = os.environ.get("ZAPP_TEST_DATABASE_URL", "")
 
-@pytest.fixture
-def client(tmp_path) -> TestClient:
+
+@pytest.fixture(params=["sqlite", "postgres"] if TEST_DATABASE_URL else ["sqlite"])
+def engine(request):
     from zapp_atlas.db import init_db
 
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    if request.param == "sqlite":
+        engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_engine(TEST_DATABASE_URL)
+        Base.metadata.drop_all(engine)
     init_db(engine)
+    yield engine
+    if request.param == "postgres":
+        Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(tmp_path, engine) -> TestClient:
     SessionLocal = sessionmaker(bind=engine)
 
     # Build settings hermetically: `_env_file=None` stops pydantic-settings from
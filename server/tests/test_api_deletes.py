@@ -6,6 +6,10 @@ from pathlib import Path
 
 from fastapi.testclient import TestClient
 
+from zapp_atlas.api.services.images import sweep_blob_deletion_batch
+from zapp_atlas.db.image_storage import LocalFilesystemStorage
+from zapp_atlas.db.models import BlobDeletion
+
 
 _PNG_1X1_RED = bytes.fromhex(
     "89504E470D0A1A0A0000000D49484452000000010000000108020000"
@@ -14,6 +18,12 @@ _PNG_1X1_RED = bytes.fromhex(
 )
 
 
+def _sweep(client: TestClient, storage) -> int:
+    """Run one pass of the background blob sweeper."""
+    with client.app.state.session_factory() as session:
+        return sweep_blob_deletion_batch(session, storage)
+
+
 def _build_study_graph(client: TestClient) -> dict:
     """Create a full study → experiment → exposure → observation + image
     for delete-cascade testing. Returns the ids."""
@@ -60,13 +70,16 @@ def test_delete_image_removes_row_and_blob(
     client: TestClient, tmp_path: Path
 ) -> None:
     ids = _build_study_graph(client)
-    blob = tmp_path / "images" / str(ids["image_id"])
+    blob = LocalFilesystemStorage(tmp_path).path_for(f"images/{ids['image_id']}")
     assert blob.is_file()
 
     res = client.delete(f"/api/images/{ids['image_id']}")
     assert res.status_code == 204
 
     assert client.get(f"/api/images/{ids['image_id']}").status_code == 404
+    # The request only queues the blob; the sweeper removes it.
+    assert blob.is_file()
+    assert _sweep(client, LocalFilesystemStorage(tmp_path)) == 1
     assert not blob.exists()
 
 
@@ -80,6 +93,86 @@ def test_delete_observation_cascades_to_images(
 
     assert client.get(f"/api/observations/{ids['observation_id']}").status_code == 404
     assert client.get(f"/api/images/{ids['image_id']}").status_code == 404
+    storage = LocalFilesystemStorage(tmp_path)
+    _sweep(client, storage)
+    assert not storage.path_for(f"images/{ids['image_id']}").exists()
+
+
+def test_delete_observation_keeps_blobs_shared_with_other_observations(
+    client: TestClient, tmp_path: Path
+) -> None:
+    client.app.state.settings.content_addressed_images = True
+    ids = _build_study_graph(client)
+    other = client.post(
+        f"/api/exposures/{ids['exposure_id']}/observations",
+        json={"phenotype": [], "image": [], "control_image": []},
+    ).json()
+    for obs_id in (ids["observation_id"], ids["observation_id"], other["id"]):
+        client.post(
+            f"/api/observations/{obs_id}/images",
+            files={"file": ("a.png", _PNG_1X1_RED, "image/png")},
+        )
+
+    assert client.delete(f"/api/observations/{ids['observation_id']}").status_code == 204
+    storage = LocalFilesystemStorage(tmp_path)
+    _sweep(client, storage)
+
+    # The per-id blob of the first image is gone; the shared one is not.
+    assert not storage.path_for(f"images/{ids['image_id']}").exists()
+    [kept] = client.get(f"/api/observations/{other['id']}").json()["image"]
+    assert client.get(f"/api/images/{kept['id']}").content == _PNG_1X1_RED
+
+    assert client.delete(f"/api/observations/{other['id']}").status_code == 204
+    _sweep(client, storage)
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+
+
+class _FlakyStorage(LocalFilesystemStorage):
+    def __init__(self, root, failures: int) -> None:
+        super().__init__(root)
+        self.failures = failures
+
+    def delete(self, key: str) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("bucket unavailable")
+        super().delete(key)
+
+
+def test_failed_blob_deletion_is_retried_later(client: TestClient, tmp_path: Path) -> None:
+    ids = _build_study_graph(client)
+    client.delete(f"/api/images/{ids['image_id']}")
+    storage = _FlakyStorage(tmp_path, failures=1)
+
+    assert _sweep(client, storage) == 1
+    with client.app.state.session_factory() as session:
+        [queued] = session.query(BlobDeletion).all()
+        assert queued.attempts == 1
+        assert queued.last_error == "bucket unavailable"
+        # Backed off: not due again straight away.
+        assert _sweep(client, storage) == 0
+        queued.next_attempt_at = None
+        session.commit()
+
+    assert _sweep(client, storage) == 1
+    assert not storage.path_for(f"images/{ids['image_id']}").exists()
+
+
+def test_reupload_cancels_a_queued_deletion(client: TestClient, tmp_path: Path) -> None:
+    client.app.state.settings.content_addressed_images = True
+    ids = _build_study_graph(client)
+
+    def upload() -> int:
+        return client.post(
+            f"/api/observations/{ids['observation_id']}/images",
+            files={"file": ("a.png", _PNG_1X1_RED, "image/png")},
+        ).json()["id"]
+
+    client.delete(f"/api/images/{upload()}")
+    again = upload()
+    _sweep(client, LocalFilesystemStorage(tmp_path))
+
+    assert client.get(f"/api/images/{again}").content == _PNG_1X1_RED
 
 
 def test_delete_exposure_cascades(client: TestClient) -> None:
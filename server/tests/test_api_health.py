@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 
 from zapp_atlas.main import create_app
+from zapp_atlas.settings import AppSettings
 
 
 def test_health():
@@ -8,3 +9,18 @@ def test_health():
     res = client.get("/health")
     assert res.status_code == 200
     assert res.json() == {"status": "ok"}
+
+
+def test_storage_cache_health_reports_hit_ratio(tmp_path):
+    settings = AppSettings(
+        upload_dir=tmp_path / "uploads", storage_cache_dir=tmp_path / "cache", _env_file=None
+    )
+    client = TestClient(create_app(settings))
+    res = client.get("/health/storage-cache")
+    assert res.status_code == 200
+    assert res.json()["hit_ratio"] == 0.0
+
+
+def test_storage_cache_health_404_without_a_cache(tmp_path):
+    client = TestClient(create_app(AppSettings(upload_dir=tmp_path, _env_file=None)))
+    assert client.get("/health/storage-cache").status_code == 404
@@ -6,7 +6,25 @@ Local-filesystem backend only; S3/Tigris path is env-gated and not
 exercised here.
 """
 
+import threading
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from zapp_atlas.api.deps import get_app_storage
+from zapp_atlas.api.services.images import (
+    create_image_for_observation,
+    delete_image,
+    load_image_bytes,
+    sweep_blob_deletion_batch,
+)
+from zapp_atlas.db import get_engine, init_db
+from zapp_atlas.db.image_storage import LocalFilesystemStorage, ObjectUrl, PresignedUpload
+from zapp_atlas.db.models import BlobDeletion
+from zapp_atlas.schema.sqla import PhenotypeObservationSet
+from zapp_atlas.settings import AppSettings
 
 
 # Tiny valid PNG: 1x1 pixel, red. Small enough to embed.
@@ -109,3 +127,482 @@ def test_upload_missing_observation_404(client: TestClient) -> None:
 
 def test_get_missing_image_404(client: TestClient) -> None:
     assert client.get("/api/images/999999").status_code == 404
+
+
+def _blob_files(root) -> list:
+    return [p for p in root.rglob("*") if p.is_file()]
+
+
+def test_content_addressed_upload_stores_shared_bytes_once(client: TestClient, tmp_path) -> None:
+    client.app.state.settings.content_addressed_images = True
+    first_obs = _create_observation(client)
+    second_obs = _create_observation(client)
+
+    ids = [
+        client.post(
+            f"/api/observations/{obs_id}/images",
+            files={"file": ("control.png", _PNG_1X1_RED, "image/png")},
+        ).json()["id"]
+        for obs_id in (first_obs, second_obs)
+    ]
+
+    assert len(_blob_files(tmp_path)) == 1
+    for image_id in ids:
+        fetch = client.get(f"/api/images/{image_id}")
+        assert fetch.status_code == 200
+        assert fetch.content == _PNG_1X1_RED
+
+
+def test_content_addressed_blob_outlives_all_but_its_last_image(
+    client: TestClient, tmp_path
+) -> None:
+    client.app.state.settings.content_addressed_images = True
+    obs_id = _create_observation(client)
+    first, second = (
+        client.post(
+            f"/api/observations/{obs_id}/images",
+            files={"file": (name, _PNG_1X1_RED, "image/png")},
+        ).json()["id"]
+        for name in ("a.png", "b.png")
+    )
+
+    assert client.delete(f"/api/images/{first}").status_code == 204
+    assert len(_blob_files(tmp_path)) == 1
+    assert client.get(f"/api/images/{second}").content == _PNG_1X1_RED
+
+    assert client.delete(f"/api/images/{second}").status_code == 204
+    with client.app.state.session_factory() as session:
+        sweep_blob_deletion_batch(session, LocalFilesystemStorage(tmp_path))
+    assert _blob_files(tmp_path) == []
+
+
+def test_reused_image_id_keeps_its_new_blob(client: TestClient, tmp_path) -> None:
+    obs_id = _create_observation(client)
+
+    def upload() -> int:
+        return client.post(
+            f"/api/observations/{obs_id}/images",
+            files={"file": ("fish.png", _PNG_1X1_RED, "image/png")},
+        ).json()["id"]
+
+    deleted = upload()
+    assert client.delete(f"/api/images/{deleted}").status_code == 204
+    # SQLite hands the freed top id, and so its storage key, to the next image.
+    reupload = upload()
+    with client.app.state.session_factory() as session:
+        sweep_blob_deletion_batch(session, LocalFilesystemStorage(tmp_path))
+
+    assert client.get(f"/api/images/{reupload}").content == _PNG_1X1_RED
+
+
+def test_sweeper_spares_a_per_id_key_in_use_again(client: TestClient, tmp_path) -> None:
+    obs_id = _create_observation(client)
+    image_id = client.post(
+        f"/api/observations/{obs_id}/images",
+        files={"file": ("fish.png", _PNG_1X1_RED, "image/png")},
+    ).json()["id"]
+    with client.app.state.session_factory() as session:
+        # As if queued by an image that held the id before this one.
+        session.add(BlobDeletion(key=f"images/{image_id}"))
+        session.commit()
+        sweep_blob_deletion_batch(session, LocalFilesystemStorage(tmp_path))
+        assert session.scalars(select(BlobDeletion)).all() == []
+
+    assert client.get(f"/api/images/{image_id}").content == _PNG_1X1_RED
+
+
+class _DeleteInterleavingStorage(LocalFilesystemStorage):
+    """Local storage that runs ``meanwhile`` just before each bulk delete."""
+
+    def __init__(self, root, meanwhile):
+        super().__init__(root)
+        self._meanwhile = meanwhile
+
+    def delete_many(self, keys):
+        self._meanwhile()
+        return super().delete_many(keys)
+
+
+@pytest.mark.parametrize("content_addressed", [False, True])
+def test_sweeper_cannot_delete_what_an_upload_writes_meanwhile(
+    tmp_path, content_addressed: bool
+) -> None:
+    # A file database, so the upload runs on its own connection.
+    settings = AppSettings(db_path=tmp_path / "zapp.db", _env_file=None)
+    engine = init_db(get_engine(settings=settings))
+    Session = sessionmaker(bind=engine)
+    root = tmp_path / "blobs"
+
+    def upload() -> int:
+        with Session() as session:
+            return create_image_for_observation(
+                session,
+                observation_id=obs_id,
+                data=_PNG_1X1_RED,
+                content_type="image/png",
+                storage=LocalFilesystemStorage(root),
+                content_addressed=content_addressed,
+            ).id
+
+    with Session() as session:
+        obs = PhenotypeObservationSet()
+        session.add(obs)
+        session.commit()
+        obs_id = obs.id
+        # Queues the key the next upload writes: the same id, or the same bytes.
+        delete_image(session, upload())
+
+    uploaded = []
+    uploader = threading.Thread(target=lambda: uploaded.append(upload()))
+
+    def meanwhile() -> None:
+        uploader.start()
+        uploader.join(timeout=0.5)
+
+    with Session() as session:
+        sweep_blob_deletion_batch(session, _DeleteInterleavingStorage(root, meanwhile))
+    uploader.join()
+
+    with Session() as session:
+        stored = load_image_bytes(session, uploaded[0], LocalFilesystemStorage(root))
+    assert stored is not None and stored.data == _PNG_1X1_RED
+    engine.dispose()
+
+
+class _PresigningStorage(LocalFilesystemStorage):
+    """Local storage that pretends to hand out bucket upload URLs.
+
+    The test plays the part of the client by writing the key itself. Like a
+    bucket, and unlike the local backend, it remembers each object's type.
+    """
+
+    def __init__(self, root):
+        super().__init__(root)
+        self._types = {}
+
+    def put(self, key, data, content_type):
+        super().put(key, data, content_type)
+        self._types[key] = content_type
+
+    def head(self, key):
+        info = super().head(key)
+        if info is not None:
+            info.content_type = self._types.get(key, info.content_type)
+        return info
+
+    def presign_upload(self, key, content_type, expires_in=900):
+        return PresignedUpload(
+            url=f"https://bucket.example/{key}",
+            method="PUT",
+            headers={"Content-Type": content_type},
+            expires_in=expires_in,
+        )
+
+
+def _use_presigning_storage(client: TestClient, root) -> _PresigningStorage:
+    storage = _PresigningStorage(root)
+    client.app.dependency_overrides[get_app_storage] = lambda: storage
+    return storage
+
+
+def test_direct_upload_initiate_then_finalize(client: TestClient, tmp_path) -> None:
+    storage = _use_presigning_storage(client, tmp_path)
+    obs_id = _create_observation(client)
+
+    ticket = client.post(
+        f"/api/observations/{obs_id}/images:initiate",
+        json={"content_type": "image/png", "size": len(_PNG_1X1_RED)},
+    )
+    assert ticket.status_code == 201, ticket.text
+    ticket = ticket.json()
+    assert ticket["method"] == "PUT"
+    assert ticket["headers"] == {"Content-Type": "image/png"}
+
+    # The client uploads straight to the bucket.
+    storage.put(ticket["url"].removeprefix("https://bucket.example/"), _PNG_1X1_RED, "image/png")
+
+    done = client.post(
+        f"/api/observations/{obs_id}/images:finalize",
+        json={"upload_id": ticket["upload_id"], "magnification": "10x"},
+    )
+    assert done.status_code == 201, done.text
+    assert done.json()["magnification"] == "10x"
+
+    fetch = client.get(f"/api/images/{done.json()['id']}")
+    assert fetch.content == _PNG_1X1_RED
+
+    # A ticket is single-use.
+    again = client.post(
+        f"/api/observations/{obs_id}/images:finalize",
+        json={"upload_id": ticket["upload_id"]},
+    )
+    assert again.status_code == 409
+
+
+def test_direct_upload_finalize_before_upload_conflicts(client: TestClient, tmp_path) -> None:
+    _use_presigning_storage(client, tmp_path)
+    obs_id = _create_observation(client)
+    ticket = client.post(
+        f"/api/observations/{obs_id}/images:initiate", json={"content_type": "image/png"}
+    ).json()
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:finalize",
+        json={"upload_id": ticket["upload_id"]},
+    )
+    assert res.status_code == 409
+
+
+def test_direct_upload_finalize_rejects_what_was_actually_uploaded(
+    client: TestClient, tmp_path
+) -> None:
+    storage = _use_presigning_storage(client, tmp_path)
+    client.app.state.settings.max_upload_bytes = 64
+    obs_id = _create_observation(client)
+    ticket = client.post(
+        f"/api/observations/{obs_id}/images:initiate",
+        json={"content_type": "image/png", "size": 10},
+    ).json()
+
+    key = ticket["url"].removeprefix("https://bucket.example/")
+    storage.put(key, b"\x00" * 1024, "image/png")
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:finalize",
+        json={"upload_id": ticket["upload_id"]},
+    )
+    assert res.status_code == 413
+    with client.app.state.session_factory() as session:
+        sweep_blob_deletion_batch(session, storage)
+    assert storage.head(key) is None
+
+
+def test_direct_upload_unavailable_on_local_storage(client: TestClient) -> None:
+    obs_id = _create_observation(client)
+    res = client.post(
+        f"/api/observations/{obs_id}/images:initiate", json={"content_type": "image/png"}
+    )
+    assert res.status_code == 501
+
+
+def test_upload_records_blob_metadata_on_the_image(client: TestClient) -> None:
+    import hashlib
+
+    obs_id = _create_observation(client)
+    created = client.post(
+        f"/api/observations/{obs_id}/images",
+        files={"file": ("fish.png", _PNG_1X1_RED, "image/png")},
+    ).json()
+
+    assert created["content_type"] == "image/png"
+    assert created["byte_size"] == len(_PNG_1X1_RED)
+    assert created["checksum"] == hashlib.sha256(_PNG_1X1_RED).hexdigest()
+
+
+def test_redirect_is_cacheable_for_as_long_as_the_url_is_valid(
+    client: TestClient, tmp_path
+) -> None:
+    class _SigningStorage(LocalFilesystemStorage):
+        def url_for(self, key):
+            return ObjectUrl(url=f"https://bucket.example/{key}?sig=x", expires_in=1234)
+
+    storage = _SigningStorage(tmp_path)
+    client.app.dependency_overrides[get_app_storage] = lambda: storage
+    obs_id = _create_observation(client)
+    image_id = client.post(
+        f"/api/observations/{obs_id}/images",
+        files={"file": ("fish.png", _PNG_1X1_RED, "image/png")},
+    ).json()["id"]
+
+    res = client.get(f"/api/images/{image_id}", follow_redirects=False)
+    assert res.status_code == 302
+    assert res.headers["location"] == f"https://bucket.example/images/{image_id}?sig=x"
+    assert res.headers["cache-control"] == "public, max-age=1234"
+
+
+def _png_files(*names: str):
+    return [("files", (name, _PNG_1X1_RED, "image/png")) for name in names]
+
+
+def test_batch_upload_creates_every_image(client: TestClient, tmp_path) -> None:
+    obs_id = _create_observation(client)
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:batch",
+        files=_png_files("a.png", "b.png", "c.png"),
+        data={"magnification": "10x"},
+    )
+    assert res.status_code == 201, res.text
+    results = res.json()
+    assert [r["filename"] for r in results] == ["a.png", "b.png", "c.png"]
+    assert all(r["error"] is None and r["image"]["magnification"] == "10x" for r in results)
+    assert len(_blob_files(tmp_path)) == 3
+    for r in results:
+        assert client.get(f"/api/images/{r['image']['id']}").content == _PNG_1X1_RED
+
+
+def test_batch_upload_writes_shared_bytes_once(client: TestClient, tmp_path) -> None:
+    client.app.state.settings.content_addressed_images = True
+    obs_id = _create_observation(client)
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:batch", files=_png_files("a.png", "b.png")
+    )
+    assert res.status_code == 201
+    assert len(_blob_files(tmp_path)) == 1
+
+    first, second = (r["image"]["id"] for r in res.json())
+    client.delete(f"/api/images/{first}")
+    with client.app.state.session_factory() as session:
+        sweep_blob_deletion_batch(session, LocalFilesystemStorage(tmp_path))
+    assert client.get(f"/api/images/{second}").content == _PNG_1X1_RED
+
+
+def test_batch_upload_rejects_the_whole_batch_for_one_bad_file(
+    client: TestClient, tmp_path
+) -> None:
+    obs_id = _create_observation(client)
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:batch",
+        files=[*_png_files("a.png"), ("files", ("notes.txt", b"hello", "text/plain"))],
+    )
+    assert res.status_code == 422
+    a, notes = res.json()["detail"]
+    assert a["error"].startswith("Not stored")
+    assert notes["filename"] == "notes.txt"
+    assert "UnsupportedImageTypeError" in notes["error"]
+    assert _blob_files(tmp_path) == []
+    assert client.get(f"/api/observations/{obs_id}").json()["image"] == []
+
+
+def test_batch_upload_rolls_back_when_storage_fails(client: TestClient, tmp_path) -> None:
+    class _FailingStorage(LocalFilesystemStorage):
+        def put(self, key, data, content_type):
+            if key.endswith("2"):
+                raise OSError("disk full")
+            super().put(key, data, content_type)
+
+    storage = _FailingStorage(tmp_path)
+    client.app.dependency_overrides[get_app_storage] = lambda: storage
+    obs_id = _create_observation(client)
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:batch", files=_png_files("a.png", "b.png")
+    )
+    assert res.status_code == 502
+    assert [r["error"] for r in res.json()["detail"]] == [
+        "Not stored: another file in the batch failed",
+        "OSError: disk full",
+    ]
+    assert client.get(f"/api/observations/{obs_id}").json()["image"] == []
+
+    # The blob that did get written is cleaned up by the sweeper.
+    with client.app.state.session_factory() as session:
+        sweep_blob_deletion_batch(session, storage)
+    assert _blob_files(tmp_path) == []
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_upload_after_a_failed_batch_keeps_its_blob(
+    client: TestClient, tmp_path, batch: bool
+) -> None:
+    class _FailingStorage(LocalFilesystemStorage):
+        fail = True
+
+        def put(self, key, data, content_type):
+            if self.fail and key.endswith("2"):
+                raise OSError("disk full")
+            super().put(key, data, content_type)
+
+    storage = _FailingStorage(tmp_path)
+    client.app.dependency_overrides[get_app_storage] = lambda: storage
+    obs_id = _create_observation(client)
+    res = client.post(
+        f"/api/observations/{obs_id}/images:batch", files=_png_files("a.png", "b.png")
+    )
+    assert res.status_code == 502
+
+    # The rollback freed the batch's ids; this upload takes the first of them.
+    storage.fail = False
+    if batch:
+        res = client.post(f"/api/observations/{obs_id}/images:batch", files=_png_files("c.png"))
+        image_id = res.json()[0]["image"]["id"]
+    else:
+        res = client.post(
+            f"/api/observations/{obs_id}/images",
+            files={"file": ("fish.png", _PNG_1X1_RED, "image/png")},
+        )
+        image_id = res.json()["id"]
+    with client.app.state.session_factory() as session:
+        queued = session.scalars(select(BlobDeletion.key)).all()
+        assert f"images/{image_id}" not in queued
+        sweep_blob_deletion_batch(session, storage)
+
+    assert client.get(f"/api/images/{image_id}").content == _PNG_1X1_RED
+
+
+def test_batch_upload_limits_the_number_of_files(client: TestClient) -> None:
+    client.app.state.settings.max_batch_upload_files = 2
+    obs_id = _create_observation(client)
+
+    res = client.post(
+        f"/api/observations/{obs_id}/images:batch",
+        files=_png_files("a.png", "b.png", "c.png"),
+    )
+    assert res.status_code == 413
+
+
+def test_study_images_download_as_a_zip(client: TestClient, tmp_path) -> None:
+    import io
+    import zipfile
+
+    from zapp_atlas.schema.sqla import Experiment, ExposureEvent, PhenotypeObservationSet
+
+    obs_id = _create_observation(client)
+    with client.app.state.session_factory() as session:
+        exposure_id = session.get(PhenotypeObservationSet, obs_id).ExposureEvent_id
+        experiment_id = session.get(ExposureEvent, exposure_id).Experiment_id
+        study_id = session.get(Experiment, experiment_id).Study_id
+    png = client.post(
+        f"/api/observations/{obs_id}/images",
+        files={"file": ("a.png", _PNG_1X1_RED, "image/png")},
+    ).json()
+    jpeg = client.post(
+        f"/api/observations/{obs_id}/images",
+        files={"file": ("b.jpg", b"\xff\xd8not-really", "image/jpeg")},
+    ).json()
+
+    res = client.get(f"/api/studies/{study_id}/images.zip")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(res.content))
+    assert archive.testzip() is None
+    prefix = f"experiment-{experiment_id}/exposure-{exposure_id}/observation-{obs_id}"
+    assert archive.namelist() == [
+        f"{prefix}/image-{png['id']}.png",
+        f"{prefix}/image-{jpeg['id']}.jpg",
+    ]
+    assert archive.read(f"{prefix}/image-{png['id']}.png") == _PNG_1X1_RED
+
+
+def test_study_zip_leaves_out_missing_blobs(client: TestClient, tmp_path) -> None:
+    import io
+    import zipfile
+
+    obs_id = _create_observation(client)
+    image_id = client.post(
+        f"/api/observations/{obs_id}/images",
+        files={"file": ("a.png", _PNG_1X1_RED, "image/png")},
+    ).json()["id"]
+    LocalFilesystemStorage(tmp_path).delete(f"images/{image_id}")
+    study_id = client.get("/api/studies").json()[0]["id"]
+
+    res = client.get(f"/api/studies/{study_id}/images.zip")
+    assert res.status_code == 200
+    assert zipfile.ZipFile(io.BytesIO(res.content)).namelist() == []
+
+
+def test_study_zip_404_for_missing_study(client: TestClient) -> None:
+    assert client.get("/api/studies/999999/images.zip").status_code == 404
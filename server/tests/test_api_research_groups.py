@@ -0,0 +1,180 @@
+"""Research group writes, authorized by each identity's cached roles."""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+
+from zapp_atlas.auth.permissions import PermissionCache
+from zapp_atlas.schema.sqla import ResearchGroupMember  # type: ignore
+
+ADA = "0000-0001-1111-2222"
+GRACE = "0000-0002-3333-4444"
+
+
+def _sign_in(client: TestClient, orcid_id: str) -> None:
+    client.app.state.settings.dev_auth = True
+    res = client.post("/auth/dev/login", data={"name": orcid_id, "orcid_id": orcid_id})
+    assert res.status_code == 200  # followed to /login
+
+
+def _create_group(client: TestClient, admin: str = ADA) -> int:
+    _sign_in(client, admin)
+    res = client.post("/api/research-groups", json={"name": "Tanguay lab"})
+    assert res.status_code == 201
+    return res.json()["id"]
+
+
+def _add_chemical(client: TestClient, group_id: int, chemical_id: str = "CHEBI:33216"):
+    return client.post(
+        "/api/chemical-cabinet", json={"research_group": group_id, "chemical_id": chemical_id}
+    )
+
+
+def _add_member(client: TestClient, group_id: int, orcid_id: str, role: str = "member"):
+    return client.post(
+        "/api/research-group-members",
+        json={"research_group": group_id, "member": f"ORCID:{orcid_id}", "role": role},
+    )
+
+
+def test_writes_need_a_signed_in_identity(client: TestClient) -> None:
+    assert client.post("/api/research-groups", json={"name": "Lab"}).status_code == 401
+    assert _add_chemical(client, 1).status_code == 401
+
+
+def test_the_creator_administers_the_group(client: TestClient) -> None:
+    group_id = _create_group(client)
+
+    added = _add_chemical(client, group_id)
+    assert added.status_code == 201
+    entry_id = added.json()["id"]
+    patched = client.patch(f"/api/chemical-cabinet/{entry_id}", json={"chemical_id": "CHEBI:1"})
+    assert patched.json()["chemical_id"] == "CHEBI:1"
+    tank = client.post(
+        "/api/fish-tank",
+        json={
+            "research_group": group_id,
+            "fish": {"zfin_id": "ZFIN:ZDB-GENO-990101-3", "name": "AB"},
+        },
+    )
+    assert tank.status_code == 201
+    assert tank.json()["fish"]["zfin_id"] == "ZFIN:ZDB-GENO-990101-3"
+    assert client.delete(f"/api/chemical-cabinet/{entry_id}").status_code == 204
+
+
+def test_outsiders_cannot_write_to_a_group(client: TestClient) -> None:
+    group_id = _create_group(client)
+    entry_id = _add_chemical(client, group_id).json()["id"]
+
+    _sign_in(client, GRACE)
+
+    assert _add_chemical(client, group_id, "CHEBI:2").status_code == 403
+    assert client.delete(f"/api/chemical-cabinet/{entry_id}").status_code == 403
+    assert _add_member(client, group_id, GRACE, "admin").status_code == 403
+
+
+def test_members_edit_data_but_only_admins_manage_members(client: TestClient) -> None:
+    group_id = _create_group(client)
+    _add_member(client, group_id, GRACE)
+
+    _sign_in(client, GRACE)
+
+    assert _add_chemical(client, group_id).status_code == 201
+    assert _add_member(client, group_id, "0000-0003-5555-6666").status_code == 403
+
+
+def _membership_id(client: TestClient, group_id: int, orcid_id: str) -> int:
+    with client.app.state.session_factory() as session:
+        return session.scalar(
+            select(ResearchGroupMember.id).where(
+                ResearchGroupMember.research_group == group_id,
+                ResearchGroupMember.member == f"ORCID:{orcid_id}",
+            )
+        )
+
+
+def test_a_group_keeps_at_least_one_admin(client: TestClient) -> None:
+    group_id = _create_group(client)
+    own = f"/api/research-group-members/{_membership_id(client, group_id, ADA)}"
+
+    assert client.patch(own, json={"role": "member"}).status_code == 409
+    assert client.delete(own).status_code == 409
+    # Still in charge.
+    assert _add_member(client, group_id, GRACE, "admin").status_code == 201
+
+    # With another admin, stepping down is fine.
+    assert client.patch(own, json={"role": "member"}).status_code == 200
+    assert client.delete(own).status_code == 403  # no longer an admin
+
+
+def test_moving_an_entry_needs_a_role_in_both_groups(client: TestClient) -> None:
+    theirs = _create_group(client, GRACE)
+    ours = _create_group(client, ADA)
+    entry_id = _add_chemical(client, ours).json()["id"]
+
+    res = client.patch(f"/api/chemical-cabinet/{entry_id}", json={"research_group": theirs})
+
+    assert res.status_code == 403
+
+
+def test_membership_changes_apply_at_once(client: TestClient) -> None:
+    group_id = _create_group(client)
+    _sign_in(client, GRACE)
+    # Grace's (empty) roles are now cached.
+    assert _add_chemical(client, group_id).status_code == 403
+
+    _sign_in(client, ADA)
+    membership = _add_member(client, group_id, GRACE).json()
+    _sign_in(client, GRACE)
+    assert _add_chemical(client, group_id).status_code == 201
+
+    _sign_in(client, ADA)
+    assert client.delete(f"/api/research-group-members/{membership['id']}").status_code == 204
+    _sign_in(client, GRACE)
+    assert _add_chemical(client, group_id, "CHEBI:2").status_code == 403
+
+
+def test_roles_are_read_once_per_identity(client: TestClient, engine) -> None:
+    group_id = _create_group(client)
+    statements = []
+
+    def record(conn, cursor, statement, *args) -> None:
+        if '"ResearchGroupMember"' in statement and statement.lstrip().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for n in range(5):
+            assert _add_chemical(client, group_id, f"CHEBI:{n}").status_code == 201
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+
+
+def test_duplicate_entries_conflict(client: TestClient) -> None:
+    group_id = _create_group(client)
+    _add_chemical(client, group_id)
+
+    assert _add_chemical(client, group_id).status_code == 409
+    assert _add_member(client, group_id, ADA).status_code == 409
+
+
+@pytest.mark.parametrize(("elapsed", "loads"), [(59, 1), (61, 2)])
+def test_cached_roles_expire(elapsed: float, loads: int) -> None:
+    now = [0.0]
+    cache = PermissionCache(60, clock=lambda: now[0])
+    calls = []
+
+    def load(member: str) -> dict[int, str]:
+        calls.append(member)
+        return {1: "member"}
+
+    assert cache.get("ORCID:x", load).allows(1)
+    now[0] = elapsed
+    assert cache.get("ORCID:x", load).allows(1)
+    assert not cache.get("ORCID:x", load).allows(1, "admin")
+
+    assert len(calls) == loads
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from unittest.mock import patch
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import parse_qs, urlparse
 
+import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, func, inspect, select
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from zapp_atlas.auth import services
 from zapp_atlas.auth.models import OrcidIdentity
 from zapp_atlas.auth.services import (
     ORCID_AUTH_COOKIE,
@@ -15,7 +20,8 @@ from zapp_atlas.auth.services import (
     store_orcid_identity,
 )
 from zapp_atlas.db import init_db
-from zapp_atlas.settings import DEFAULT_ORCID_REDIRECT_URI
+from zapp_atlas.main import create_app
+from zapp_atlas.settings import DEFAULT_ORCID_REDIRECT_URI, AppSettings
 
 
 def test_login_page_offers_sign_in_when_signed_out(client: TestClient) -> None:
@@ -71,33 +77,94 @@ def test_orcid_login_redirects_to_authorize(client: TestClient) -> None:
     assert query["state"]
 
 
-def test_registered_callback_stores_token_and_redirects(client: TestClient) -> None:
-    client.app.state.settings.orcid_client_id = "APP-123"
-    client.app.state.settings.orcid_client_secret = "secret"
-
-    def fake_exchange(config, code):
-        assert code == "oauth-code"
-        return {
-            "access_token": "stored-access-token",
-            "refresh_token": "stored-refresh-token",
-            "token_type": "bearer",
-            "expires_in": 631138518,
-            "scope": "/authenticate",
-            "name": "Sofia Garcia",
-            "orcid": "0000-0001-2345-6789",
-        }
-
+TOKEN = {
+    "access_token": "stored-access-token",
+    "refresh_token": "stored-refresh-token",
+    "token_type": "bearer",
+    "expires_in": 631138518,
+    "scope": "/authenticate",
+    "name": "Sofia Garcia",
+    "orcid": "0000-0001-2345-6789",
+}
+
+
+class FakeOrcid:
+    """ORCID's token endpoint, on a local port.
+
+    Answers each POST with the next of ``responses`` (status, body, delay),
+    then with ``TOKEN``, keeping connections alive as ORCID does.
+    """
+
+    def __init__(self) -> None:
+        self.responses: list[tuple[int, object, float]] = []
+        self.requests: list[tuple[tuple[str, int], dict[str, list[str]]]] = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                length = int(self.headers["Content-Length"])
+                form = parse_qs(self.rfile.read(length).decode())
+                fake.requests.append((self.client_address, form))
+                status, body, delay = fake.responses.pop(0) if fake.responses else (200, TOKEN, 0)
+                time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> None:
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def orcid(client: TestClient):
+    fake = FakeOrcid()
+    fake.start()
+    settings = client.app.state.settings
+    settings.orcid_client_id = "APP-123"
+    settings.orcid_client_secret = "secret"
+    settings.orcid_base_url = fake.url
+    settings.orcid_timeout_seconds = 0.2
+    yield fake
+    fake.stop()
+
+
+def _sign_in(client: TestClient, code: str = "oauth-code"):
     client.cookies.set(ORCID_STATE_COOKIE, "state-value")
+    return client.get(f"/registered?code={code}&state=state-value", follow_redirects=False)
 
-    with patch("zapp_atlas.auth.router.exchange_code_for_token", fake_exchange):
-        res = client.get(
-            "/registered?code=oauth-code&state=state-value",
-            follow_redirects=False,
-        )
+
+def test_registered_callback_stores_token_and_redirects(
+    client: TestClient, orcid: FakeOrcid
+) -> None:
+    res = _sign_in(client)
 
     assert res.status_code == 303
     assert res.headers["location"] == "/login"
     assert ORCID_AUTH_COOKIE in res.cookies
+    [(_, form)] = orcid.requests
+    assert form["code"] == ["oauth-code"]
+    assert form["client_id"] == ["APP-123"]
+    assert form["client_secret"] == ["secret"]
+    assert form["grant_type"] == ["authorization_code"]
+    assert form["redirect_uri"] == [DEFAULT_ORCID_REDIRECT_URI]
 
     status_res = client.get("/auth/orcid/status")
     assert status_res.status_code == 200
@@ -107,6 +174,79 @@ def test_registered_callback_stores_token_and_redirects(client: TestClient) -> N
     assert "stored-refresh-token" not in status_res.text
 
 
+def test_token_exchange_is_retried_while_orcid_is_unavailable(
+    client: TestClient, orcid: FakeOrcid, monkeypatch
+) -> None:
+    monkeypatch.setattr(services, "RETRY_BACKOFF_SECONDS", 0)
+    orcid.responses = [(503, {}, 0), (502, {}, 0)]
+
+    res = _sign_in(client)
+
+    assert res.status_code == 303
+    assert len(orcid.requests) == 3
+
+
+def test_token_exchange_gives_up_after_its_retries(
+    client: TestClient, orcid: FakeOrcid, monkeypatch
+) -> None:
+    monkeypatch.setattr(services, "RETRY_BACKOFF_SECONDS", 0)
+    client.app.state.settings.orcid_token_retries = 1
+    orcid.responses = [(503, {"error": "down"}, 0)] * 3
+
+    res = _sign_in(client)
+
+    assert res.status_code == 502
+    assert "returned 503" in res.text
+    assert len(orcid.requests) == 2
+    assert ORCID_AUTH_COOKIE not in res.cookies
+
+
+@pytest.mark.parametrize(
+    ("response", "message"),
+    [
+        # A refused code would be refused again.
+        ((400, {"error": "invalid_grant"}, 0), "returned 400"),
+        # ORCID may have redeemed the code before the answer was lost.
+        ((200, TOKEN, 0.4), "Could not exchange"),
+    ],
+)
+def test_token_exchange_is_not_retried_once_orcid_has_the_code(
+    client: TestClient, orcid: FakeOrcid, response, message: str
+) -> None:
+    orcid.responses = [response]
+
+    res = _sign_in(client)
+
+    assert res.status_code == 502
+    assert message in res.text
+    assert len(orcid.requests) == 1
+
+
+def test_sign_ins_share_one_connection_to_orcid(tmp_path) -> None:
+    fake = FakeOrcid()
+    fake.start()
+    settings = AppSettings(
+        db_path=tmp_path / "zapp.db",
+        upload_dir=tmp_path,
+        skip_seed=True,
+        orcid_client_id="APP-123",
+        orcid_client_secret="secret",
+        orcid_base_url=fake.url,
+        _env_file=None,
+    )
+    try:
+        with TestClient(create_app(settings)) as client:
+            assert _sign_in(client, "first").status_code == 303
+            assert _sign_in(client, "second").status_code == 303
+            assert client.app.state.orcid_client.is_closed is False
+        assert client.app.state.orcid_client.is_closed
+    finally:
+        fake.stop()
+
+    (first, _), (second, _) = fake.requests
+    assert first == second
+
+
 def test_registered_callback_rejects_state_mismatch(
     client: TestClient,
 ) -> None:
@@ -0,0 +1,133 @@
+"""Signed session cookies: verification, expiry, key rotation, revalidation."""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+from zapp_atlas.auth.models import OrcidIdentity
+from zapp_atlas.auth.services import ORCID_AUTH_COOKIE
+from zapp_atlas.auth.sessions import SessionIdentity, SessionSigner
+
+ADA = ("id-1", "0000-0001-1111-2222", "Ada Lovelace")
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_a_token_round_trips_the_identity() -> None:
+    signer = SessionSigner(["key"], max_age=60)
+
+    assert signer.verify(signer.issue(*ADA)) == SessionIdentity(*ADA)
+
+
+@pytest.mark.parametrize(
+    "tamper",
+    [
+        lambda token: token[:-2] + ("AA" if token[-2:] != "AA" else "BB"),
+        lambda token: token.replace("v1.", "v2.", 1),
+        lambda token: "not-a-token",
+        lambda token: "id-1",  # the old bare-id cookie
+        lambda token: token[:-1] + "é",  # in the signature
+        lambda token: "é.".join(token.rsplit(".", 1)),  # in the payload
+    ],
+)
+def test_altered_tokens_are_rejected(tamper) -> None:
+    signer = SessionSigner(["key"], max_age=60)
+
+    assert signer.verify(tamper(signer.issue(*ADA))) is None
+
+
+def test_tokens_expire() -> None:
+    clock = Clock()
+    signer = SessionSigner(["key"], max_age=60, clock=clock)
+    token = signer.issue(*ADA)
+
+    clock.now += 59
+    assert signer.verify(token) is not None
+    clock.now += 1
+    assert signer.verify(token) is None
+
+
+def test_old_keys_verify_until_they_are_dropped() -> None:
+    old_token = SessionSigner(["old"], max_age=60).issue(*ADA)
+    rotated = SessionSigner(["new", "old"], max_age=60)
+
+    assert rotated.verify(old_token) == SessionIdentity(*ADA)
+    assert SessionSigner(["new"], max_age=60).verify(old_token) is None
+    assert SessionSigner(["old"], max_age=60).verify(rotated.issue(*ADA)) is None
+
+
+def test_revalidation_asks_the_database_once_per_interval() -> None:
+    clock = Clock()
+    signer = SessionSigner(["key"], max_age=600, revalidate_seconds=30, clock=clock)
+    token = signer.issue(*ADA)
+    lookups = []
+    exists = True
+
+    def check(identity_id: str) -> bool:
+        lookups.append(identity_id)
+        return exists
+
+    assert signer.current(token, check) is not None
+    assert signer.current(token, check) is not None
+    assert lookups == ["id-1"]
+
+    exists = False
+    clock.now += 30
+    assert signer.current(token, check) is None
+    assert lookups == ["id-1", "id-1"]
+
+
+def test_without_revalidation_the_database_is_never_asked() -> None:
+    signer = SessionSigner(["key"], max_age=60)
+
+    assert signer.current(signer.issue(*ADA), lambda _: pytest.fail("queried")) is not None
+
+
+def _sign_in(client: TestClient) -> None:
+    client.app.state.settings.dev_auth = True
+    client.post(
+        "/auth/dev/login", data={"name": ADA[2], "orcid_id": ADA[1]}, follow_redirects=False
+    )
+
+
+def test_pages_show_the_signed_in_user_without_a_query(client: TestClient, engine) -> None:
+    _sign_in(client)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    res = client.get("/login")
+
+    assert ADA[2] in res.text
+    assert statements == []
+
+
+def test_a_non_ascii_cookie_reads_as_signed_out(client: TestClient) -> None:
+    token = client.app.state.sessions.issue(*ADA)
+
+    res = client.get(
+        "/login", headers={"cookie": f"{ORCID_AUTH_COOKIE}={token}\xe9".encode("latin-1")}
+    )
+
+    assert res.status_code == 200
+    assert ADA[2] not in res.text
+
+
+def test_a_deleted_identity_is_signed_out_once_revalidated(client: TestClient) -> None:
+    client.app.state.sessions.revalidate_seconds = 30
+    _sign_in(client)
+    assert ORCID_AUTH_COOKIE in client.cookies
+
+    with client.app.state.session_factory() as session:
+        session.execute(delete(OrcidIdentity))
+        session.commit()
+
+    assert client.get("/auth/orcid/status").status_code == 404
+    assert ADA[2] not in client.get("/login").text
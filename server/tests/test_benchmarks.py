@@ -0,0 +1,37 @@
+"""The benchmark regression gate (``benchmarks.results.compare``)."""
+
+from __future__ import annotations
+
+from benchmarks.__main__ import main
+from benchmarks.results import compare
+
+
+def _regressed(baseline, current, **kwargs) -> list[str]:
+    regressions, _ = compare(baseline, current, **kwargs)
+    return [change.metric for change in regressions]
+
+
+def test_growth_past_the_threshold_is_a_regression():
+    baseline = {"a": 100.0, "b": 100.0}
+    assert _regressed(baseline, {"a": 124.0, "b": 126.0}, threshold=0.25) == ["b"]
+
+
+def test_tiny_absolute_changes_are_noise():
+    assert _regressed({"a": 0.2}, {"a": 0.9}, threshold=0.25, min_delta_ms=1.0) == []
+
+
+def test_per_metric_thresholds_override_the_default():
+    baseline = {"routes.100000.GET": 100.0, "startup.empty": 100.0}
+    current = {"routes.100000.GET": 140.0, "startup.empty": 140.0}
+    assert _regressed(baseline, current, threshold=0.25, overrides={"routes.100000.*": 0.5}) == [
+        "startup.empty"
+    ]
+
+
+def test_metrics_missing_from_either_run_are_skipped():
+    assert _regressed({"old": 1.0}, {"new": 1000.0}) == []
+
+
+def test_comparing_without_a_baseline_says_how_to_record_one(tmp_path, capsys):
+    assert main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "current.json")]) == 2
+    assert "just bench-baseline" in capsys.readouterr().err
@@ -0,0 +1,181 @@
+"""Response compression: choosing a coding, what is skipped, and the metrics."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from zapp_atlas import compress
+from zapp_atlas.compress import CompressionMetrics, CompressionMiddleware, choose_coding
+
+TEXT = b'{"label": "pericardial edema", "stage": "ZFS:0000033"}\n' * 200
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 20
+
+
+def _app(metrics: CompressionMetrics | None = None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, metrics=metrics or CompressionMetrics())
+
+    @app.get("/text")
+    def text() -> Response:
+        return Response(TEXT, media_type="application/json")
+
+    @app.get("/small")
+    def small() -> Response:
+        return Response(b"{}", media_type="application/json")
+
+    @app.get("/image/{media_type:path}")
+    def image(media_type: str) -> Response:
+        return Response(PNG if media_type == "image/png" else TEXT, media_type=media_type)
+
+    return app
+
+
+def _raw(client: TestClient, path: str, accept_encoding: str):
+    """The response and its body exactly as sent, still encoded."""
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as res:
+        return res, b"".join(res.iter_raw())
+
+
+def _create_studies(client: TestClient, count: int = 10) -> None:
+    for n in range(count):
+        client.post(
+            "/api/studies",
+            json={
+                "publication": f"PMID:{n}",
+                "lab": "ZFIN:ZDB-LAB-1-1",
+                "annotator": ["ORCID:0000-0000-0000-0000"],
+                "experiment": [],
+            },
+        )
+
+
+def test_large_responses_are_gzipped(client: TestClient) -> None:
+    _create_studies(client)
+
+    res, body = _raw(client, "/api/studies", "gzip")
+
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["vary"] == "Accept-Encoding"
+    assert res.headers["content-length"] == str(len(body))
+    assert len(gzip.decompress(body)) > 2 * len(body)
+
+
+def test_zstd_is_preferred_when_accepted() -> None:
+    if not any(coding.name == "zstd" for coding in compress.CODINGS):
+        pytest.skip("no zstd module installed")
+
+    res, body = _raw(TestClient(_app()), "/text", "gzip, deflate, br, zstd")
+
+    assert res.headers["content-encoding"] == "zstd"
+    assert compress.zstd.decompress(body) == TEXT
+
+
+@pytest.mark.parametrize(
+    ("path", "accept_encoding"),
+    [
+        ("/small", "gzip"),  # not worth it
+        ("/text", "identity"),
+        ("/text", "deflate"),
+        ("/image/image/png", "gzip"),  # compressed already
+    ],
+)
+def test_responses_are_sent_as_they_are(path: str, accept_encoding: str) -> None:
+    res, body = _raw(TestClient(_app()), path, accept_encoding)
+
+    assert "content-encoding" not in res.headers
+    assert res.headers["content-length"] == str(len(body))
+
+
+def test_uncompressed_image_formats_are_compressed() -> None:
+    res, body = _raw(TestClient(_app()), "/image/image/svg+xml", "gzip")
+
+    assert res.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == TEXT
+
+
+@pytest.mark.parametrize(
+    ("size", "streamed", "expected"),
+    [
+        (100, False, None),
+        (64 * 1024, False, "br"),
+        (8 * 1024 * 1024, False, "gzip"),  # too much CPU for brotli
+        (None, True, "gzip"),
+    ],
+)
+def test_the_coding_depends_on_the_size(monkeypatch, size, streamed, expected) -> None:
+    brotli = compress.Coding("br", bytes, None, max_bytes=compress.BROTLI_MAX_BYTES)
+    gzip_ = next(coding for coding in compress.CODINGS if coding.name == "gzip")
+    monkeypatch.setattr(compress, "CODINGS", (brotli, gzip_))
+
+    coding = choose_coding("gzip, br", size, streamed=streamed)
+
+    assert (coding and coding.name) == expected
+
+
+def test_streamed_responses_are_compressed_chunk_by_chunk() -> None:
+    chunks = [b"<tr><td>pericardial edema</td></tr>\n" * 50 for _ in range(3)]
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, metrics=CompressionMetrics())
+
+    @app.get("/rows")
+    def rows() -> StreamingResponse:
+        return StreamingResponse(iter(chunks), media_type="text/html")
+
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/rows",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "query_string": b"",
+    }
+    asyncio.run(app(scope, receive, send))
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Each chunk decodes as soon as it arrives, so the page still streams.
+    decoder = zlib.decompressobj(31)
+    bodies = [message for message in sent[1:] if message.get("body")]
+    for chunk, message in zip(chunks, bodies[: len(chunks)], strict=True):
+        assert decoder.decompress(message["body"]) == chunk
+    assert sent[-1]["more_body"] is False
+
+
+def test_metrics_report_ratio_and_cpu_time() -> None:
+    metrics = CompressionMetrics()
+    client = TestClient(_app(metrics))
+    _raw(client, "/text", "gzip")
+    _raw(client, "/small", "gzip")
+
+    stats = metrics.stats()["gzip"]
+    assert stats.responses == 1
+    assert (stats.bytes_in, stats.bytes_out) == (len(TEXT), len(gzip.compress(TEXT, 6, mtime=0)))
+    assert stats.ratio > 10
+    assert stats.cpu_seconds > 0
+    assert metrics.uncompressed == 1
+
+
+def test_metrics_are_served_at_health(client: TestClient) -> None:
+    _create_studies(client)
+    client.get("/api/studies", headers={"Accept-Encoding": "gzip"})
+
+    health = client.get("/health/compression").json()
+
+    assert health["gzip"]["responses"] == 1
+    assert health["gzip"]["ratio"] > 1
+    assert health["uncompressed"] >= 1
@@ -1,6 +1,18 @@
-from sqlalchemy import create_engine, inspect, text
+import sqlite3
+from unittest.mock import MagicMock
 
-from zapp_atlas.db import init_db, get_session_factory
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from zapp_atlas.db import (
+    BUSY_ATTEMPTS,
+    get_engine,
+    get_session_factory,
+    init_db,
+    is_busy_error,
+    retry_on_busy,
+)
 from zapp_atlas.schema.sqla import (
     Experiment,
     ExposureEvent,
@@ -12,6 +24,7 @@ from zapp_atlas.schema.sqla import (
     StressorChemical,
     Study,
 )
+from zapp_atlas.settings import AppSettings
 
 
 def test_init_db_creates_expected_tables():
@@ -168,3 +181,117 @@ def test_study_round_trip():
     assert phenotypes[1].stage == "ZFS:0000035"
 
     session.close()
+
+
+def test_init_db_adds_columns_new_to_an_existing_table():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE "Image" (id INTEGER PRIMARY KEY, magnification TEXT)'))
+
+    init_db(engine)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("Image")}
+    assert {"content_type", "byte_size", "checksum"} <= columns
+
+
+def test_get_engine_uses_wal_and_the_configured_busy_timeout(tmp_path):
+    settings = AppSettings(
+        db_path=tmp_path / "zapp.db", sqlite_busy_timeout_ms=1234, _env_file=None
+    )
+    engine = get_engine(settings=settings)
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+    engine.dispose()
+
+
+def test_a_held_write_lock_is_reported_busy(tmp_path):
+    settings = AppSettings(db_path=tmp_path / "zapp.db", sqlite_busy_timeout_ms=50, _env_file=None)
+    engine = init_db(get_engine(settings=settings))
+    other = get_engine(settings=settings)
+
+    with engine.connect() as holder:
+        holder.exec_driver_sql("BEGIN IMMEDIATE")
+        with pytest.raises(OperationalError) as excinfo, other.begin() as conn:
+            conn.execute(text("INSERT INTO \"Study\" (publication) VALUES ('PMID:1')"))
+        holder.exec_driver_sql("ROLLBACK")
+
+    assert is_busy_error(excinfo.value)
+    engine.dispose()
+    other.dispose()
+
+
+def _busy() -> OperationalError:
+    orig = sqlite3.OperationalError("database is locked")
+    orig.sqlite_errorcode = sqlite3.SQLITE_BUSY
+    return OperationalError("INSERT", {}, orig)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("zapp_atlas.db.db.time.sleep", lambda _: None)
+
+
+def test_retry_on_busy_rolls_back_and_reruns_the_service(no_backoff):
+    session = MagicMock()
+    calls = []
+
+    @retry_on_busy
+    def write(session, value):
+        calls.append(value)
+        if len(calls) < 3:
+            raise _busy()
+        return value
+
+    assert write(session, "ok") == "ok"
+    assert calls == ["ok", "ok", "ok"]
+    assert session.rollback.call_count == 2
+
+
+def test_retry_on_busy_gives_up_and_ignores_other_errors(no_backoff):
+    session = MagicMock()
+
+    @retry_on_busy
+    def always_busy(session):
+        raise _busy()
+
+    @retry_on_busy
+    def broken(session):
+        raise OperationalError("SELECT", {}, sqlite3.OperationalError("no such table: x"))
+
+    with pytest.raises(OperationalError):
+        always_busy(session)
+    assert session.rollback.call_count == BUSY_ATTEMPTS - 1
+
+    session.reset_mock()
+    with pytest.raises(OperationalError):
+        broken(session)
+    session.rollback.assert_not_called()
+
+
+def test_postgres_serialization_failures_and_deadlocks_are_retried():
+    class PgError(Exception):
+        def __init__(self, sqlstate):
+            self.sqlstate = sqlstate
+
+    assert is_busy_error(OperationalError("UPDATE", {}, PgError("40001")))
+    assert is_busy_error(OperationalError("UPDATE", {}, PgError("40P01")))
+    assert not is_busy_error(OperationalError("UPDATE", {}, PgError("23505")))
+
+
+def test_database_url_gets_a_tuned_pool():
+    pytest.importorskip("psycopg")
+    settings = AppSettings(
+        database_url="postgresql+psycopg://zapp@localhost/zapp",
+        db_pool_size=3,
+        db_max_overflow=2,
+        _env_file=None,
+    )
+    engine = get_engine(settings=settings)
+
+    assert engine.dialect.name == "postgresql"
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 2
+    assert engine.pool._pre_ping
+    engine.dispose()
@@ -91,3 +91,151 @@ def test_edit_page_explains_how_to_build_when_unavailable(tmp_path) -> None:
     assert res.status_code == 503
     assert "npm run build" in res.text
     assert "ZAPP_VITE_DEV_SERVER" in res.text
+
+
+def _write_manifest(dist_dir, manifest) -> None:
+    (dist_dir / ".vite").mkdir(exist_ok=True)
+    (dist_dir / ".vite" / "manifest.json").write_text(json.dumps(manifest))
+
+
+GRAPH = {
+    "src/main.tsx": {
+        "file": "assets/main-abc123.js",
+        "isEntry": True,
+        "imports": ["_vendor-111.js", "_api-222.js"],
+        "dynamicImports": ["src/pages/Study.tsx"],
+        "css": ["assets/main-def456.css"],
+    },
+    "_vendor-111.js": {"file": "assets/vendor-111.js"},
+    "_api-222.js": {
+        "file": "assets/api-222.js",
+        "imports": ["_vendor-111.js", "_zod-333.js"],
+        "css": ["assets/api-444.css"],
+    },
+    "_zod-333.js": {"file": "assets/zod-333.js"},
+    "src/pages/Study.tsx": {
+        "file": "assets/Study-555.js",
+        "imports": ["_vendor-111.js", "_grid-666.js"],
+        "css": ["assets/Study-777.css"],
+    },
+    "_grid-666.js": {"file": "assets/grid-666.js"},
+}
+
+
+def test_vite_assets_walk_the_whole_import_graph(tmp_path) -> None:
+    _write_manifest(tmp_path, GRAPH)
+
+    assets = get_vite_assets(tmp_path)
+
+    # Everything statically imported, however deep, each chunk once.
+    assert assets.modulepreloads == (
+        "/edit/assets/vendor-111.js",
+        "/edit/assets/api-222.js",
+        "/edit/assets/zod-333.js",
+    )
+    # Dynamic imports, and what only they import, are merely prefetched.
+    assert assets.prefetches == ("/edit/assets/Study-555.js", "/edit/assets/grid-666.js")
+    # A lazy chunk's CSS arrives with it; the page must not block on it.
+    assert assets.stylesheets == ("/edit/assets/main-def456.css", "/edit/assets/api-444.css")
+    assert assets.preload_links == (
+        "</edit/assets/main-def456.css>; rel=preload; as=style",
+        "</edit/assets/api-444.css>; rel=preload; as=style",
+        "</edit/assets/main-abc123.js>; rel=modulepreload",
+        "</edit/assets/vendor-111.js>; rel=modulepreload",
+        "</edit/assets/api-222.js>; rel=modulepreload",
+        "</edit/assets/zod-333.js>; rel=modulepreload",
+    )
+
+
+def test_vite_assets_are_read_again_after_a_rebuild(tmp_path) -> None:
+    import os
+
+    _write_manifest(tmp_path, GRAPH)
+    first = get_vite_assets(tmp_path)
+    assert get_vite_assets(tmp_path) is first
+
+    manifest = tmp_path / ".vite" / "manifest.json"
+    built = manifest.stat().st_mtime
+    _write_manifest(tmp_path, {"src/main.tsx": {"file": "assets/main-new.js"}})
+    os.utime(manifest, (built + 1, built + 1))
+
+    assert get_vite_assets(tmp_path).modulepreloads == ()
+
+
+def test_dev_server_assets_have_no_preload_links() -> None:
+    assert get_vite_assets(None, "http://localhost:5173").preload_links == ()
+
+
+def _edit_app(dist_dir):
+    from fastapi import FastAPI
+
+    from zapp_atlas.api.deps import get_app_settings
+    from zapp_atlas.html.edit_router import EarlyHintsMiddleware, make_edit_router
+    from zapp_atlas.settings import AppSettings
+
+    app = FastAPI()
+    app.state.settings = AppSettings(vite_dev_server="", _env_file=None)
+    app.include_router(make_edit_router(dist_dir))
+    app.add_middleware(EarlyHintsMiddleware, dist_dir=dist_dir)
+    app.dependency_overrides[get_app_settings] = lambda: app.state.settings
+    return app
+
+
+def test_edit_page_names_the_import_graph(tmp_path) -> None:
+    _write_manifest(tmp_path, GRAPH)
+
+    res = TestClient(_edit_app(tmp_path)).get("/edit/studies/1")
+
+    assert res.status_code == 200
+    assert res.headers["link"] == ", ".join(get_vite_assets(tmp_path).preload_links)
+    assert '<link rel="modulepreload" href="/edit/assets/zod-333.js">' in res.text
+    assert '<link rel="prefetch" href="/edit/assets/grid-666.js">' in res.text
+    assert '<link rel="stylesheet" href="/edit/assets/api-444.css">' in res.text
+
+
+async def _early_hints(app, path: str, extensions: dict) -> list[dict]:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "2",
+        "method": "GET",
+        "scheme": "https",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "server": ("testserver", 443),
+        "client": ("testclient", 50000),
+        "extensions": extensions,
+        "app": app,
+    }
+    await app(scope, receive, send)
+    return [message for message in sent if message["type"] == "http.response.early_hint"]
+
+
+def test_early_hints_go_out_before_the_edit_document(tmp_path) -> None:
+    import asyncio
+
+    _write_manifest(tmp_path, GRAPH)
+    app = _edit_app(tmp_path)
+    supported = {"http.response.early_hint": {}}
+
+    hints = asyncio.run(_early_hints(app, "/edit", supported))
+    assert hints == [
+        {
+            "type": "http.response.early_hint",
+            "links": [link.encode() for link in get_vite_assets(tmp_path).preload_links],
+        }
+    ]
+    # Not for the assets themselves, nor on servers without the extension.
+    assert asyncio.run(_early_hints(app, "/edit/assets/main-abc123.js", supported)) == []
+    assert asyncio.run(_early_hints(app, "/edit", {})) == []
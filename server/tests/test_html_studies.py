@@ -0,0 +1,289 @@
+"""The server-rendered study browser, its lazy partials, and the fragment cache."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from zapp_atlas.db import study_version
+from zapp_atlas.html import studies
+from zapp_atlas.html.fragments import FragmentCache
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+
+
+def _create_study(client: TestClient, publication: str = "PMID:333") -> dict:
+    study = client.post(
+        "/api/studies",
+        json={
+            "publication": publication,
+            "lab": "ZFIN:ZDB-LAB-1-1",
+            "annotator": ["ORCID:0000-0000-0000-0000"],
+            "experiment": [],
+        },
+    ).json()
+    experiment = client.post(
+        f"/api/studies/{study['id']}/experiments",
+        json={
+            "standard_rearing_condition": True,
+            "fish": {"zfin_id": "ZFIN:ZDB-GENO-990101-3", "name": "AB"},
+            "control": [],
+            "exposure_event": [],
+        },
+    ).json()
+    exposure = client.post(
+        f"/api/experiments/{experiment['id']}/exposures",
+        json={
+            "exposure_start_stage": "ZFS:0000011",
+            "exposure_end_stage": "ZFS:0000039",
+            "stressor": [
+                {
+                    "chemical_id": "CHEBI:33216",
+                    "chemical_name": "bisphenol A",
+                    "concentration": {"unit": "µg/L", "numeric_value": "100"},
+                }
+            ],
+            "phenotype_observation": [],
+        },
+    ).json()
+    observation = client.post(
+        f"/api/exposures/{exposure['id']}/observations",
+        json={
+            "phenotype": [
+                {
+                    "stage": "ZFS:0000035",
+                    "severity": "moderate",
+                    "phenotype_term_id": {
+                        "term_uri": "ZP:0105827",
+                        "term_label": "pericardial region edematous, abnormal",
+                    },
+                }
+            ],
+            "image": [],
+            "control_image": [],
+        },
+    ).json()
+    image = client.post(
+        f"/api/observations/{observation['id']}/images",
+        files={"file": ("fish.png", PNG, "image/png")},
+        data={"magnification": "10x"},
+    ).json()
+    return {
+        "study": study["id"],
+        "experiment": experiment["id"],
+        "exposure": exposure["id"],
+        "observation": observation["id"],
+        "image": image["id"],
+    }
+
+
+@pytest.fixture
+def queries(engine) -> list[str]:
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_list_links_every_study(client: TestClient, monkeypatch) -> None:
+    monkeypatch.setattr(studies, "STUDIES_PER_PAGE", 2)
+    ids = [_create_study(client, f"PMID:{n}")["study"] for n in range(3)]
+
+    first = client.get("/studies")
+    second = client.get("/studies?page=2")
+
+    assert first.status_code == 200
+    assert f'href="/studies/{ids[0]}"' in first.text
+    assert "1 experiment" in first.text
+    assert "1 experiments" not in first.text
+    assert 'href="/studies?page=2"' in first.text
+    assert f'href="/studies/{ids[2]}"' in second.text
+    assert f'href="/studies/{ids[0]}"' not in second.text
+
+
+def test_study_page_defers_its_sections(client: TestClient) -> None:
+    ids = _create_study(client)
+
+    res = client.get(f"/studies/{ids['study']}")
+
+    assert res.status_code == 200
+    assert "PMID:333" in res.text
+    assert "ORCID:0000-0000-0000-0000" in res.text
+    assert f'hx-get="/partials/studies/{ids["study"]}/experiments"' in res.text
+    assert 'hx-trigger="revealed"' in res.text
+    # The experiments themselves arrive later, as a partial.
+    assert "ZDB-GENO-990101-3" not in res.text
+
+
+def test_partials_lead_down_to_the_gallery(client: TestClient) -> None:
+    ids = _create_study(client)
+    base = f"/partials/studies/{ids['study']}"
+
+    experiments = client.get(f"{base}/experiments")
+    exposures = client.get(f"{base}/experiments/{ids['experiment']}/exposures")
+    observations = client.get(f"{base}/exposures/{ids['exposure']}/observations")
+    gallery = client.get(f"{base}/observations/{ids['observation']}/images")
+
+    assert "AB (ZFIN:ZDB-GENO-990101-3)" in experiments.text
+    assert f'hx-get="{base}/experiments/{ids["experiment"]}/exposures"' in experiments.text
+    assert "bisphenol A (100 µg/L)" in exposures.text
+    assert f'hx-get="{base}/exposures/{ids["exposure"]}/observations"' in exposures.text
+    assert "pericardial region edematous, abnormal" in observations.text
+    assert f'hx-get="{base}/observations/{ids["observation"]}/images"' in observations.text
+    assert f'src="/api/images/{ids["image"]}"' in gallery.text
+    assert 'alt="Image' in gallery.text
+    # Partials are bare fragments for htmx to swap in.
+    assert "<html" not in experiments.text
+
+
+def test_a_warm_partial_costs_only_the_version_lookup(client: TestClient, queries) -> None:
+    ids = _create_study(client)
+    url = f"/partials/studies/{ids['study']}/exposures/{ids['exposure']}/observations"
+    cold = client.get(url).text
+    queries.clear()
+
+    warm = client.get(url).text
+
+    assert warm == cold
+    assert len(queries) == 1
+
+
+def test_a_write_anywhere_in_the_study_shows_up(client: TestClient) -> None:
+    ids = _create_study(client)
+    url = f"/partials/studies/{ids['study']}/experiments"
+    assert "Rearing notes" not in client.get(url).text
+
+    client.patch(
+        f"/api/experiments/{ids['experiment']}",
+        json={"rearing_condition_comment": "kept at 26 °C"},
+    )
+
+    assert "kept at 26 °C" in client.get(url).text
+
+
+def test_versions_move_only_for_the_study_written(client: TestClient, engine) -> None:
+    ids = _create_study(client)
+    other = _create_study(client, "PMID:444")
+    with Session(engine) as session:
+        before = study_version(session, ids["study"]), study_version(session, other["study"])
+
+    client.delete(f"/api/images/{ids['image']}")
+
+    with Session(engine) as session:
+        assert study_version(session, ids["study"]) > before[0]
+        assert study_version(session, other["study"]) == before[1]
+        assert study_version(session, 9999) is None
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/studies/9999",
+        "/partials/studies/9999/experiments",
+        "/partials/studies/{other}/experiments/{experiment}/exposures",
+        "/partials/studies/{other}/exposures/{exposure}/observations",
+        "/partials/studies/{other}/observations/{observation}/images",
+    ],
+)
+def test_entities_are_only_shown_under_their_own_study(client: TestClient, path: str) -> None:
+    ids = _create_study(client)
+    other = _create_study(client, "PMID:444")["study"]
+
+    assert client.get(path.format(other=other, **ids)).status_code == 404
+
+
+def _add_phenotypes(client: TestClient, exposure_id: int, count: int) -> None:
+    client.post(
+        f"/api/exposures/{exposure_id}/observations",
+        json={
+            "phenotype": [
+                {
+                    "stage": "ZFS:0000035",
+                    "phenotype_term_id": {"term_uri": f"ZP:{n:07}", "term_label": f"phenotype {n}"},
+                }
+                for n in range(count)
+            ],
+            "image": [],
+            "control_image": [],
+        },
+    )
+
+
+def test_the_phenotype_table_has_every_row(client: TestClient) -> None:
+    ids = _create_study(client)
+    _add_phenotypes(client, ids["exposure"], 250)
+
+    res = client.get(f"/studies/{ids['study']}/phenotypes")
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/html")
+    assert "pericardial region edematous, abnormal" in res.text
+    assert "phenotype 0" in res.text
+    assert "phenotype 249" in res.text
+    assert res.text.count("<tr>") == 252  # the heading row, then one per phenotype
+    assert res.text.rstrip().endswith("</html>")
+    assert client.get("/studies/9999/phenotypes").status_code == 404
+
+
+def test_the_phenotype_table_streams_ahead_of_its_rows(client: TestClient, queries) -> None:
+    ids = _create_study(client)
+    _add_phenotypes(client, ids["exposure"], 250)
+    queries.clear()
+    chunks: list[tuple[bytes, int]] = []
+
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive() -> dict:
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()  # the reader stays until the page is done
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append((message["body"], len(queries)))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/studies/{ids['study']}/phenotypes",
+        "raw_path": b"",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    asyncio.run(client.app(scope, receive, send))
+
+    first, queries_before_first = chunks[0]
+    # The head and the site header leave before the rows are even queried.
+    assert b"</header>" in first
+    assert b"<tbody>" in first
+    assert b"phenotype 0" not in first
+    assert not any('"Phenotype"' in q for q in queries[:queries_before_first])
+    assert len(chunks) > 2
+    assert b"".join(body for body, _ in chunks).count(b"<tr>") == 252
+
+
+def test_the_cache_drops_the_least_recently_used_fragment() -> None:
+    cache = FragmentCache(max_entries=2)
+    cache.put("a", "<p>a</p>")
+    cache.put("b", "<p>b</p>")
+    cache.get("a")
+    cache.put("c", "<p>c</p>")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "<p>a</p>"
+    assert cache.get_or_render("d", lambda: None) is None
+    assert cache.stats().entries == 2
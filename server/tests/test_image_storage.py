@@ -0,0 +1,237 @@
+"""Storage backends: the local blob layout, bucket URL signing, the disk cache.
+
+Local blobs used to sit at ``<root>/<key>`` with a ``.type`` sidecar; they
+now live in hashed subdirectories with their metadata on the ``Image`` row.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from zapp_atlas.api.services.images import migrate_image_batch
+from zapp_atlas.background import migrate_images
+from zapp_atlas.db import image_storage, init_db
+from zapp_atlas.db.image_storage import (
+    BucketStorage,
+    CachingStorage,
+    LocalFilesystemStorage,
+    get_storage,
+)
+from zapp_atlas.schema.sqla import Image, PhenotypeObservationSet
+from zapp_atlas.settings import AppSettings
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    init_db(engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def _legacy_image(session, root, data: bytes = PNG, content_type: str = "image/png") -> Image:
+    """An image as uploaded before metadata moved into the database."""
+    obs = PhenotypeObservationSet()
+    image = Image()
+    obs.image.append(image)
+    session.add(obs)
+    session.commit()
+    (root / "images").mkdir(exist_ok=True)
+    (root / "images" / str(image.id)).write_bytes(data)
+    (root / "images" / f"{image.id}.type").write_text(content_type)
+    return image
+
+
+def test_blobs_are_sharded_without_sidecars(tmp_path) -> None:
+    storage = LocalFilesystemStorage(tmp_path)
+    storage.put("images/7", PNG, "image/png")
+
+    [path] = [p for p in tmp_path.rglob("*") if p.is_file()]
+    digest = hashlib.sha256(b"images/7").hexdigest()
+    assert path.relative_to(tmp_path).parts[:2] == (digest[:2], digest[2:4])
+    assert storage.get("images/7").data == PNG
+    assert storage.head("images/7").size == len(PNG)
+
+
+def test_legacy_blobs_stay_readable_until_migrated(session, tmp_path) -> None:
+    storage = LocalFilesystemStorage(tmp_path)
+    image = _legacy_image(session, tmp_path, content_type="image/tiff")
+
+    stored = storage.get(f"images/{image.id}")
+    assert stored.data == PNG
+    assert stored.content_type == "image/tiff"
+
+
+def test_migration_backfills_metadata_and_moves_blobs(session, tmp_path) -> None:
+    storage = LocalFilesystemStorage(tmp_path)
+    images = [_legacy_image(session, tmp_path) for _ in range(3)]
+
+    after_id = 0
+    while (last := migrate_image_batch(session, storage, after_id=after_id, limit=2)) is not None:
+        after_id = last
+
+    for image in images:
+        session.refresh(image)
+        assert image.content_type == "image/png"
+        assert image.byte_size == len(PNG)
+        assert image.checksum == hashlib.sha256(PNG).hexdigest()
+        assert storage.path_for(f"images/{image.id}").is_file()
+    assert not (tmp_path / "images").exists() or not any((tmp_path / "images").iterdir())
+
+
+def test_migration_skips_images_whose_blob_is_missing(session, tmp_path) -> None:
+    storage = LocalFilesystemStorage(tmp_path)
+    image = _legacy_image(session, tmp_path)
+    storage.delete(f"images/{image.id}")
+
+    assert migrate_image_batch(session, storage) == image.id
+    assert migrate_image_batch(session, storage, after_id=image.id) is None
+    session.refresh(image)
+    assert image.content_type is None
+
+
+def test_online_migration_retries_a_failed_batch(tmp_path) -> None:
+    # A file, so the worker thread sees the same database.
+    Session = sessionmaker(bind=init_db(create_engine(f"sqlite:///{tmp_path / 'zapp.db'}")))
+    storage = LocalFilesystemStorage(tmp_path)
+    with Session() as session:
+        image_id = _legacy_image(session, tmp_path).id
+    failures = [OSError("bucket unreachable")]
+    get = storage.get
+
+    def flaky_get(key):
+        if failures:
+            raise failures.pop()
+        return get(key)
+
+    storage.get = flaky_get
+    asyncio.run(migrate_images(Session, storage, retry_interval=0))
+
+    with Session() as session:
+        assert session.get(Image, image_id).content_type == "image/png"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    # Presigning is local HMAC work; no request ever reaches this endpoint.
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "auto")
+    storage = BucketStorage(endpoint_url="http://bucket.invalid", bucket="atlas")
+    signed = []
+    sign = storage._client.generate_presigned_url
+
+    def counting_sign(*args, **kwargs):
+        signed.append(kwargs["Params"]["Key"])
+        return sign(*args, **kwargs)
+
+    monkeypatch.setattr(storage._client, "generate_presigned_url", counting_sign)
+    storage.signed = signed
+    return storage
+
+
+def test_bucket_reuses_a_presigned_url_until_it_nearly_expires(bucket, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(image_storage.time, "monotonic", lambda: now[0])
+
+    first = bucket.url_for("images/1")
+    assert first.expires_in == image_storage.PRESIGNED_URL_TTL
+
+    now[0] += 600
+    again = bucket.url_for("images/1")
+    assert again.url == first.url
+    assert again.expires_in == image_storage.PRESIGNED_URL_TTL - 600
+    assert bucket.signed == ["images/1"]
+
+    now[0] += image_storage.PRESIGNED_URL_TTL - 600 - image_storage.PRESIGNED_URL_REFRESH_MARGIN
+    assert bucket.url_for("images/1").expires_in == image_storage.PRESIGNED_URL_TTL
+    assert bucket.signed == ["images/1", "images/1"]
+
+
+def test_bucket_forgets_the_url_of_a_deleted_object(bucket, monkeypatch):
+    monkeypatch.setattr(bucket._client, "delete_objects", lambda **kwargs: {})
+
+    bucket.url_for("images/1")
+    bucket.delete_many(["images/1"])
+    bucket.url_for("images/1")
+
+    assert bucket.signed == ["images/1", "images/1"]
+
+
+class _CountingStorage(LocalFilesystemStorage):
+    def __init__(self, root):
+        super().__init__(root)
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+def test_cache_serves_repeat_reads_from_disk(tmp_path):
+    backend = _CountingStorage(tmp_path / "backend")
+    backend.put("images/1", PNG, "image/png")
+    cache = CachingStorage(backend, tmp_path / "cache", max_bytes=1024)
+
+    assert cache.get("images/1").data == PNG
+    assert cache.get("images/1").data == PNG
+    assert cache.get("images/1").content_type == "application/octet-stream"
+    assert backend.gets == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (2, 1)
+    assert stats.hit_ratio == 2 / 3
+
+
+def test_cache_writes_through_and_invalidates_on_delete(tmp_path):
+    backend = _CountingStorage(tmp_path / "backend")
+    cache = CachingStorage(backend, tmp_path / "cache", max_bytes=1024)
+
+    cache.put("images/1", PNG, "image/png")
+    assert backend.get("images/1").data == PNG
+    assert cache.get("images/1").content_type == "image/png"
+    assert cache.head("images/1").size == len(PNG)
+
+    cache.delete("images/1")
+    assert cache.get("images/1") is None
+    assert backend.get("images/1") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    backend = LocalFilesystemStorage(tmp_path / "backend")
+    cache = CachingStorage(backend, tmp_path / "cache", max_bytes=2 * len(PNG))
+    for key in ("a", "b"):
+        cache.put(key, PNG, "image/png")
+    cache.get("a")
+    cache.put("c", PNG, "image/png")
+
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.bytes == 2 * len(PNG)
+    assert not cache.path_for("b").exists()
+    assert cache.path_for("a").exists()
+
+
+def test_cache_index_survives_a_restart(tmp_path):
+    backend = _CountingStorage(tmp_path / "backend")
+    CachingStorage(backend, tmp_path / "cache", max_bytes=1024).put("images/1", PNG, "image/png")
+
+    cache = CachingStorage(backend, tmp_path / "cache", max_bytes=1024)
+    assert cache.stats().entries == 1
+    assert cache.get("images/1").content_type == "image/png"
+    assert backend.gets == 0
+
+
+def test_get_storage_wraps_any_backend_in_the_cache(tmp_path):
+    settings = AppSettings(
+        upload_dir=tmp_path / "uploads", storage_cache_dir=tmp_path / "cache", _env_file=None
+    )
+    storage = get_storage(settings)
+    assert isinstance(storage, CachingStorage)
+    assert isinstance(storage.backend, LocalFilesystemStorage)
@@ -0,0 +1,79 @@
+"""Postgres-only paths: COPY loads, sequences, and the SQLite migration.
+
+Skipped unless ZAPP_TEST_DATABASE_URL names a throwaway Postgres database
+(see `just test-postgres`); its tables are dropped before and after each test.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+
+from zapp_atlas import synth
+from zapp_atlas.db.migrate_postgres import MigrationError, migrate
+from zapp_atlas.main import create_app
+from zapp_atlas.schema.sqla import Base, Phenotype, Study
+from zapp_atlas.settings import AppSettings
+
+TEST_DATABASE_URL = os.environ.get("ZAPP_TEST_DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="ZAPP_TEST_DATABASE_URL not set")
+
+
+@pytest.fixture
+def postgres():
+    engine = create_engine(TEST_DATABASE_URL)
+    Base.metadata.drop_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def _phenotypes(engine) -> list[tuple]:
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(select(Phenotype).order_by(Phenotype.id))]
+
+
+def test_migrate_copies_every_row_and_keeps_ids(postgres, tmp_path: Path) -> None:
+    atlas = tmp_path / "atlas.db"
+    built = synth.build(atlas, studies=30, phenotypes=400)
+
+    copied = migrate(atlas, TEST_DATABASE_URL, batch=100)
+
+    for table, rows in built.rows.items():
+        assert copied[table] == rows
+    source = create_engine(f"sqlite:///{atlas}")
+    assert _phenotypes(postgres) == _phenotypes(source)
+    source.dispose()
+
+    # Sequences moved past the copied ids, so new rows don't collide.
+    settings = AppSettings(
+        database_url=TEST_DATABASE_URL, upload_dir=tmp_path, skip_seed=True, _env_file=None
+    )
+    with TestClient(create_app(settings)) as client:
+        res = client.post("/api/studies", json={"publication": "PMID:1", "experiment": []})
+    assert res.status_code == 201
+    assert res.json()["id"] == 31
+
+
+def test_migrate_refuses_a_target_with_data(postgres, tmp_path: Path) -> None:
+    atlas = tmp_path / "atlas.db"
+    synth.build(atlas, studies=5, phenotypes=20)
+    migrate(atlas, TEST_DATABASE_URL)
+
+    with pytest.raises(MigrationError, match="already has rows"):
+        migrate(atlas, TEST_DATABASE_URL)
+    with postgres.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Study)) == 5
+
+
+def test_synth_generates_into_postgres_with_copy(postgres) -> None:
+    counts = synth.generate(postgres, studies=20, phenotypes=200)
+
+    assert counts.rows["Phenotype"] == 200
+    with postgres.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Phenotype)) == 200
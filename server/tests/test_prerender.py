@@ -0,0 +1,179 @@
+"""Pre-rendered public study pages: written, refreshed, served, and never regressed."""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from zapp_atlas.html.prerender import StudyPrerenderer, study_page_path
+from zapp_atlas.main import create_app
+from zapp_atlas.settings import AppSettings
+
+STUDY = {
+    "publication": "PMID:333",
+    "annotator": ["ORCID:0000-0000-0000-0000"],
+    "experiment": [
+        {
+            "standard_rearing_condition": True,
+            "fish": {"zfin_id": "ZFIN:ZDB-GENO-990101-3", "name": "AB"},
+            "control": [],
+            "exposure_event": [
+                {
+                    "exposure_start_stage": "ZFS:0000011",
+                    "stressor": [
+                        {
+                            "chemical_id": "CHEBI:33216",
+                            "chemical_name": "bisphenol A",
+                            "concentration": {"unit": "µg/L", "numeric_value": "100"},
+                        }
+                    ],
+                    "phenotype_observation": [
+                        {
+                            "phenotype": [
+                                {
+                                    "stage": "ZFS:0000035",
+                                    "phenotype_term_id": {
+                                        "term_uri": "ZP:0105827",
+                                        "term_label": "pericardial region edematous, abnormal",
+                                    },
+                                }
+                            ]
+                        }
+                    ],
+                }
+            ],
+        }
+    ],
+}
+
+
+def _settings(tmp_path: Path, **overrides) -> AppSettings:
+    return AppSettings(
+        db_path=tmp_path / "zapp.db",
+        upload_dir=tmp_path / "uploads",
+        prerender_dir=tmp_path / "public",
+        prerender_interval_seconds=0.02,
+        skip_seed=True,
+        _env_file=None,
+        **overrides,
+    )
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def _version(tmp_path: Path, study_id: int) -> int | None:
+    path = tmp_path / "public" / "studies" / str(study_id) / "version"
+    return int(path.read_text()) if path.exists() else None
+
+
+@pytest.fixture
+def client(tmp_path: Path):
+    with TestClient(create_app(_settings(tmp_path))) as client:
+        yield client
+
+
+def test_a_new_study_is_rendered_whole(client: TestClient, tmp_path: Path) -> None:
+    study = client.post("/api/studies", json=STUDY).json()
+    page = study_page_path(tmp_path / "public", study["id"])
+    _wait_for(page.exists)
+
+    html = client.get(f"/public/studies/{study['id']}/").text
+    # Every section is in the page; nothing is left for htmx to fetch.
+    assert "AB (ZFIN:ZDB-GENO-990101-3)" in html
+    assert "bisphenol A (100 µg/L)" in html
+    assert "pericardial region edematous, abnormal" in html
+    assert "hx-get" not in html
+    assert "Signed in as" not in html
+
+    served = client.get(f"/public/studies/{study['id']}/study.json").json()
+    assert served == client.get(f"/api/studies/{study['id']}").json()
+
+
+def test_only_the_changed_study_is_rendered_again(client: TestClient, tmp_path: Path) -> None:
+    first = client.post("/api/studies", json=STUDY).json()["id"]
+    second = client.post("/api/studies", json=STUDY).json()["id"]
+    _wait_for(lambda: _version(tmp_path, first) and _version(tmp_path, second))
+    untouched = study_page_path(tmp_path / "public", second).stat().st_mtime_ns
+
+    client.patch(f"/api/studies/{first}", json={"publication": "PMID:999"})
+
+    _wait_for(lambda: "PMID:999" in study_page_path(tmp_path / "public", first).read_text())
+    assert study_page_path(tmp_path / "public", second).stat().st_mtime_ns == untouched
+
+
+def test_a_deleted_study_is_withdrawn(client: TestClient, tmp_path: Path) -> None:
+    study = client.post("/api/studies", json=STUDY).json()["id"]
+    page = study_page_path(tmp_path / "public", study)
+    _wait_for(page.exists)
+
+    client.delete(f"/api/studies/{study}")
+
+    _wait_for(lambda: not page.exists())
+    assert client.get(f"/public/studies/{study}/").status_code == 404
+    assert _version(tmp_path, study) is not None  # a newer render of nothing
+
+
+def test_signed_out_readers_get_the_file_without_a_query(
+    client: TestClient, tmp_path: Path
+) -> None:
+    study = client.post("/api/studies", json=STUDY).json()["id"]
+    _wait_for(study_page_path(tmp_path / "public", study).exists)
+    statements = []
+    engine = client.app.state.engine
+    record = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        anonymous = client.get(f"/studies/{study}")
+        assert statements == []
+        client.app.state.settings.dev_auth = True
+        client.post("/auth/dev/login", data={"name": "Ada Lovelace", "orcid_id": "0000-0001"})
+        signed_in = client.get(f"/studies/{study}")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert "bisphenol A" in anonymous.text
+    # Signed-in readers get the live page, with their own header.
+    assert 'hx-trigger="revealed"' in signed_in.text
+    assert "Ada Lovelace" in signed_in.text
+
+
+def test_an_older_render_never_replaces_a_newer_one(tmp_path: Path) -> None:
+    from zapp_atlas.html.prerender import StudyDocument
+
+    prerenderer = StudyPrerenderer(tmp_path / "public", session_factory=None)
+    page = study_page_path(tmp_path / "public", 1)
+
+    assert prerenderer._write(1, 5, StudyDocument("<p>v5</p>", "{}"), force=False)
+    assert not prerenderer._write(1, 4, StudyDocument("<p>v4</p>", "{}"), force=True)
+    assert not prerenderer._write(1, 5, StudyDocument("<p>again</p>", "{}"), force=False)
+    assert page.read_text() == "<p>v5</p>"
+
+
+def test_startup_catches_up_on_what_it_missed(tmp_path: Path) -> None:
+    settings = _settings(tmp_path)
+    with TestClient(create_app(settings)) as client:
+        kept = client.post("/api/studies", json=STUDY).json()["id"]
+        gone = client.post("/api/studies", json=STUDY).json()["id"]
+        _wait_for(lambda: _version(tmp_path, kept) and _version(tmp_path, gone))
+
+    # Changed while nothing was listening: one page lost, one study deleted.
+    study_page_path(tmp_path / "public", kept).unlink()
+    (tmp_path / "public" / "studies" / str(kept) / "version").unlink()
+    with TestClient(create_app(settings.model_copy(update={"prerender_dir": None}))) as client:
+        client.delete(f"/api/studies/{gone}")
+
+    with TestClient(create_app(settings)):
+        _wait_for(study_page_path(tmp_path / "public", kept).exists)
+        _wait_for(lambda: not study_page_path(tmp_path / "public", gone).exists())
+    assert json.loads((tmp_path / "public" / "studies" / str(kept) / "study.json").read_text())
@@ -0,0 +1,170 @@
+"""WAL shipping to a filesystem stand-in for the bucket, and restore from it."""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from zapp_atlas.db import replication
+from zapp_atlas.db.image_storage import LocalFilesystemStorage
+from zapp_atlas.db.replication import Replicator, restore
+
+PREFIX = "replica/zapp"
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = wal")
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    return conn
+
+
+def _insert(conn: sqlite3.Connection, values) -> None:
+    for value in values:
+        conn.execute("INSERT INTO t (x) VALUES (?)", (value,))
+
+
+def _rows(path: Path) -> list[str]:
+    conn = sqlite3.connect(path)
+    try:
+        return [x for (x,) in conn.execute("SELECT x FROM t ORDER BY id")]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(tmp_path: Path):
+    path = tmp_path / "live" / "zapp.db"
+    path.parent.mkdir()
+    conn = _connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, x TEXT)")
+    yield path, conn
+    conn.close()
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> LocalFilesystemStorage:
+    return LocalFilesystemStorage(tmp_path / "bucket")
+
+
+def test_restore_replays_every_synced_commit(db, storage, tmp_path: Path) -> None:
+    path, conn = db
+    replicator = Replicator(path, storage, PREFIX)
+    _insert(conn, ["a", "b"])
+    replicator.sync()
+    _insert(conn, ["c"])
+    assert replicator.sync() > 0
+    assert replicator.sync() == 0  # nothing new
+
+    restored = tmp_path / "restored" / "zapp.db"
+    assert restore(storage, PREFIX, restored)
+    assert _rows(restored) == ["a", "b", "c"]
+    replicator.close()
+
+
+def test_shipping_continues_across_checkpoints(db, storage, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(replication, "CHECKPOINT_BYTES", 1)
+    path, conn = db
+    replicator = Replicator(path, storage, PREFIX)
+    replicator.sync()
+    generation = replicator.generation
+    for batch in range(5):
+        _insert(conn, [f"{batch}-{i}" for i in range(20)])
+        replicator.sync()
+
+    assert replicator.generation == generation
+    restored = tmp_path / "restored.db"
+    restore(storage, PREFIX, restored)
+    assert len(_rows(restored)) == 100
+    replicator.close()
+
+
+def test_a_restart_it_did_not_see_starts_a_new_generation(db, storage, tmp_path) -> None:
+    path, conn = db
+    replicator = Replicator(path, storage, PREFIX)
+    replicator.sync()
+    old_generation = replicator.generation
+    _insert(conn, ["shipped"])
+    replicator.sync()
+
+    # Someone else checkpoints unshipped frames and the WAL starts over.
+    _insert(conn, ["unshipped"])
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    _insert(conn, ["after"])
+    replicator.sync()
+
+    assert replicator.generation != old_generation
+    assert storage.head(f"{PREFIX}/{old_generation}/snapshot") is None
+    restored = tmp_path / "restored.db"
+    restore(storage, PREFIX, restored)
+    assert _rows(restored) == ["shipped", "unshipped", "after"]
+    replicator.close()
+
+
+def test_a_wal_past_the_cap_is_checkpointed_while_the_replica_is_down(
+    db, storage, tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setattr(replication, "MAX_WAL_BYTES", 1)
+    path, conn = db
+    replicator = Replicator(path, storage, PREFIX)
+    replicator.sync()
+    old_generation = replicator.generation
+    put = storage.put
+
+    def unreachable(key, data, content_type):
+        raise OSError("bucket unreachable")
+
+    monkeypatch.setattr(storage, "put", unreachable)
+    _insert(conn, ["unshipped"])
+    with pytest.raises(OSError):
+        replicator.sync()
+    assert replicator.relieve()
+    assert replicator.wal_path.stat().st_size == 0
+
+    monkeypatch.setattr(storage, "put", put)
+    _insert(conn, ["after"])
+    replicator.sync()
+
+    assert replicator.generation != old_generation
+    restored = tmp_path / "restored.db"
+    restore(storage, PREFIX, restored)
+    assert _rows(restored) == ["unshipped", "after"]
+    replicator.close()
+
+
+def test_restore_leaves_an_existing_database_alone(db, storage) -> None:
+    path, _ = db
+    replicator = Replicator(path, storage, PREFIX)
+    replicator.sync()
+
+    assert not restore(storage, PREFIX, path)
+    assert not restore(storage, "replica/none", path.with_name("other.db"))
+    replicator.close()
+
+
+def test_app_restores_from_the_replica_and_keeps_shipping(tmp_path: Path) -> None:
+    from fastapi.testclient import TestClient
+
+    from zapp_atlas.main import create_app
+    from zapp_atlas.settings import AppSettings
+
+    def settings(db_path: Path) -> AppSettings:
+        return AppSettings(
+            db_path=db_path,
+            upload_dir=tmp_path / "bucket",
+            replica_prefix=PREFIX,
+            replica_sync_interval_seconds=0.05,
+            skip_seed=True,
+            _env_file=None,
+        )
+
+    study = {"publication": "PMID:1", "annotator": [], "experiment": []}
+    with TestClient(create_app(settings(tmp_path / "first" / "zapp.db"))) as client:
+        assert client.post("/api/studies", json=study).status_code == 201
+
+    # A fresh machine: empty disk, same bucket.
+    with TestClient(create_app(settings(tmp_path / "second" / "zapp.db"))) as client:
+        studies = client.get("/api/studies").json()
+    assert [s["publication"] for s in studies] == ["PMID:1"]
@@ -1,12 +1,17 @@
 """The schema's ``unique_keys`` and timestamp annotations reach the database.
 
-``gen-sqla`` emits neither, so ``schema.constraints`` supplies them from the
-YAML. These tests lock in that the grain of each join table is actually
-enforced rather than merely declared.
+``gen-sqla`` emits neither, so ``schema.constraints`` supplies them from
+``_gen/constraints.py``, compiled from the YAML by ``make schema``. These tests
+lock in that the grain of each join table is actually enforced rather than
+merely declared, and that the compiled artifact matches the YAML.
 """
 
 from __future__ import annotations
 
+import os
+import subprocess
+import sys
+from pathlib import Path
 from typing import Callable
 
 import pytest
@@ -15,7 +20,9 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, sessionmaker
 
 from zapp_atlas.db.db import init_db
+from zapp_atlas.schema import constraints_gen
 from zapp_atlas.schema.sqla import (
+    Base,
     ChemicalCabinetEntry,
     Fish,
     FishTankEntry,
@@ -99,3 +106,34 @@ def test_annotated_classes_get_audit_timestamps(session, group):
 
     assert entry.created_at is not None
     assert entry.updated_at is not None
+
+
+def test_term_references_match_a_unique_column_of_the_same_type():
+    # Postgres refuses a foreign key that doesn't; SQLite never checked.
+    for table in Base.metadata.sorted_tables:
+        for foreign_key in table.foreign_keys:
+            target = foreign_key.column
+            assert type(foreign_key.parent.type) is type(target.type), foreign_key
+            assert list(target.table.primary_key.columns) == [target] or any(
+                index.unique and list(index.columns) == [target] for index in target.table.indexes
+            ), foreign_key
+
+
+def test_compiled_constraints_match_the_schema():
+    """Fails when the YAML changed without `make schema` being re-run."""
+    artifact = Path(constraints_gen.__file__).parent / "_gen" / "constraints.py"
+    expected = "# GENERATED FILE. DO NOT EDIT.\n" + constraints_gen.render()
+    assert artifact.read_text() == expected
+
+
+def test_app_import_does_not_load_linkml():
+    probe = "import sys, zapp_atlas.main; print(any(m.startswith('linkml') for m in sys.modules))"
+    src = Path(constraints_gen.__file__).parents[2]
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": str(src)},
+    )
+    assert result.stdout.strip() == "False"
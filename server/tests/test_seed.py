@@ -2,6 +2,8 @@ from __future__ import annotations
 
 """Tests for the dev seed script."""
 
+import time
+
 from sqlalchemy import create_engine, func
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -58,3 +60,43 @@ def test_seed_is_idempotent() -> None:
 
     assert first == second
     session.close()
+
+
+def test_seed_records_its_fingerprint() -> None:
+    from zapp_atlas.db.models import Meta
+    from zapp_atlas.seed import SEED_FINGERPRINT_KEY, seed_is_current
+
+    Session = _session_factory()
+    with Session() as session:
+        assert not seed_is_current(session)
+        seed(session)
+        assert seed_is_current(session)
+
+        # Edited seed definitions hash differently and are applied again.
+        session.get(Meta, SEED_FINGERPRINT_KEY).value = "0" * 64
+        session.commit()
+        assert not seed_is_current(session)
+
+
+def test_stale_seed_runs_in_the_background_after_startup(tmp_path) -> None:
+    from fastapi.testclient import TestClient
+
+    from zapp_atlas.main import create_app
+    from zapp_atlas.schema.sqla import Study
+    from zapp_atlas.seed import seed_is_current
+    from zapp_atlas.settings import AppSettings
+
+    settings = AppSettings(db_path=tmp_path / "zapp.db", upload_dir=tmp_path, _env_file=None)
+    app = create_app(settings)
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        deadline = time.monotonic() + 10
+        while True:
+            with app.state.session_factory() as session:
+                if seed_is_current(session) or time.monotonic() > deadline:
+                    break
+            time.sleep(0.05)
+
+    with app.state.session_factory() as session:
+        assert seed_is_current(session)
+        assert session.query(func.count(Study.id)).scalar() >= 1
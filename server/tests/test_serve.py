@@ -0,0 +1,70 @@
+"""The multi-worker production server, run as a real subprocess."""
+
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(base: str, deadline: float) -> None:
+    while True:
+        try:
+            httpx.get(f"{base}/health").raise_for_status()
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def test_workers_share_one_database_and_stop_on_sigterm(tmp_path: Path) -> None:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(SRC),
+        "ZAPP_WORKERS": "3",
+        "ZAPP_DB_PATH": str(tmp_path / "zapp.db"),
+        "ZAPP_UPLOAD_DIR": str(tmp_path / "uploads"),
+        "ZAPP_SKIP_SEED": "true",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "zapp_atlas.serve", "--port", str(port)],
+        cwd=tmp_path,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(base, time.monotonic() + 30)
+
+        def create(i: int) -> int:
+            study = {"publication": f"PMID:{i}", "annotator": [], "experiment": []}
+            return httpx.post(f"{base}/api/studies", json=study).status_code
+
+        with ThreadPoolExecutor(12) as pool:
+            statuses = list(pool.map(create, range(60)))
+        studies = httpx.get(f"{base}/api/studies", params={"limit": 500}).json()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        code = server.wait(timeout=30)
+
+    assert statuses == [201] * 60
+    assert len(studies) == 60
+    assert code == 0
@@ -0,0 +1,96 @@
+"""Static files: precompressed sidecars, caching headers and ETags."""
+
+from __future__ import annotations
+
+import gzip
+import os
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from zapp_atlas.html.assets import IMMUTABLE, AssetFiles, accepted_encodings
+
+SCRIPT = b"console.log('hello');\n" * 200
+
+
+@pytest.fixture
+def assets(tmp_path: Path) -> Path:
+    (tmp_path / "app-3f2a1b.js").write_bytes(SCRIPT)
+    (tmp_path / "app-3f2a1b.js.gz").write_bytes(gzip.compress(SCRIPT))
+    (tmp_path / "app-3f2a1b.js.br").write_bytes(b"pretend brotli")
+    (tmp_path / "photo.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    return tmp_path
+
+
+def _client(directory: Path, **kwargs) -> TestClient:
+    app = FastAPI()
+    app.mount("/assets", AssetFiles(directory=directory, **kwargs))
+    return TestClient(app)
+
+
+def test_the_best_accepted_sidecar_is_sent(assets: Path) -> None:
+    client = _client(assets)
+
+    brotli = client.get("/assets/app-3f2a1b.js", headers={"Accept-Encoding": "gzip, br"})
+    gzipped = client.get("/assets/app-3f2a1b.js", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/assets/app-3f2a1b.js", headers={"Accept-Encoding": "identity"})
+
+    assert brotli.headers["content-encoding"] == "br"
+    assert brotli.headers["content-length"] == str(len(b"pretend brotli"))
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.content == SCRIPT  # decoded by the client
+    assert "content-encoding" not in plain.headers
+    for res in (brotli, gzipped, plain):
+        assert res.headers["content-type"].startswith("text/javascript")
+        assert res.headers["vary"] == "Accept-Encoding"
+    # Each encoding is its own representation, with its own ETag.
+    assert len({res.headers["etag"] for res in (brotli, gzipped, plain)}) == 3
+
+
+def test_a_sidecar_older_than_its_file_is_ignored(assets: Path) -> None:
+    script = assets / "app-3f2a1b.js"
+    later = script.stat().st_mtime + 60
+    os.utime(script, (later, later))
+
+    res = _client(assets).get("/assets/app-3f2a1b.js", headers={"Accept-Encoding": "br, gzip"})
+
+    assert "content-encoding" not in res.headers
+    assert res.content == SCRIPT
+
+
+def test_files_without_sidecars_are_sent_as_they_are(assets: Path) -> None:
+    res = _client(assets).get("/assets/photo.png", headers={"Accept-Encoding": "br, gzip"})
+
+    assert res.headers["content-type"] == "image/png"
+    assert "content-encoding" not in res.headers
+
+
+def test_hashed_assets_are_immutable(assets: Path) -> None:
+    res = _client(assets, immutable=True).get("/assets/app-3f2a1b.js")
+
+    assert res.headers["cache-control"] == IMMUTABLE
+
+
+def test_static_files_revalidate_with_their_etag(client: TestClient) -> None:
+    first = client.get("/static/styles.css")
+    again = client.get("/static/styles.css", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.headers["cache-control"] == "no-cache"
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("gzip, deflate, br, zstd", {"gzip", "deflate", "br", "zstd"}),
+        ("br;q=0, gzip;q=0.5", {"gzip"}),
+        ("*", {"*", "br", "gzip"}),
+        ("", set()),
+    ],
+)
+def test_accept_encoding_is_parsed_with_its_weights(header: str, expected: set[str]) -> None:
+    assert accepted_encodings(header) == expected
@@ -0,0 +1,57 @@
+"""Tests for the synthetic atlas generator."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+
+from zapp_atlas import synth
+from zapp_atlas.main import create_app
+from zapp_atlas.schema.sqla import Phenotype, Study
+from zapp_atlas.settings import AppSettings
+
+
+def _dump(path: Path) -> list[tuple]:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT * FROM Phenotype ORDER BY id").all()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+
+def test_same_seed_builds_the_same_atlas(tmp_path: Path) -> None:
+    a = synth.build(tmp_path / "a.db", studies=40, phenotypes=500, seed=7)
+    b = synth.build(tmp_path / "b.db", studies=40, phenotypes=500, seed=7)
+    synth.build(tmp_path / "c.db", studies=40, phenotypes=500, seed=8)
+
+    assert a.rows == b.rows
+    assert _dump(tmp_path / "a.db") == _dump(tmp_path / "b.db")
+    assert _dump(tmp_path / "a.db") != _dump(tmp_path / "c.db")
+
+
+def test_build_writes_the_requested_scale(tmp_path: Path) -> None:
+    counts = synth.build(tmp_path / "atlas.db", studies=40, phenotypes=500)
+
+    assert counts.rows["Study"] == 40
+    assert counts.rows["Phenotype"] == 500
+    engine = create_engine(f"sqlite:///{tmp_path / 'atlas.db'}")
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Study)) == 40
+        assert conn.scalar(select(func.count()).select_from(Phenotype)) == 500
+    engine.dispose()
+
+
+def test_generated_studies_are_served_by_the_api(tmp_path: Path) -> None:
+    db = tmp_path / "atlas.db"
+    synth.build(db, studies=10, phenotypes=100)
+    settings = AppSettings(db_path=db, upload_dir=tmp_path, skip_seed=True, _env_file=None)
+
+    with TestClient(create_app(settings)) as client:
+        res = client.get("/api/studies/1")
+
+    assert res.status_code == 200
+    study = res.json()
+    assert study["publication"] == "PMID:90000001"
+    assert study["experiment"][0]["exposure_event"][0]["stressor"]
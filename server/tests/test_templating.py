@@ -0,0 +1,61 @@
+"""Template warm-up and the on-disk bytecode cache."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from zapp_atlas.html import templating
+from zapp_atlas.html.templating import TEMPLATES_DIR, templates, use_bytecode_cache, warm_templates
+
+
+@pytest.fixture
+def fresh_environment(monkeypatch):
+    """A copy of the app's environment with nothing compiled yet."""
+    env = templates.env.overlay(cache_size=400)
+    monkeypatch.setattr(templates, "env", env)
+    return env
+
+
+def test_warming_compiles_every_template(fresh_environment: Environment) -> None:
+    count = warm_templates()
+
+    assert count == len(fresh_environment.list_templates())
+    assert count == sum(1 for path in TEMPLATES_DIR.rglob("*") if path.is_file())
+    assert len(fresh_environment.cache) == count
+
+
+def test_compiled_templates_are_loaded_from_the_cache(
+    fresh_environment: Environment, tmp_path: Path
+) -> None:
+    templating.main([str(tmp_path / "cache")])
+    assert len(list((tmp_path / "cache").iterdir())) == warm_templates()
+
+    # A new process: same cache directory, nothing compiled in memory.
+    cache = FileSystemBytecodeCache(str(tmp_path / "cache"))
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), bytecode_cache=cache)
+    compiled = []
+    env.compile = lambda *args, **kwargs: compiled.append(args)  # must not be needed
+
+    env.get_template("index.html")
+
+    assert compiled == []
+
+
+def test_an_edited_template_is_compiled_again(tmp_path: Path, monkeypatch) -> None:
+    (tmp_path / "templates").mkdir()
+    page = tmp_path / "templates" / "page.html"
+    page.write_text("<p>before</p>")
+    cache = tmp_path / "cache"
+
+    def fresh_render() -> str:
+        env = Environment(loader=FileSystemLoader(tmp_path / "templates"))
+        monkeypatch.setattr(templates, "env", env)
+        use_bytecode_cache(cache)
+        return env.get_template("page.html").render()
+
+    assert fresh_render() == "<p>before</p>"
+    page.write_text("<p>after</p>")
+    assert fresh_render() == "<p>after</p>"